@@ -91,6 +91,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Shared by every worker and management command: buffered view counts,
+# refresh locks and cached responses. The file-based default is shared by
+# every process on the host; point it at Redis or Memcached in production
+# for atomic increments. A local-memory cache is private to each process,
+# so place views are then written directly instead of buffered.
+
+CACHES = {
+    'default': {
+        'BACKEND': getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'tmp', 'cache')),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -133,7 +149,15 @@ STATICFILES_DIRS = (
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    # Uploads are named by content hash and deduplicated (base.storage).
+    'default': {
+        'BACKEND': 'base.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 WHITENOISE_AUTOREFRESH = True
 
 # Default primary key field type
@@ -167,6 +191,41 @@ SIMPLE_JWT = {
     'LEEWAY': 0,
 }
 
+# Rwanda locations proxy (web.locations)
+RWANDA_LOCATIONS_API_URL = getenv('RWANDA_LOCATIONS_API_URL', 'https://rwanda.p.rapidapi.com/')
+RWANDA_LOCATIONS_API_KEY = getenv('RWANDA_LOCATIONS_API_KEY', '')  # RapidAPI key; refreshes fail until it is set
+RWANDA_LOCATIONS_TTL = int(getenv('RWANDA_LOCATIONS_TTL', 60 * 60 * 24 * 7))  # seconds before a background refresh
+RWANDA_LOCATIONS_RETRY_INTERVAL = int(getenv('RWANDA_LOCATIONS_RETRY_INTERVAL', 60 * 5))
+RWANDA_LOCATIONS_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+RWANDA_LOCATIONS_SNAPSHOT = os.path.join(BASE_DIR, 'data', 'rwanda_locations.json')
+
+# Facet counts on the public place list (web.facets)
+PLACE_FACETS_CACHE_TIMEOUT = int(getenv('PLACE_FACETS_CACHE_TIMEOUT', 60 * 60))
+
+# Response cache of the public web API (web.caching.cached_view)
+WEB_RESPONSE_CACHE_TIMEOUT = int(getenv('WEB_RESPONSE_CACHE_TIMEOUT', 60 * 60))
+WEB_RESPONSE_CACHE_STALE_TIMEOUT = int(getenv('WEB_RESPONSE_CACHE_STALE_TIMEOUT', 60 * 60 * 24))  # previous response served during a rebuild
+WEB_RESPONSE_CACHE_LOCK_TIMEOUT = 30  # seconds a rebuild may hold the lock
+
+# Buffered Place.views counting (base.counters), flushed by the `flush_place_views` command
+PLACE_VIEWS_FLUSH_INTERVAL = int(getenv('PLACE_VIEWS_FLUSH_INTERVAL', 10))  # seconds between flushes with --watch
+
+# Image renditions, generated by the `generate_image_renditions` worker (base.renditions)
+IMAGE_RENDITION_WORKERS = int(getenv('IMAGE_RENDITION_WORKERS', 2))  # images processed in parallel
+IMAGE_RENDITION_POLL_INTERVAL = int(getenv('IMAGE_RENDITION_POLL_INTERVAL', 5))  # seconds between --watch polls
+
+# Chunked, resumable image uploads (base.uploads)
+UPLOAD_TEMP_DIR = getenv('UPLOAD_TEMP_DIR', os.path.join(BASE_DIR, 'tmp', 'uploads'))  # same filesystem as MEDIA_ROOT, so finished files are moved, not copied
+UPLOAD_MAX_SIZE = int(getenv('UPLOAD_MAX_SIZE', 50 * 1024 * 1024))  # bytes per upload
+UPLOAD_CHUNK_MAX_SIZE = int(getenv('UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024))  # bytes per chunk request
+UPLOAD_SESSION_TTL = int(getenv('UPLOAD_SESSION_TTL', 60 * 60 * 24))  # seconds an unfinished upload can be resumed
+
+# Media serving (base.media.serveMedia)
+MEDIA_PUBLIC_DIRECTORIES = ('places', 'categories', 'renditions')  # top-level MEDIA_ROOT directories served publicly
+MEDIA_SENDFILE_BACKEND = getenv('MEDIA_SENDFILE_BACKEND') or None  # 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile) or None to stream from Django
+MEDIA_ACCEL_REDIRECT_PREFIX = getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')  # nginx `internal` location aliased to MEDIA_ROOT
+MEDIA_CACHE_MAX_AGE = int(getenv('MEDIA_CACHE_MAX_AGE', 60 * 60 * 24))  # seconds, for files not named by content hash
+
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
     'https://*.127.0.0.1'
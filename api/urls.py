@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.contrib import admin
+from base.media import serveMedia
 from django.urls import path, include
 from django.conf.urls.static import static
 
@@ -8,4 +9,5 @@ urlpatterns = [
     path('api/', include('web.urls')),
     path('api/admin/', include('base.urls')),
     path('api/auth/', include('account.urls')),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serveMedia, name='serveMedia'),
+] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -13,7 +13,7 @@ class PlaceImageInline(admin.TabularInline):  # or admin.StackedInline for verti
     def image_preview(self, obj):
         """Display a small preview of the uploaded image in the admin panel."""
         if obj.image:
-            return format_html('<img src="{}" width="100" height="60" style="border-radius:5px;" />', obj.image.url)
+            return format_html('<img src="{}" width="100" height="60" style="border-radius:5px;" />', obj.rendition_url('thumbnail'))
         return "No Image"
 
     image_preview.short_description = "Image Preview"
@@ -0,0 +1,278 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from base import clusters, menu_search, menus, search, versioning
+from base.slugs import allocate_slugs
+
+MAX_BULK_ITEMS = 1000  # items accepted per batch request
+BATCH_SIZE = 500  # rows per INSERT/UPDATE statement
+
+class BulkValidationError(Exception):
+    """Raised with the per-item results when any item of a batch is invalid."""
+    def __init__(self, results):
+        super().__init__(results)
+        self.results = results
+
+# --------------------------
+# Validation
+# --------------------------
+def load_related(items, relations):
+    """
+    Loads every object the items reference through `relations`
+    ({field name: Model}) with one query per model, as the
+    `related_objects` context of PrefetchedPrimaryKeyRelatedField.
+    Values that are not valid ids are left for the serializer to report.
+    """
+    ids = {}
+    for field, model in relations.items():
+        model_ids = ids.setdefault(model, set())
+        for item in items:
+            if not isinstance(item, dict) or item.get(field) is None:
+                continue
+            values = item[field] if isinstance(item[field], list) else [item[field]]
+            for value in values:
+                try:
+                    model_ids.add(model._meta.pk.to_python(value))
+                except (TypeError, ValueError, DjangoValidationError):
+                    pass
+    return {model: model.objects.in_bulk(list(model_ids)) for model, model_ids in ids.items()}
+
+def validate_items(serializer_class, items, context=None, instances=None):
+    """
+    Validates every item of a batch with `serializer_class` and returns their
+    validated data. When `instances` ({pk: instance}) is given the batch is
+    an update: each item names its row with `id` and is validated partially.
+
+    Raises BulkValidationError listing every item's outcome if any item is
+    invalid, so nothing is written unless the whole batch is valid.
+    """
+    results = []
+    validated = []
+    failed = False
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            failed = True
+            results.append({"index": index, "status": "invalid", "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        instance = None
+        if instances is not None:
+            instance = instances.get(_to_pk(serializer_class.Meta.model, item.get('id')))
+            if instance is None:
+                failed = True
+                results.append({"index": index, "status": "invalid", "errors": {"id": ["No object with this id exists."]}})
+                continue
+        serializer = serializer_class(instance, data=item, partial=instance is not None, context=context or {})
+        if serializer.is_valid():
+            results.append({"index": index, "status": "valid"})
+            validated.append((instance, serializer.validated_data))
+        else:
+            failed = True
+            results.append({"index": index, "status": "invalid", "errors": serializer.errors})
+    if failed:
+        raise BulkValidationError(results)
+    return validated
+
+def load_instances(model, items):
+    """Loads the rows an update batch refers to by `id`, in one query."""
+    ids = {_to_pk(model, item.get('id')) for item in items if isinstance(item, dict)}
+    ids.discard(None)
+    return model.objects.in_bulk(list(ids))
+
+def _to_pk(model, value):
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+# --------------------------
+# Places
+# --------------------------
+def create_places(validated):
+    """
+    Inserts validated places with bulk_create, writing their tags straight to
+    the through table. bulk_create skips save() and signals, so slugs,
+    geohashes, map clusters, the search index and data versions are
+    maintained here.
+    """
+    from base.models import Place
+
+    tags = {}
+    places = []
+    for index, (_, data) in enumerate(validated):
+        data = dict(data)
+        tags[index] = data.pop('tags', None)
+        places.append(Place(**data))
+    for place, slug in zip(places, allocate_slugs(Place, [place.name for place in places])):
+        place.slug = slug
+        place.refresh_geohash()
+
+    with transaction.atomic():
+        Place.objects.bulk_create(places, batch_size=BATCH_SIZE)
+        set_place_tags({places[index].pk: tag_list for index, tag_list in tags.items() if tag_list}, replace=False)
+        clusters.add_places([
+            (place.pk, place.geohash, place.latitude, place.longitude) for place in places if place.geohash
+        ])
+        search.schedule_reindex([place.pk for place in places])
+        versioning.bump(versioning.PLACES)
+    return places
+
+def update_places(validated):
+    """Applies validated partial updates to their places with bulk_update."""
+    from base.models import Place
+
+    fields = set()
+    tags = {}
+    moves = []
+    now = timezone.now()
+    for place, data in validated:
+        previous = _place_location(place)
+        for name, value in data.items():
+            if name == 'tags':
+                tags[place.pk] = value
+            else:
+                setattr(place, name, value)
+                fields.add(name)
+        place.refresh_geohash()
+        place.updated_at = now
+        current = _place_location(place)
+        if previous != current:
+            moves.append((place.pk, previous, current))
+    if {'latitude', 'longitude'} & fields:
+        fields.add('geohash')
+    fields.add('updated_at')
+
+    places = [place for place, _ in validated]
+    with transaction.atomic():
+        Place.objects.bulk_update(places, sorted(fields), batch_size=BATCH_SIZE)
+        set_place_tags(tags, replace=True)
+        clusters.move_places(moves)
+        search.schedule_reindex([place.pk for place in places])
+        versioning.bump(versioning.PLACES)
+    return places
+
+def set_place_tags(tags, replace):
+    """
+    Writes {place_id: [Tag, ...]} to the through table in bulk, replacing the
+    places' current tags when `replace`.
+    """
+    from base.models import Place
+
+    Through = Place.tags.through
+    if replace and tags:
+        Through.objects.filter(place_id__in=list(tags)).delete()
+    rows = {
+        (place_id, tag.pk)
+        for place_id, tag_list in tags.items()
+        for tag in tag_list
+    }
+    Through.objects.bulk_create(
+        [Through(place_id=place_id, tag_id=tag_id) for place_id, tag_id in sorted(rows)],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+def _place_location(place):
+    if place.geohash and place.latitude is not None and place.longitude is not None:
+        return place.geohash, place.latitude, place.longitude
+    return None
+
+# --------------------------
+# Images, tags and menu items
+# --------------------------
+def create_place_images(validated):
+    """
+    Inserts validated images with bulk_create (files are stored as each row
+    is prepared). New rows start with pending renditions.
+    """
+    from base.models import PlaceImage
+
+    images = [PlaceImage(**data) for _, data in validated]
+    with transaction.atomic():
+        PlaceImage.objects.bulk_create(images, batch_size=BATCH_SIZE)
+        versioning.bump(versioning.PLACE_IMAGES)
+    return images
+
+def create_tags(validated):
+    from base.models import Tag
+
+    tags = [Tag(**data) for _, data in validated]
+    missing = [tag for tag in tags if not tag.slug]
+    for tag, slug in zip(missing, allocate_slugs(Tag, [tag.name for tag in missing])):
+        tag.slug = slug
+    with transaction.atomic():
+        Tag.objects.bulk_create(tags, batch_size=BATCH_SIZE)
+        versioning.bump(versioning.TAGS)
+    return tags
+
+def update_tags(validated):
+    from base.models import Place, Tag
+
+    fields = set()
+    for tag, data in validated:
+        for name, value in data.items():
+            setattr(tag, name, value)
+            fields.add(name)
+    tags = [tag for tag, _ in validated]
+    if not fields:
+        return tags
+    with transaction.atomic():
+        Tag.objects.bulk_update(tags, sorted(fields), batch_size=BATCH_SIZE)
+        search.schedule_reindex(
+            Place.objects.filter(tags__in=[tag.pk for tag in tags]).values_list('pk', flat=True).distinct()
+        )
+        versioning.bump(versioning.TAGS)
+    return tags
+
+def create_menu_items(validated):
+    from base.models import PlaceMenu
+
+    items = [PlaceMenu(**data) for _, data in validated]
+    with transaction.atomic():
+        PlaceMenu.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        menus.refresh_price_summaries({item.place_id for item in items})
+        menu_search.index_menu_items([item.pk for item in items])
+        search.schedule_reindex({item.place_id for item in items})
+        versioning.bump(versioning.PLACE_MENUS)
+    return items
+
+def update_menu_items(validated):
+    from base.models import PlaceMenu
+
+    fields = set()
+    place_ids = set()
+    for item, data in validated:
+        place_ids.add(item.place_id)  # before and after: an item may move to another place
+        for name, value in data.items():
+            setattr(item, name, value)
+            fields.add(name)
+        place_ids.add(item.place_id)
+    items = [item for item, _ in validated]
+    if not fields:
+        return items
+    with transaction.atomic():
+        PlaceMenu.objects.bulk_update(items, sorted(fields), batch_size=BATCH_SIZE)
+        if {'place', 'price'} & fields:
+            menus.refresh_price_summaries(place_ids)
+        if {'place', 'name', 'description', 'price'} & fields:
+            menu_search.index_menu_items([item.pk for item in items])
+        search.schedule_reindex(place_ids)
+        versioning.bump(versioning.PLACE_MENUS)
+    return items
+
+# --------------------------
+# Deletion
+# --------------------------
+def delete_objects(model, ids):
+    """
+    Deletes the rows of `model` with the given ids in one transaction and
+    returns per-id results. Deletion goes through the ORM collector, so the
+    usual delete signals (clusters, search index, versions) still run.
+    """
+    ids = list(dict.fromkeys(_to_pk(model, value) for value in ids))
+    existing = set(model.objects.filter(pk__in=[pk for pk in ids if pk is not None]).values_list('pk', flat=True))
+    with transaction.atomic():
+        model.objects.filter(pk__in=existing).delete()
+    return [
+        {"id": pk, "status": "deleted" if pk in existing else "not_found"}
+        for pk in ids
+    ]
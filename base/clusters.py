@@ -0,0 +1,179 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from base.geo import covering_cells, geohash_filter
+
+CLUSTER_PRECISIONS = range(1, 9)
+SAMPLE_SIZE = 3  # representative place ids kept per cluster
+MARKER_THRESHOLD = 200  # viewports with at most this many places get individual markers
+
+def zoom_to_precision(zoom):
+    """
+    Maps a web-map zoom level (0-22) to the geohash precision whose cells are
+    roughly the size of a few screen tiles at that zoom.
+    """
+    precision = int(zoom * 5 / 12) + 1
+    return max(CLUSTER_PRECISIONS[0], min(CLUSTER_PRECISIONS[-1], precision))
+
+# --------------------------
+# Incremental maintenance
+# --------------------------
+def add_place(place_id, geohash, latitude, longitude):
+    """Counts a located place into its cell at every cluster precision."""
+    move_places([(place_id, None, (geohash, latitude, longitude))])
+
+def add_places(located):
+    """Counts many located places, given as (place_id, geohash, latitude, longitude)."""
+    move_places([(place_id, None, (geohash, latitude, longitude)) for place_id, geohash, latitude, longitude in located])
+
+def remove_place(place_id, geohash, latitude, longitude):
+    """Removes a place from its cells, deleting cells that become empty."""
+    move_places([(place_id, (geohash, latitude, longitude), None)])
+
+def move_places(moves):
+    """
+    Applies location changes, given as (place_id, previous, current) with
+    each location a (geohash, latitude, longitude) tuple or None, as signed
+    deltas per distinct cell: cells a place stays in cancel out, and the
+    touched cells are read (locked) and written back in a few batched
+    queries, so a batch of places costs about as much as a single one.
+    Cells left empty are deleted.
+    """
+    from base.models import PlaceCluster
+
+    cells = {}  # (precision, geohash) -> [count, latitude_sum, longitude_sum, removed ids, added ids]
+    for place_id, previous, current in moves:
+        for location, sign in ((previous, -1), (current, 1)):
+            if location is None:
+                continue
+            geohash, latitude, longitude = location
+            for precision in CLUSTER_PRECISIONS:
+                cell = cells.setdefault((precision, geohash[:precision]), [0, 0.0, 0.0, set(), []])
+                cell[0] += sign
+                cell[1] += sign * latitude
+                cell[2] += sign * longitude
+                if sign < 0:
+                    cell[3].add(place_id)
+                else:
+                    cell[4].append(place_id)
+    # Skip cells whose count, sums and samples all stay the same.
+    cells = {
+        key: cell for key, cell in cells.items()
+        if cell[0] or abs(cell[1]) > 1e-9 or abs(cell[2]) > 1e-9 or cell[3] != set(cell[4])
+    }
+    if not cells:
+        return
+
+    with transaction.atomic():
+        existing = {}
+        by_precision = {}
+        for precision, geohash in cells:
+            by_precision.setdefault(precision, []).append(geohash)
+        for precision, geohashes in by_precision.items():
+            for start in range(0, len(geohashes), 500):
+                rows = PlaceCluster.objects.select_for_update().filter(precision=precision, geohash__in=geohashes[start:start + 500])
+                existing.update(((precision, cluster.geohash), cluster) for cluster in rows)
+
+        changed, created, empty = [], [], []
+        for (precision, geohash), (count, latitude_sum, longitude_sum, removed, added) in cells.items():
+            cluster = existing.get((precision, geohash))
+            if cluster is None:
+                if count > 0:
+                    created.append(PlaceCluster(
+                        precision=precision, geohash=geohash, count=count, latitude_sum=latitude_sum,
+                        longitude_sum=longitude_sum, place_ids=_samples([], removed, added),
+                    ))
+                continue
+            cluster.count += count
+            cluster.latitude_sum += latitude_sum
+            cluster.longitude_sum += longitude_sum
+            if cluster.count <= 0:
+                empty.append(cluster.pk)
+                continue
+            cluster.place_ids = _samples(cluster.place_ids, removed, added)
+            changed.append(cluster)
+
+        PlaceCluster.objects.bulk_update(changed, ['count', 'latitude_sum', 'longitude_sum', 'place_ids'], batch_size=500)
+        PlaceCluster.objects.filter(pk__in=empty).delete()
+        try:
+            with transaction.atomic():
+                PlaceCluster.objects.bulk_create(created, batch_size=500)
+        except IntegrityError:
+            # Another writer created some of these cells first; count into them one by one.
+            for cluster in created:
+                _create_or_add(cluster)
+
+def _samples(place_ids, removed, added):
+    """The representative ids of a cell after `removed` left it and `added` joined it."""
+    place_ids = [pk for pk in place_ids if pk not in removed or pk in added]
+    for pk in added:
+        if pk not in place_ids and len(place_ids) < SAMPLE_SIZE:
+            place_ids.append(pk)
+    return place_ids
+
+def _create_or_add(cluster):
+    from base.models import PlaceCluster
+
+    try:
+        with transaction.atomic():
+            cluster.save(force_insert=True)
+    except IntegrityError:
+        PlaceCluster.objects.filter(precision=cluster.precision, geohash=cluster.geohash).update(
+            count=F('count') + cluster.count,
+            latitude_sum=F('latitude_sum') + cluster.latitude_sum,
+            longitude_sum=F('longitude_sum') + cluster.longitude_sum,
+        )
+
+def rebuild_clusters(Place, PlaceCluster, batch_size=1000):
+    """
+    Recomputes every cluster from scratch. Takes the model classes so data
+    migrations can call it with historical models.
+    """
+    cells = {}
+    located = Place.objects.filter(geohash__isnull=False).values_list('id', 'geohash', 'latitude', 'longitude')
+    for place_id, geohash, latitude, longitude in located.order_by('id').iterator(chunk_size=2000):
+        for precision in CLUSTER_PRECISIONS:
+            key = (precision, geohash[:precision])
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = [0, 0.0, 0.0, []]
+            cell[0] += 1
+            cell[1] += latitude
+            cell[2] += longitude
+            if len(cell[3]) < SAMPLE_SIZE:
+                cell[3].append(place_id)
+
+    with transaction.atomic():
+        PlaceCluster.objects.all().delete()
+        PlaceCluster.objects.bulk_create(
+            [
+                PlaceCluster(
+                    precision=precision, geohash=geohash, count=count,
+                    latitude_sum=latitude_sum, longitude_sum=longitude_sum, place_ids=place_ids,
+                )
+                for (precision, geohash), (count, latitude_sum, longitude_sum, place_ids) in cells.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(cells)
+
+# --------------------------
+# Viewport queries
+# --------------------------
+def clusters_in_viewport(min_lat, min_lng, max_lat, max_lng, precision):
+    """
+    Returns the clusters of `precision` whose centroid lies in the viewport.
+    """
+    from base.models import PlaceCluster
+
+    cells = covering_cells(min_lat, min_lng, max_lat, max_lng)
+    queryset = PlaceCluster.objects.filter(precision=precision)
+    if len(cells[0]) >= precision:
+        # The viewport is smaller than a cluster cell: look the cells up directly.
+        queryset = queryset.filter(geohash__in={cell[:precision] for cell in cells})
+    else:
+        queryset = queryset.filter(geohash_filter(cells))
+
+    return [
+        cluster for cluster in queryset
+        if min_lat <= cluster.latitude <= max_lat and min_lng <= cluster.longitude <= max_lng
+    ]
@@ -0,0 +1,174 @@
+import logging
+from collections import defaultdict
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+COUNT_KEY = 'place-views:count:{}'  # pending views of one place
+SEQUENCE_KEY = 'place-views:sequence'  # last position of the dirty log
+DIRTY_KEY = 'place-views:dirty:{}'  # dirty log entry: a place id with pending views
+FLUSHED_KEY = 'place-views:flushed'  # dirty log position the last flush reached
+GAPS_KEY = 'place-views:gaps'  # log positions not yet written when the last flush ran
+FLUSH_LOCK_KEY = 'place-views:flush-lock'
+FLUSH_LOCK_TIMEOUT = 300  # seconds a flush may hold the lock
+
+# Backends whose data is private to one process: a flush run elsewhere would never see it.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+def _incr(cache, key, amount):
+    """Adds `amount` to a counter key, creating it if missing (atomic on Redis/Memcached)."""
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        if cache.add(key, amount, timeout=None):
+            return amount
+        return cache.incr(key, amount)
+
+class ViewCounter:
+    """
+    Write-behind counter for Place.views, buffered in the shared cache.
+
+    `increment()` adds to a per-place counter key in the cache, so request
+    threads never touch the database and every worker shares one buffer:
+    counts survive worker restarts, clean or not. A place whose counter
+    leaves zero is appended to a dirty log, which `flush()` reads to find
+    the pending places. Flushing is done out of band by the
+    `flush_place_views` command, as a handful of
+    `UPDATE ... SET views = views + n` statements.
+
+    The cache must be shared by every process: the file-based default is,
+    but its increments are not atomic, so production settings should point
+    CACHES at Redis or Memcached. With a process-local backend (local
+    memory, dummy) nothing is buffered and each view is written directly.
+
+    `cache` is a cache client, the default cache unless given.
+    """
+    def __init__(self, cache=None):
+        self._cache = cache
+
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else caches['default']
+
+    @property
+    def buffered(self):
+        """Whether the cache is shared between processes, so counts can be buffered in it."""
+        return not isinstance(self.cache, PROCESS_LOCAL_BACKENDS)
+
+    def increment(self, place_id, amount=1):
+        try:
+            if not self.buffered:
+                write_view_counts({place_id: amount})
+            elif _incr(self.cache, COUNT_KEY.format(place_id), amount) == amount:
+                self._mark_dirty(place_id)
+        except Exception:
+            # A lost view is not worth failing the read that counted it.
+            logger.exception("Counting a view of place %s failed.", place_id)
+
+    def _mark_dirty(self, place_id):
+        self.cache.set(DIRTY_KEY.format(_incr(self.cache, SEQUENCE_KEY, 1)), place_id, timeout=None)
+
+    def pending(self, place_ids):
+        """{place_id: pending views} for the given places."""
+        keys = {COUNT_KEY.format(pk): pk for pk in place_ids}
+        return {keys[key]: value for key, value in self.cache.get_many(list(keys)).items() if value}
+
+    def dirty_places(self):
+        """
+        Reads the dirty log since the last flush. Returns the place ids and
+        the log positions consumed; positions whose entry is not written yet
+        (an increment in flight) are kept for the next flush.
+        """
+        flushed = self.cache.get(FLUSHED_KEY, 0)
+        last = self.cache.get(SEQUENCE_KEY, 0)
+        positions = list(self.cache.get(GAPS_KEY, [])) + list(range(flushed + 1, last + 1))
+        place_ids, consumed, gaps = set(), [], []
+        for start in range(0, len(positions), 1000):
+            batch = positions[start:start + 1000]
+            entries = self.cache.get_many([DIRTY_KEY.format(position) for position in batch])
+            for position in batch:
+                place_id = entries.get(DIRTY_KEY.format(position))
+                if place_id is None:
+                    # Retried once: an entry still missing belongs to a
+                    # worker that died mid-increment (see `flush(all_places)`).
+                    if position > flushed:
+                        gaps.append(position)
+                else:
+                    place_ids.add(place_id)
+                    consumed.append(position)
+        return place_ids, consumed, gaps, last
+
+    def flush(self, all_places=False):
+        """
+        Moves every pending count into the database; returns the number of
+        places updated. Counters are decremented by what was read, so views
+        counted meanwhile stay pending; a failed write adds its counts back.
+        `all_places` checks the counter of every place instead of the dirty
+        log only, to recover counts whose log entry was lost. Only one flush
+        runs at a time; a concurrent call returns 0 right away.
+        """
+        if not self.cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+            return 0
+        try:
+            return self._flush(all_places)
+        finally:
+            self.cache.delete(FLUSH_LOCK_KEY)
+
+    def _flush(self, all_places):
+        from base.models import Place
+
+        place_ids, consumed, gaps, last = self.dirty_places()
+        if all_places:
+            place_ids = Place.objects.values_list('pk', flat=True).iterator(chunk_size=1000)
+        counts = {}
+        place_ids = list(place_ids)
+        for start in range(0, len(place_ids), 1000):
+            counts.update(self.pending(place_ids[start:start + 1000]))
+        for place_id, amount in counts.items():
+            if self.cache.decr(COUNT_KEY.format(place_id), amount) > 0:
+                self._mark_dirty(place_id)  # views counted since the read
+        if counts:
+            try:
+                write_view_counts(counts)
+            except Exception:
+                logger.exception("Flushing %d place view counts failed; keeping them for the next flush.", len(counts))
+                for place_id, amount in counts.items():
+                    if _incr(self.cache, COUNT_KEY.format(place_id), amount) == amount:
+                        self._mark_dirty(place_id)
+                raise
+        self.cache.set_many({FLUSHED_KEY: last, GAPS_KEY: gaps}, timeout=None)
+        self.cache.delete_many([DIRTY_KEY.format(position) for position in consumed])
+        return len(counts)
+
+def write_view_counts(counts, batch_size=500):
+    """
+    Adds `counts` ({place_id: views}) to Place.views, batching places that
+    received the same number of views into a single UPDATE, and records them
+    as PlaceViewEvent rows for the time-decayed rankings (base.rankings).
+    """
+    from base.models import Place, PlaceViewEvent
+
+    by_amount = defaultdict(list)
+    for place_id, amount in counts.items():
+        by_amount[amount].append(place_id)
+    with transaction.atomic():
+        for amount, place_ids in by_amount.items():
+            for start in range(0, len(place_ids), batch_size):
+                Place.objects.filter(pk__in=place_ids[start:start + batch_size]).update(views=F('views') + amount)
+        # Only places that still exist; a view can race a deletion.
+        existing = set()
+        place_ids = list(counts)
+        for start in range(0, len(place_ids), batch_size):
+            existing.update(Place.objects.filter(pk__in=place_ids[start:start + batch_size]).values_list('pk', flat=True))
+        now = timezone.now()
+        PlaceViewEvent.objects.bulk_create(
+            [PlaceViewEvent(place_id=place_id, count=counts[place_id], created_at=now) for place_id in existing],
+            batch_size=batch_size,
+        )
+
+view_counter = ViewCounter()
@@ -0,0 +1,159 @@
+import math
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells, stored on Place
+EARTH_RADIUS_KM = 6371.0088
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encodes a coordinate as a geohash string of `precision` characters.
+    Nearby points share long prefixes, so a prefix range on an indexed column
+    selects every point inside one cell.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+def cell_size(precision):
+    """Returns the (height, width) in degrees of a geohash cell."""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates, in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Returns (min_lat, min_lng, max_lat, max_lng) of a box containing the
+    circle of `radius_km` around the point, clamped to valid coordinates.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    d_lng = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+    return (
+        max(-90.0, latitude - d_lat),
+        max(-180.0, longitude - d_lng),
+        min(90.0, latitude + d_lat),
+        min(180.0, longitude + d_lng),
+    )
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, max_cells=16):
+    """
+    Returns the geohash cells covering the box, using the finest precision
+    that needs at most `max_cells` cells. Longitude wrap-around is not handled.
+    """
+    cells = [BASE32[i] for i in range(32)]
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        lat_start = int((min_lat + 90.0) // height)
+        lat_end = int((max_lat + 90.0) // height)
+        lng_start = int((min_lng + 180.0) // width)
+        lng_end = int((max_lng + 180.0) // width)
+        if (lat_end - lat_start + 1) * (lng_end - lng_start + 1) > max_cells:
+            continue
+        cells = set()
+        for lat_index in range(lat_start, lat_end + 1):
+            center_lat = min(90.0, -90.0 + (lat_index + 0.5) * height)
+            for lng_index in range(lng_start, lng_end + 1):
+                center_lng = min(180.0, -180.0 + (lng_index + 0.5) * width)
+                cells.add(encode_geohash(center_lat, center_lng, precision))
+        return sorted(cells)
+    return cells
+
+def prefix_upper_bound(prefix):
+    """
+    Returns the smallest string greater than every geohash starting with
+    `prefix`, so `prefix <= geohash < bound` can use a B-tree index on any
+    database (unlike LIKE, whose index use depends on collation settings).
+    Returns None when no such bound exists (a prefix of only 'z').
+    """
+    chars = list(prefix)
+    while chars:
+        position = BASE32.index(chars[-1])
+        if position + 1 < len(BASE32):
+            chars[-1] = BASE32[position + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+def geohash_filter(cells):
+    """
+    Returns a Q object matching rows whose `geohash` falls in any of `cells`,
+    expressed as index-friendly range comparisons.
+    """
+    condition = Q()
+    for cell in cells:
+        bound = prefix_upper_bound(cell)
+        clause = Q(geohash__gte=cell)
+        if bound is not None:
+            clause &= Q(geohash__lt=bound)
+        condition |= clause
+    return condition
+
+def within_box(queryset, min_lat, min_lng, max_lat, max_lng):
+    """
+    Filters `queryset` to rows located inside the box, using the geohash
+    cells covering it as an indexed prefilter.
+    """
+    return queryset.filter(
+        geohash_filter(covering_cells(min_lat, min_lng, max_lat, max_lng)),
+        latitude__gte=min_lat,
+        latitude__lte=max_lat,
+        longitude__gte=min_lng,
+        longitude__lte=max_lng,
+    )
+
+def find_nearby(queryset, latitude, longitude, radius_km, limit):
+    """
+    Returns up to `limit` (pk, distance_km) pairs from `queryset` within
+    `radius_km` of the point, nearest first.
+
+    Candidates are first narrowed with the indexed geohash cells covering the
+    search box and the latitude/longitude bounds, so only rows near the point
+    are read; exact haversine distances are then computed for those rows only.
+    """
+    box = bounding_box(latitude, longitude, radius_km)
+    candidates = within_box(queryset, *box).values_list('pk', 'latitude', 'longitude')
+
+    matches = []
+    for pk, lat, lng in candidates.iterator(chunk_size=2000):
+        distance = haversine_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            matches.append((distance, pk))
+    matches.sort()
+    return [(pk, distance) for distance, pk in matches[:limit]]
@@ -0,0 +1,31 @@
+import os
+from base.models import *
+from base.uploads import discard_temp_file
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Delete expired or finished upload sessions and their leftover temp files'
+
+    def handle(self, *args, **kwargs):
+        now = timezone.now()
+        sessions = UploadSession.objects.filter(expires_at__lte=now) | UploadSession.objects.exclude(status='open')
+        removed = 0
+        for session in sessions.iterator():
+            discard_temp_file(session)
+            removed += 1
+        sessions.delete()
+
+        # Temp files whose session row is gone.
+        orphans = 0
+        if os.path.isdir(settings.UPLOAD_TEMP_DIR):
+            # Listed before the rows are read: a session row is created before its file.
+            names = os.listdir(settings.UPLOAD_TEMP_DIR)
+            known = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+            for name in names:
+                stem, extension = os.path.splitext(name)
+                if extension == '.part' and stem not in known:
+                    os.remove(os.path.join(settings.UPLOAD_TEMP_DIR, name))
+                    orphans += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {removed} upload sessions and {orphans} orphaned temp files."))
@@ -0,0 +1,26 @@
+import time
+from base.counters import view_counter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Write the place views buffered in the shared cache to Place.views and the ranking events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Check the buffered count of every place, not only those in the dirty log'
+        )
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Keep running, flushing every PLACE_VIEWS_FLUSH_INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            places = view_counter.flush(all_places=options['all'])
+            self.stdout.write(self.style.SUCCESS(f"Flushed the views of {places} places."))
+            if not options['watch']:
+                return
+            options['all'] = False
+            time.sleep(settings.PLACE_VIEWS_FLUSH_INTERVAL)
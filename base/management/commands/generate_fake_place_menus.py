@@ -1,6 +1,9 @@
 import random
 from faker import Faker
 from base.models import *
+from base.menus import refresh_price_summaries
+from base.menu_search import index_menu_items
+from base import search, versioning
 from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
@@ -48,6 +51,11 @@ class Command(BaseCommand):
                 ))
 
             PlaceMenu.objects.bulk_create(menu_items)  # Bulk create to optimize database inserts
+            # bulk_create skips the signals keeping these up to date
+            refresh_price_summaries([place.pk])
+            index_menu_items([item.pk for item in menu_items])
+            search.schedule_reindex([place.pk])
+            versioning.bump(versioning.PLACE_MENUS)
             total_created += len(menu_items)
             self.stdout.write(self.style.SUCCESS(f"Added {len(menu_items)} menu items for {place.name}"))
 
@@ -0,0 +1,56 @@
+import os
+from base.models import *
+from base.placeholders import compute_placeholder
+from base.renditions import VERSION_KEYS
+from base import versioning
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+
+def _compute(job):
+    """Runs in a worker process: reads the file from disk, returns its placeholder."""
+    model_label, pk, image, paths = job
+    try:
+        path = next((path for path in paths if os.path.exists(path)), paths[-1])
+        return model_label, pk, image, compute_placeholder(path)
+    except Exception as exc:
+        return model_label, pk, image, exc
+
+class Command(BaseCommand):
+    help = (
+        'Compute the BlurHash placeholder and dominant colour of place and category images that '
+        'have none (or all with --all), decoding images in a pool of worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute placeholders of every image')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model in (PlaceImage, Category):
+            storage = model._meta.get_field('image').storage
+            rows = model.objects.exclude(image='').exclude(image__isnull=True)
+            if not options['all']:
+                rows = rows.filter(blurhash='')
+            for pk, image, renditions in rows.values_list('pk', 'image', 'renditions').iterator():
+                # Prefer the small rendition: the placeholder matches its crop and it decodes faster.
+                sources = [name for name in (renditions.get('thumbnail', {}).get('jpeg'), image) if name]
+                jobs.append((model._meta.label_lower, pk, image, [storage.path(name) for name in sources]))
+
+        done = failed = 0
+        touched = set()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for model_label, pk, image, result in executor.map(_compute, jobs, chunksize=16):
+                if isinstance(result, Exception):
+                    self.stderr.write(f"{model_label} {pk}: {result}")
+                    failed += 1
+                    continue
+                blurhash, dominant_color = result
+                model = PlaceImage if model_label == 'base.placeimage' else Category
+                # Skipped if the image was replaced meanwhile: its new renditions job computes it.
+                if model.objects.filter(pk=pk, image=image).update(blurhash=blurhash, dominant_color=dominant_color):
+                    touched.add(model_label)
+                done += 1
+        if touched:
+            versioning.bump(*(VERSION_KEYS[label] for label in touched))
+        self.stdout.write(self.style.SUCCESS(f"Computed {done} placeholders ({failed} failed)."))
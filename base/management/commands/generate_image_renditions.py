@@ -0,0 +1,57 @@
+import time
+from base.models import *
+from base.renditions import generate_renditions
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Generate the resized renditions of place and category images that are pending or failed (or all with --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate renditions of every image')
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_RENDITION_WORKERS, help='Images processed in parallel')
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Keep running as the rendition worker, processing newly pending images as they appear'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=settings.IMAGE_RENDITION_POLL_INTERVAL,
+            help='Seconds between polls for pending images with --watch'
+        )
+
+    def handle(self, *args, **options):
+        self._process(self._jobs(all_images=options['all'], statuses=('pending', 'failed')), options['workers'])
+        while options['watch']:
+            # Failed images are retried on the next run without --watch, not in a loop.
+            jobs = self._jobs(statuses=('pending',))
+            if jobs:
+                self._process(jobs, options['workers'])
+            else:
+                time.sleep(options['interval'])
+
+    def _jobs(self, all_images=False, statuses=()):
+        jobs = []
+        for model in (PlaceImage, Category):
+            rows = model.objects.all()
+            if not all_images:
+                rows = rows.filter(renditions_status__in=statuses)
+            jobs.extend((model._meta.label_lower, pk) for pk in rows.values_list('pk', flat=True))
+        return jobs
+
+    def _process(self, jobs, workers):
+        statuses = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for status in executor.map(self._generate, jobs):
+                statuses[status] = statuses.get(status, 0) + 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(jobs)} images: {statuses.get('ready', 0)} ready, {statuses.get('failed', 0)} failed."
+        ))
+
+    @staticmethod
+    def _generate(job):
+        try:
+            return generate_renditions(*job)
+        finally:
+            connections.close_all()
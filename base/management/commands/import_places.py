@@ -0,0 +1,195 @@
+import os
+import csv
+import json
+from itertools import islice
+from base.models import *
+from base import versioning
+from base.bulk import create_places
+from base.slugs import allocate_slugs
+from django.db import transaction
+from django.utils.text import slugify
+from django.core.management.base import BaseCommand, CommandError
+
+TEXT_FIELDS = ('description', 'province', 'district', 'sector', 'cell', 'village', 'address')
+
+class Command(BaseCommand):
+    help = (
+        "Import places from a CSV or JSONL file of any size. Columns/keys: name, description, "
+        "category (name or slug), tags (names or slugs; `|` separated in CSV, a list in JSONL), "
+        "province, district, sector, cell, village, address, latitude, longitude. "
+        "Progress is checkpointed per batch: running the command again resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Places written per transaction')
+        parser.add_argument('--create-missing', action='store_true', help='Create unknown categories and tags instead of skipping their records')
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint and import from the first record')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f"File not found: {path}")
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        batch_size = max(1, options['batch_size'])
+        self.create_missing = options['create_missing']
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=path)
+        if options['restart']:
+            checkpoint.position = checkpoint.imported = checkpoint.skipped = 0
+            checkpoint.save()
+        elif checkpoint.position:
+            self.stdout.write(f"Resuming after record {checkpoint.position} ({checkpoint.imported} imported so far).")
+
+        # Lookup maps: every category and tag by slug and by case-insensitive name.
+        self.categories = {}
+        for category in Category.objects.all():
+            self._remember(self.categories, category)
+        self.tags = {}
+        for tag in Tag.objects.all():
+            self._remember(self.tags, tag)
+
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            records = self._read(handle, file_format)
+            # Records before the checkpoint were handled by an earlier run.
+            for _ in islice(records, checkpoint.position):
+                pass
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                self._import_batch(checkpoint, batch)
+                self.stdout.write(
+                    f"Processed {checkpoint.position} records: {checkpoint.imported} imported, {checkpoint.skipped} skipped."
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Import finished: {checkpoint.imported} places imported, {checkpoint.skipped} records skipped."
+        ))
+
+    def _read(self, handle, file_format):
+        """Yields (line number, record dict or error message) without loading the file."""
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            for record in reader:
+                record = {key.strip(): value for key, value in record.items() if key}
+                if record.get('tags'):
+                    record['tags'] = record['tags'].split('|')
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield line_number, f"invalid JSON ({exc})"
+                    continue
+                yield line_number, record if isinstance(record, dict) else "expected a JSON object"
+
+    def _import_batch(self, checkpoint, batch):
+        rows = []
+        for line_number, record in batch:
+            data, error = self._parse(record) if isinstance(record, dict) else (None, record)
+            if error:
+                self.stderr.write(f"Line {line_number}: {error}; skipped.")
+                checkpoint.skipped += 1
+            else:
+                rows.append(data)
+
+        # Labels created by this batch are only looked up from here until it
+        # commits: if it rolls back, later batches must not reuse their ids.
+        categories, tags = {}, {}
+        with transaction.atomic():
+            if self.create_missing:
+                self._create_labels(rows, categories, tags)
+            validated = []
+            for data in rows:
+                data['category'] = self._lookup(self.categories, data['category'], categories) if data['category'] else None
+                data['tags'] = [tag for tag in (self._lookup(self.tags, name, tags) for name in data['tags']) if tag]
+                validated.append((None, data))
+            if validated:
+                create_places(validated)
+            checkpoint.position += len(batch)
+            checkpoint.imported += len(validated)
+            checkpoint.save()
+        self.categories.update(categories)
+        self.tags.update(tags)
+
+    def _parse(self, record):
+        """Returns (place data, None) for a valid record or (None, reason)."""
+        name = str(record.get('name') or '').strip()
+        if not name:
+            return None, "missing name"
+        data = {'name': name[:Place._meta.get_field('name').max_length]}
+        for field in TEXT_FIELDS:
+            value = str(record.get(field) or '').strip()
+            data[field] = value[:Place._meta.get_field(field).max_length] if value else None
+
+        for field, limit in (('latitude', 90), ('longitude', 180)):
+            value = record.get(field)
+            if value in (None, ''):
+                data[field] = None
+                continue
+            try:
+                data[field] = float(value)
+            except (TypeError, ValueError):
+                return None, f"invalid {field} {value!r}"
+            if not -limit <= data[field] <= limit:
+                return None, f"{field} {value!r} out of range"
+
+        # Cut to the stored length, so a long label matches the row it creates.
+        data['category'] = str(record.get('category') or '').strip()[:Category._meta.get_field('name').max_length]
+        tags = record.get('tags') or []
+        if isinstance(tags, str):
+            tags = [tags]
+        max_length = Tag._meta.get_field('name').max_length
+        data['tags'] = list(dict.fromkeys(str(tag).strip()[:max_length] for tag in tags if str(tag).strip()))
+
+        if not self.create_missing:
+            if data['category'] and self._lookup(self.categories, data['category']) is None:
+                return None, f"unknown category {data['category']!r}"
+            unknown = [tag for tag in data['tags'] if self._lookup(self.tags, tag) is None]
+            if unknown:
+                return None, f"unknown tags {', '.join(map(repr, unknown))}"
+        return data, None
+
+    def _create_labels(self, rows, categories, tags):
+        """
+        Creates the categories and tags a batch names that do not exist yet,
+        in bulk, and remembers them in `categories` and `tags` (the batch's
+        own lookups; names in rows are already cut to the field length).
+        """
+        for model, lookup, created, names in (
+            (Category, self.categories, categories, {row['category'] for row in rows if row['category']}),
+            (Tag, self.tags, tags, {tag for row in rows for tag in row['tags']}),
+        ):
+            missing = {}
+            for name in names:
+                if self._lookup(lookup, name, created) is None:
+                    missing.setdefault(name.casefold(), name)
+            if not missing:
+                continue
+            names = sorted(missing.values())
+            objects = [
+                model(name=name, slug=slug, **({'description': ''} if model is Category else {}))
+                for name, slug in zip(names, allocate_slugs(model, names))
+            ]
+            model.objects.bulk_create(objects)
+            versioning.bump(versioning.CATEGORIES if model is Category else versioning.TAGS)
+            for obj in objects:
+                self._remember(created, obj)
+
+    @staticmethod
+    def _remember(lookup, obj):
+        lookup[obj.slug] = obj
+        lookup[obj.name.casefold()] = obj
+
+    @staticmethod
+    def _lookup(lookup, value, pending=None):
+        for labels in (pending or {}, lookup):
+            found = labels.get(value.casefold()) or labels.get(slugify(value))
+            if found:
+                return found
+        return None
@@ -0,0 +1,12 @@
+from base.menu_search import rebuild_menu_index
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Rebuild the menu item dictionary and inverted index used by the cross-place menu search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of menu items indexed per batch')
+
+    def handle(self, *args, **options):
+        total = rebuild_menu_index(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Menu search index rebuilt for {total} menu items."))
@@ -0,0 +1,10 @@
+from base.models import *
+from base.clusters import rebuild_clusters
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated map clusters from the current places'
+
+    def handle(self, *args, **kwargs):
+        total = rebuild_clusters(Place, PlaceCluster)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} place clusters."))
@@ -0,0 +1,12 @@
+from base.search import rebuild_index
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all places'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of places indexed per batch')
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt for {total} places."))
@@ -0,0 +1,18 @@
+from base.models import *
+from base.menus import refresh_price_summaries
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized menu price summary (count, min, max, average, median) of every place'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Places recomputed per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        place_ids = list(Place.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(place_ids), batch_size):
+            with transaction.atomic():
+                refresh_price_summaries(place_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed the menu price summary of {len(place_ids)} places."))
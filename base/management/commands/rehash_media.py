@@ -0,0 +1,41 @@
+from base.models import *
+from base import versioning
+from base.storage import is_content_addressed
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = (
+        'Move place and category images stored before content-addressed storage into the '
+        'hashed layout, merging identical files. Renditions are kept as they are.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place')
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for model, version_key in ((PlaceImage, versioning.PLACE_IMAGES), (Category, versioning.CATEGORIES)):
+            changed = False
+            field = model._meta.get_field('image')
+            names = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True).distinct()
+            )
+            for name in list(names):
+                if is_content_addressed(name):
+                    continue
+                if not field.storage.exists(name):
+                    self.stderr.write(f"{model._meta.label}: {name} is missing; skipped.")
+                    missing += 1
+                    continue
+                with field.storage.open(name, 'rb') as file:
+                    stored = field.storage.save(name, file)
+                # update(): the bytes are unchanged, so renditions stay valid.
+                model.objects.filter(image=name).update(image=stored)
+                if not options['keep_originals'] and stored != name:
+                    field.storage.delete(name)
+                moved += 1
+                changed = True
+            if changed:
+                versioning.bump(version_key)
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} files into the hashed layout ({missing} missing)."))
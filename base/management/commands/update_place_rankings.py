@@ -0,0 +1,18 @@
+from base.counters import view_counter
+from base.rankings import update_rankings
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Fold new place views into the decayed scores and refresh the trending/popular rankings they affect'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every ranking list, not only those touched by new views',
+        )
+
+    def handle(self, *args, **kwargs):
+        view_counter.flush()  # include the views still buffered in the cache
+        places, lists = update_rankings(full=kwargs['full'])
+        self.stdout.write(self.style.SUCCESS(f"Rescored {places} places and rebuilt {lists} ranking lists."))
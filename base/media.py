@@ -0,0 +1,137 @@
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from base.storage import is_content_addressed
+
+mimetypes.add_type('image/webp', '.webp')
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # content-addressed names never change content
+BLOCK_SIZE = 64 * 1024
+
+def media_path(path):
+    """
+    The file on disk behind a media URL path, or None if it is outside
+    MEDIA_ROOT, outside the public directories or not a regular file.
+    """
+    top_level = path.split('/', 1)[0]
+    if top_level not in settings.MEDIA_PUBLIC_DIRECTORIES or any(part.startswith('.') for part in path.split('/')):
+        return None
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        return None
+    return full_path if os.path.isfile(full_path) else None
+
+def parse_range(header, size):
+    """
+    Returns (start, end) for a single satisfiable `bytes=` range, None when
+    the header should be ignored (absent, malformed or several ranges) and
+    False when it cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # "bytes=-500": the last 500 bytes.
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = file.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+def serveMedia(request, path):
+    """
+    Serves an uploaded file. Django only resolves and authorizes the path and
+    computes the validators; the bytes are handed to the front server with
+    X-Accel-Redirect (nginx) or X-Sendfile (Apache) when MEDIA_SENDFILE_BACKEND
+    is set. Otherwise a FileResponse streams the file, zero-copy through
+    wsgi.file_wrapper, honouring a single Range.
+
+    Content-addressed names (base.storage) are cached for a year as
+    immutable; other files for MEDIA_CACHE_MAX_AGE seconds.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    full_path = media_path(path)
+    if full_path is None:
+        raise Http404("Media file not found.")
+
+    stat = os.stat(full_path)
+    immutable = is_content_addressed(path)
+    if immutable:
+        etag = quote_etag(os.path.splitext(os.path.basename(path))[0])
+    else:
+        etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        backend = settings.MEDIA_SENDFILE_BACKEND
+        if backend == 'nginx':
+            # nginx serves the internal location, including Range requests.
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        elif backend == 'apache':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = _file_response(request, full_path, stat.st_size, content_type, etag)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(last_modified)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = (
+        f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable
+        else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    )
+    return response
+
+def _file_response(request, full_path, size, content_type, etag):
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if request.method == 'GET' and (not if_range or if_range == etag):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is not None:
+        start, end = byte_range
+        # Streamed in blocks: the file wrapper would send to the end of the file.
+        response = StreamingHttpResponse(_read_range(full_path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    return response
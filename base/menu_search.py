@@ -0,0 +1,171 @@
+import unicodedata
+from django.db import transaction
+from django.db.models import Min
+from base.geo import find_nearby
+from base.search import TOKEN_RE, MAX_QUERY_TOKENS
+
+# Cross-place menu search ("where can I get X under Y"). Every menu item is
+# broken into normalized words; base.MenuTerm holds each distinct word once
+# (the dictionary) and base.MenuPosting links words to the items containing
+# them, with the item's place and price copied alongside. A query expands its
+# words through the dictionary and reads postings from the (term, price)
+# index, so base_placemenu is never scanned.
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_PREFIX_TERMS = 50  # dictionary words a partially typed query word may stand for
+BATCH_SIZE = 500
+
+def _words(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [word[:MAX_TERM_LENGTH] for word in TOKEN_RE.findall(text) if len(word) >= MIN_TERM_LENGTH]
+
+def normalize_terms(text):
+    """The distinct dictionary words of `text`: lowercased, without accents."""
+    return set(_words(text))
+
+def query_terms(query):
+    """The distinct words of a user query, normalized like the index, in query order."""
+    return list(dict.fromkeys(_words(query)))[:MAX_QUERY_TOKENS]
+
+# --------------------------
+# Indexing
+# --------------------------
+def _term_ids(words):
+    """Maps each word to its MenuTerm id, adding the words the dictionary lacks."""
+    from base.models import MenuTerm
+
+    words = sorted(words)
+    ids = {}
+    for start in range(0, len(words), BATCH_SIZE):
+        batch = words[start:start + BATCH_SIZE]
+        ids.update(MenuTerm.objects.filter(term__in=batch).values_list('term', 'pk'))
+        missing = [word for word in batch if word not in ids]
+        if missing:
+            # Concurrent indexing may add the same words: keep whichever row won.
+            MenuTerm.objects.bulk_create([MenuTerm(term=word) for word in missing], ignore_conflicts=True)
+            ids.update(MenuTerm.objects.filter(term__in=missing).values_list('term', 'pk'))
+    return ids
+
+def index_menu_items(item_ids, batch_size=BATCH_SIZE):
+    """
+    (Re)builds the postings of the given menu items from their current name,
+    description, place and price. Deleted items need no call: their postings
+    are removed with them.
+    """
+    from base.models import MenuPosting, PlaceMenu
+
+    item_ids = sorted({pk for pk in item_ids if pk is not None})
+    for start in range(0, len(item_ids), batch_size):
+        batch = item_ids[start:start + batch_size]
+        items = PlaceMenu.objects.filter(pk__in=batch).values_list('pk', 'place_id', 'name', 'description', 'price')
+        documents = [
+            (pk, place_id, price, normalize_terms(f"{name} {description or ''}"))
+            for pk, place_id, name, description, price in items
+        ]
+        with transaction.atomic():
+            term_ids = _term_ids(set().union(*(words for *_, words in documents)))
+            MenuPosting.objects.filter(item_id__in=batch).delete()
+            MenuPosting.objects.bulk_create(
+                [
+                    MenuPosting(term_id=term_ids[word], item_id=pk, place_id=place_id, price=price)
+                    for pk, place_id, price, words in documents
+                    for word in words
+                ],
+                batch_size=batch_size,
+            )
+
+def rebuild_menu_index(batch_size=BATCH_SIZE, stdout=None):
+    """Clears the dictionary and postings and indexes every menu item in batches of ids."""
+    from base.models import MenuPosting, MenuTerm, PlaceMenu
+
+    MenuPosting.objects.all().delete()
+    MenuTerm.objects.all().delete()
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(PlaceMenu.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        index_menu_items(batch, batch_size=batch_size)
+        total += len(batch)
+        last_id = batch[-1]
+        if stdout is not None:
+            stdout.write(f"Indexed {total} menu items...")
+
+# --------------------------
+# Querying
+# --------------------------
+def expand_term(word):
+    """
+    Ids of the dictionary words starting with `word` (the word itself
+    first), read as a range of the unique term index.
+    """
+    from base.models import MenuTerm
+
+    upper = word[:-1] + chr(ord(word[-1]) + 1)
+    return list(
+        MenuTerm.objects.filter(term__gte=word, term__lt=upper)
+        .order_by('term').values_list('pk', flat=True)[:MAX_PREFIX_TERMS]
+    )
+
+def matching_postings(query, max_price=None, district=None, category_id=None):
+    """
+    The MenuPosting queryset of the items matching every word of `query`
+    (each as a word prefix) under the filters, or None when nothing can
+    match. The word with the fewest dictionary expansions drives the index
+    scan; the others are probed per item through the (term, item) key.
+    """
+    from base.models import MenuPosting
+
+    words = query_terms(query)
+    if not words:
+        return None
+    expansions = sorted((expand_term(word) for word in words), key=len)
+    if not expansions[0]:
+        return None
+    postings = MenuPosting.objects.filter(term_id__in=expansions[0])
+    for term_ids in expansions[1:]:
+        postings = postings.filter(item_id__in=MenuPosting.objects.filter(term_id__in=term_ids).values('item_id'))
+    if max_price is not None:
+        postings = postings.filter(price__lte=max_price)
+    if district:
+        postings = postings.filter(place__district=district)
+    if category_id is not None:
+        postings = postings.filter(place__category_id=category_id)
+    return postings
+
+def cheapest_items(postings, place_ids):
+    """Maps each of `place_ids` to the id of its cheapest item among `postings`."""
+    cheapest = {}
+    rows = postings.filter(place_id__in=place_ids).order_by('place_id', 'price', 'item_id').values_list('place_id', 'item_id')
+    for place_id, item_id in rows:
+        cheapest.setdefault(place_id, item_id)
+    return cheapest
+
+def search_menu_items(query, max_price=None, district=None, category_id=None, near=None, radius_km=None, limit=20, offset=0):
+    """
+    Returns (total, [(place_id, item_id, distance_km), ...]): the places
+    having an item that matches `query`, each with its cheapest matching
+    item. Places are ranked by that price, or nearest first when `near`
+    (latitude, longitude) is given, within `radius_km`; distance_km is None
+    when ranking by price.
+    """
+    postings = matching_postings(query, max_price=max_price, district=district, category_id=category_id)
+    if postings is None:
+        return 0, []
+
+    if near is None:
+        cheapest_first = postings.values('place_id').annotate(price=Min('price')).order_by('price', 'place_id')
+        total = cheapest_first.count()
+        page = [(row['place_id'], None) for row in cheapest_first[offset:offset + limit]]
+    else:
+        from base.models import Place
+
+        places = Place.objects.filter(pk__in=postings.values('place_id'))
+        nearest = find_nearby(places, near[0], near[1], radius_km, None)
+        total = len(nearest)
+        page = nearest[offset:offset + limit]
+
+    items = cheapest_items(postings, [place_id for place_id, _ in page])
+    return total, [(place_id, items[place_id], distance) for place_id, distance in page if place_id in items]
@@ -0,0 +1,120 @@
+import threading
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.db import transaction
+from rest_framework.exceptions import ParseError
+from base import versioning
+
+MENU_PREVIEW_SIZE = 5  # items embedded in the place detail response
+
+def parse_price(query_params, name):
+    """Reads a non-negative decimal price parameter, or None when absent."""
+    value = query_params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ParseError(f'Invalid {name} "{value}": expected a number.')
+    if not price.is_finite() or price < 0:
+        raise ParseError(f'Invalid {name} "{value}": expected a non-negative number.')
+    return price
+
+def parse_menu_filters(query_params):
+    """
+    Reads the menu filters from the query string: `min_price` and
+    `max_price` (inclusive) and `search`, a case-insensitive match on the
+    item name.
+    """
+    filters = {}
+    for name in ('min_price', 'max_price'):
+        price = parse_price(query_params, name)
+        if price is not None:
+            filters[name] = price
+    if 'min_price' in filters and 'max_price' in filters and filters['min_price'] > filters['max_price']:
+        raise ParseError('min_price cannot be greater than max_price.')
+    search = query_params.get('search', '').strip()
+    if search:
+        filters['search'] = search
+    return filters
+
+def apply_menu_filters(queryset, filters):
+    """
+    Applies `filters` to a PlaceMenu queryset of one place, where the
+    (place, price) and (place, name) indexes serve the price range and the
+    name ordering.
+    """
+    if 'min_price' in filters:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if 'search' in filters:
+        queryset = queryset.filter(name__icontains=filters['search'])
+    return queryset
+
+# --------------------------
+# Price summaries
+# --------------------------
+SUMMARY_FIELDS = ('menu_item_count', 'menu_price_min', 'menu_price_max', 'menu_price_avg', 'menu_price_median')
+CENT = Decimal('0.01')
+_pending = threading.local()
+
+def summarize_prices(prices):
+    """The summary fields for one place's menu prices, given in ascending order."""
+    count = len(prices)
+    if not count:
+        return {'menu_item_count': 0, **dict.fromkeys(SUMMARY_FIELDS[1:])}
+    middle = count // 2
+    median = prices[middle] if count % 2 else (prices[middle - 1] + prices[middle]) / 2
+    return {
+        'menu_item_count': count,
+        'menu_price_min': prices[0],
+        'menu_price_max': prices[-1],
+        'menu_price_avg': (sum(prices) / count).quantize(CENT, rounding=ROUND_HALF_UP),
+        'menu_price_median': median.quantize(CENT, rounding=ROUND_HALF_UP),
+    }
+
+def refresh_price_summaries(place_ids):
+    """
+    Recomputes the menu price summary of the given places. Their prices are
+    read in one query, in (place, price) index order, so the median needs no
+    sorting; the places are then written with bulk_update. A median cannot
+    be maintained from per-row deltas, so every write to a menu refreshes
+    its place this way, at the cost of one indexed range scan per place.
+    """
+    from base.models import Place, PlaceMenu
+
+    place_ids = sorted({pk for pk in place_ids if pk is not None})
+    if not place_ids:
+        return 0
+    prices = {pk: [] for pk in place_ids}
+    rows = (
+        PlaceMenu.objects.filter(place_id__in=place_ids)
+        .order_by('place_id', 'price').values_list('place_id', 'price')
+    )
+    for place_id, price in rows.iterator():
+        prices[place_id].append(price)
+    places = [Place(pk=pk, **summarize_prices(place_prices)) for pk, place_prices in prices.items()]
+    Place.objects.bulk_update(places, SUMMARY_FIELDS, batch_size=500)
+    # The summary is part of the place data (list filters, sort, cached responses).
+    versioning.bump(versioning.PLACES)
+    return len(places)
+
+def schedule_price_summaries(place_ids):
+    """
+    Refreshes the price summaries of the given places once the current
+    transaction commits (right away in autocommit mode), so a transaction
+    touching many menu rows refreshes each place once.
+    """
+    place_ids = [pk for pk in place_ids if pk is not None]
+    if not place_ids:
+        return
+    if getattr(_pending, 'place_ids', None) is None:
+        _pending.place_ids = set()
+    _pending.place_ids.update(place_ids)
+    transaction.on_commit(_flush_pending)
+
+def _flush_pending():
+    place_ids = getattr(_pending, 'place_ids', None)
+    _pending.place_ids = None
+    if place_ids:
+        refresh_price_summaries(place_ids)
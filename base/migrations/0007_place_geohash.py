@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from base.geo import encode_geohash
+
+    Place = apps.get_model('base', 'Place')
+    places = list(
+        Place.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude')
+    )
+    for place in places:
+        place.geohash = encode_geohash(place.latitude, place.longitude)
+    Place.objects.bulk_update(places, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_placemenu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
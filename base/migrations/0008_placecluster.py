@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+def build_clusters(apps, schema_editor):
+    from base.clusters import rebuild_clusters
+
+    rebuild_clusters(apps.get_model('base', 'Place'), apps.get_model('base', 'PlaceCluster'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_place_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('geohash', models.CharField(max_length=12)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+                ('place_ids', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'verbose_name_plural': 'Place Clusters',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='placecluster',
+            constraint=models.UniqueConstraint(fields=('precision', 'geohash'), name='unique_place_cluster_cell'),
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
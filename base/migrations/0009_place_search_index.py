@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from base.search import get_backend, build_document
+
+    Place = apps.get_model('base', 'Place')
+    backend = get_backend(schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        backend.create_schema(cursor)
+        places = Place.objects.select_related('category').prefetch_related('tags', 'menu_items').order_by('pk')
+        documents = {}
+        for place in places.iterator(chunk_size=500):
+            documents[place.pk] = build_document(place)
+            if len(documents) >= 500:
+                backend.upsert(cursor, documents)
+                documents = {}
+        if documents:
+            backend.upsert(cursor, documents)
+
+
+def drop_search_index(apps, schema_editor):
+    from base.search import get_backend
+
+    with schema_editor.connection.cursor() as cursor:
+        get_backend(schema_editor.connection).drop_schema(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_placecluster'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
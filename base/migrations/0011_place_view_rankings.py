@@ -0,0 +1,52 @@
+# Generated by Django 5.0 on 2026-10-18 09:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_dataversion_place_location_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceScore',
+            fields=[
+                ('place', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='base.place')),
+                ('trending', models.FloatField(db_index=True)),
+                ('popular', models.FloatField(db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlaceRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('trending', 'Trending'), ('popular', 'Popular')], max_length=10)),
+                ('scope', models.CharField(choices=[('global', 'Global'), ('district', 'District'), ('category', 'Category')], max_length=10)),
+                ('scope_value', models.CharField(blank=True, default='', max_length=255)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='base.place')),
+            ],
+            options={
+                'verbose_name_plural': 'Place Rankings',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlaceViewEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_events', to='base.place')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='placeranking',
+            constraint=models.UniqueConstraint(fields=('kind', 'scope', 'scope_value', 'rank'), name='unique_place_ranking_position'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='placemenu',
+            index=models.Index(fields=['place', 'name'], name='base_placemenu_place_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placemenu',
+            index=models.Index(fields=['place', 'price'], name='base_placemenu_place_price_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def backfill_menu_price_summary(apps, schema_editor):
+    from base.menus import SUMMARY_FIELDS, summarize_prices
+
+    Place = apps.get_model('base', 'Place')
+    PlaceMenu = apps.get_model('base', 'PlaceMenu')
+    prices = {}
+    for place_id, price in PlaceMenu.objects.order_by('place_id', 'price').values_list('place_id', 'price').iterator():
+        prices.setdefault(place_id, []).append(price)
+    places = [Place(pk=pk, **summarize_prices(place_prices)) for pk, place_prices in prices.items()]
+    Place.objects.bulk_update(places, SUMMARY_FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_place_menu_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='menu_item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='menu_price_avg',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='menu_price_max',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='menu_price_median',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='menu_price_min',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_menu_price_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_menu_index(apps, schema_editor):
+    from base.menu_search import normalize_terms
+
+    MenuTerm = apps.get_model('base', 'MenuTerm')
+    MenuPosting = apps.get_model('base', 'MenuPosting')
+    PlaceMenu = apps.get_model('base', 'PlaceMenu')
+    term_ids = {}
+    postings = []
+    items = PlaceMenu.objects.order_by('pk').values_list('pk', 'place_id', 'name', 'description', 'price')
+    for pk, place_id, name, description, price in items.iterator(chunk_size=2000):
+        for word in normalize_terms(f"{name} {description or ''}"):
+            if word not in term_ids:
+                term_ids[word] = MenuTerm.objects.create(term=word).pk
+            postings.append(MenuPosting(term_id=term_ids[word], item_id=pk, place_id=place_id, price=price))
+        if len(postings) >= 5000:
+            MenuPosting.objects.bulk_create(postings)
+            postings = []
+    MenuPosting.objects.bulk_create(postings)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_place_menu_price_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MenuPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='base.placemenu')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.place')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='base.menuterm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'price', 'place'], name='base_menuposting_price_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='menuposting',
+            constraint=models.UniqueConstraint(fields=('term', 'item'), name='unique_menu_posting'),
+        ),
+        migrations.RunPython(build_menu_index, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,14 @@
 import os
+import uuid
 import random
 from django.db import models
+from django.conf import settings
 from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.html import format_html
-from imagekit.processors import ResizeToFill
-from imagekit.models import ProcessedImageField
 from django.core.validators import RegexValidator, URLValidator, EmailValidator
+from base.geo import encode_geohash
+from base.slugs import save_with_unique_slug
 
 def category_image_path(instance, filename):
     base_filename, file_extension = os.path.splitext(filename)
@@ -19,32 +21,48 @@ def place_image_path(instance, filename):
     timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
     return f'places/place_{place_slug}_{timestamp}{file_extension}'
 
-class Category(models.Model):
+class ImageRenditionsMixin(models.Model):
+    """
+    Resized copies of `image` (see base.renditions) and a BlurHash/dominant
+    colour placeholder, generated after upload by the `generate_image_renditions`
+    worker. `renditions` maps a size name to its width, height and one stored
+    file per format, e.g.
+    {"card": {"width": 540, "height": 300, "webp": "...", "jpeg": "..."}}.
+    """
+    RENDITIONS_STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    renditions_status = models.CharField(max_length=10, choices=RENDITIONS_STATUS_CHOICES, default='pending', editable=False)
+    blurhash = models.CharField(max_length=64, blank=True, default='', editable=False)  # placeholder shown while loading (base.placeholders)
+    dominant_color = models.CharField(max_length=7, blank=True, default='', editable=False)  # "#rrggbb"
+
+    def rendition_url(self, name, file_format='jpeg'):
+        """URL of one rendition, falling back to the original until it exists."""
+        path = self.renditions.get(name, {}).get(file_format)
+        if path:
+            return self.image.storage.url(path)
+        return self.image.url if self.image else None
+
+    class Meta:
+        abstract = True
+
+class Category(ImageRenditionsMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField()
-    image = ProcessedImageField(
-        upload_to=category_image_path,
-        processors=[ResizeToFill(800, 800)],
-        options={'quality': 90},
-        null=True,
-        blank=True,
-    )
+    image = models.ImageField(upload_to=category_image_path, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def _generate_unique_slug(self):
-        """Generate a unique slug"""
-        base_slug = slugify(self.name)
-        slug = f"{base_slug}"
-        while Category.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}"
-        return slug
-
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self._generate_unique_slug()
-        super(Category, self).save(*args, **kwargs)
+        if self.slug:
+            super(Category, self).save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name, lambda: super(Category, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name if self.name else "Unnamed Category"
@@ -56,18 +74,11 @@ class Tag(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True, blank=True)
 
-    def _generate_unique_slug(self):
-        """Generate a unique slug"""
-        base_slug = slugify(self.name)
-        slug = base_slug
-        while Tag.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}"
-        return slug
-
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self._generate_unique_slug()
-        super(Tag, self).save(*args, **kwargs)
+        if self.slug:
+            super(Tag, self).save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name, lambda: super(Tag, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
@@ -89,45 +100,55 @@ class Place(models.Model):
     address = models.CharField(max_length=500, null=True, blank=True)
     latitude = models.FloatField(validators=[RegexValidator(regex=r'^-?([1-8]?\d(\.\d+)?|90(\.0+)?)$', message='Enter a valid latitude (-90 to 90).')], null=True, blank=True)
     longitude = models.FloatField(validators=[RegexValidator(regex=r'^-?((1[0-7]\d)|(\d{1,2}))(\.\d+)?$', message='Enter a valid longitude (-180 to 180).')], null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False, db_index=True)
     views = models.PositiveIntegerField(default=0)
+    # Summary of the menu prices, kept up to date from PlaceMenu (base.menus)
+    menu_item_count = models.PositiveIntegerField(default=0, editable=False)
+    menu_price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    menu_price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    menu_price_avg = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    menu_price_median = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def _generate_unique_slug(self):
-        """Generate a unique slug"""
-        base_slug = slugify(self.name)
-        slug = base_slug
-        while Place.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}"
-        return slug
+    def refresh_geohash(self):
+        """Recompute the indexed geohash cell used for proximity queries."""
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = None
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self._generate_unique_slug()
-        super(Place, self).save(*args, **kwargs)
+        self.refresh_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        if self.slug:
+            super(Place, self).save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name, lambda: super(Place, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
 
     class Meta:
         verbose_name_plural = "Places"
+        indexes = [
+            models.Index(fields=['province'], name='base_place_province_idx'),
+            models.Index(fields=['district'], name='base_place_district_idx'),
+            models.Index(fields=['sector'], name='base_place_sector_idx'),
+        ]
 
-class PlaceImage(models.Model):
+class PlaceImage(ImageRenditionsMixin, models.Model):
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="images")
-    image = ProcessedImageField(
-        upload_to=place_image_path,
-        processors=[ResizeToFill(1080, 600)],
-        options={'quality': 90},
-        null=True,
-        blank=True,
-    )
+    image = models.ImageField(upload_to=place_image_path, null=True, blank=True)
     caption = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def image_preview(self):
         """Display a thumbnail of the place image in the list view."""
         if self.image:
-            return format_html('<img src="{}" width="50" height="50" />', self.image.url)
+            return format_html('<img src="{}" width="50" height="50" />', self.rendition_url('thumbnail'))
         return "No image"
     image_preview.short_description = "Image Preview"
 
@@ -164,4 +185,197 @@ class PlaceMenu(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.name} - {self.place.name}"
\ No newline at end of file
+        return f"{self.name} - {self.place.name}"
+
+    class Meta:
+        indexes = [
+            # Menu listings are always scoped to one place and sorted or ranged on these.
+            models.Index(fields=['place', 'name'], name='base_placemenu_place_name_idx'),
+            models.Index(fields=['place', 'price'], name='base_placemenu_place_price_idx'),
+        ]
+
+class MenuTerm(models.Model):
+    """
+    One normalized word (lowercased, without accents) of the menu item
+    dictionary used by the cross-place menu search (see base.menu_search).
+    """
+    term = models.CharField(max_length=64, unique=True)
+
+    def __str__(self):
+        return self.term
+
+class MenuPosting(models.Model):
+    """
+    An entry of the menu inverted index: `item` has `term` in its name or
+    description. The item's place and price are copied here so a search is
+    filtered, grouped and ranked from the (term, price) index alone.
+    """
+    term = models.ForeignKey(MenuTerm, on_delete=models.CASCADE, related_name='postings')
+    item = models.ForeignKey(PlaceMenu, on_delete=models.CASCADE, related_name='search_postings')
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='+')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.term_id} -> {self.item_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'item'], name='unique_menu_posting'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'price', 'place'], name='base_menuposting_price_idx'),
+        ]
+
+class PlaceCluster(models.Model):
+    """
+    Number and coordinate sums of the places inside one geohash cell, kept for
+    every precision in base.clusters.CLUSTER_PRECISIONS so map viewports can be
+    served from a handful of pre-aggregated rows.
+    """
+    precision = models.PositiveSmallIntegerField()
+    geohash = models.CharField(max_length=12)
+    count = models.PositiveIntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    place_ids = models.JSONField(default=list, blank=True)
+
+    @property
+    def latitude(self):
+        return self.latitude_sum / self.count if self.count else None
+
+    @property
+    def longitude(self):
+        return self.longitude_sum / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.geohash} ({self.count} places)"
+
+    class Meta:
+        verbose_name_plural = "Place Clusters"
+        constraints = [
+            models.UniqueConstraint(fields=['precision', 'geohash'], name='unique_place_cluster_cell'),
+        ]
+
+class DataVersion(models.Model):
+    """
+    Change counter for one data set (e.g. "places"), bumped whenever a row
+    of it changes. Caches and HTTP validators derive their keys from these
+    counters (see base.versioning).
+    """
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+class PlaceViewEvent(models.Model):
+    """
+    Views of a place counted by one flush of base.counters.ViewCounter.
+    A queue consumed (and deleted) by the `update_place_rankings` command.
+    """
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='view_events')
+    count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.place_id}: {self.count} views at {self.created_at}"
+
+class PlaceScore(models.Model):
+    """
+    Time-decayed view scores of a place, stored as forward-decay logarithms
+    (see base.rankings) so only places with new views ever need updating.
+    """
+    place = models.OneToOneField(Place, on_delete=models.CASCADE, primary_key=True, related_name='score')
+    trending = models.FloatField(db_index=True)
+    popular = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.place_id}: trending {self.trending:.3f}, popular {self.popular:.3f}"
+
+class PlaceRanking(models.Model):
+    """
+    One position of a materialized top list, e.g. the 3rd trending place in
+    district "Gasabo". `scope_value` is empty for the global lists, the
+    district name or the category id otherwise.
+    """
+    KIND_CHOICES = (
+        ('trending', 'Trending'),
+        ('popular', 'Popular'),
+    )
+    SCOPE_CHOICES = (
+        ('global', 'Global'),
+        ('district', 'District'),
+        ('category', 'Category'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_value = models.CharField(max_length=255, blank=True, default='')
+    rank = models.PositiveIntegerField()
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='rankings')
+    score = models.FloatField()
+
+    def __str__(self):
+        return f"{self.kind} {self.scope} {self.scope_value} #{self.rank}: {self.place_id}"
+
+    class Meta:
+        verbose_name_plural = "Place Rankings"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'scope', 'scope_value', 'rank'], name='unique_place_ranking_position'),
+        ]
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a bulk import (see the `import_places` command), saved in the
+    same transaction as each imported batch so a resumed import neither
+    skips nor repeats records.
+    """
+    source = models.CharField(max_length=500, unique=True)
+    position = models.PositiveBigIntegerField(default=0)  # records consumed from the file
+    imported = models.PositiveBigIntegerField(default=0)
+    skipped = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.position}"
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable image upload (see base.uploads). Chunks are appended
+    to a temp file on disk at `offset`; once `size` bytes have arrived the
+    file becomes a PlaceImage, or the image of a Category.
+    """
+    TARGET_CHOICES = (
+        ('place_image', 'Place image'),
+        ('category_image', 'Category image'),
+    )
+    STATUS_CHOICES = (
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, null=True, blank=True, related_name="upload_sessions")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="upload_sessions")
+    caption = models.CharField(max_length=255, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # total bytes announced by the client
+    offset = models.PositiveBigIntegerField(default=0)  # bytes received so far
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    error = models.CharField(max_length=255, null=True, blank=True)
+    place_image = models.ForeignKey('PlaceImage', on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="upload_sessions")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.UPLOAD_TEMP_DIR, f'{self.pk}.part')
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
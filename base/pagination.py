@@ -0,0 +1,290 @@
+import json
+import base64
+from django.db.models import F, Q
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor (keyset) pagination.
+
+    Pages are located with a `WHERE (sort_key, id) > (last_sort_key, last_id)`
+    style filter instead of an OFFSET, so every page costs the same no matter
+    how deep the client scrolls, and rows inserted between requests never shift
+    or duplicate the page boundaries. `id` is always appended to the ordering
+    as a tie-breaker so the order is total and stable.
+
+    Subclasses declare the sort orders they accept in `orderings`, mapping the
+    public `?sort=` value to the model fields to order by (prefix with `-` for
+    descending). Rows whose sort key is NULL are kept and sorted last in
+    either direction; a cursor positioned on such a row carries `null` for
+    that key, which places it in the trailing block of NULLs.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    sort_query_param = 'sort'
+    orderings = {
+        'newest': ('-id',),
+    }
+    default_sort = 'newest'
+    invalid_cursor_message = 'Invalid cursor. Please restart pagination from the first page.'
+    invalid_sort_message = 'Invalid sort option "{sort}". Choose one of: {choices}.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns a list holding at most one page of objects from `queryset`.
+        Only `page_size + 1` rows are ever fetched from the database.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.sort = self.get_sort(request)
+        self.ordering = self.get_ordering(self.sort)
+        self.model = queryset.model
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor.get('r'))
+        position = cursor.get('p') if cursor else None
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*(self._order_by(field) for field in ordering))
+        loaded, deferred = queryset.query.deferred_loading
+        if loaded and not deferred:
+            # Sparse fieldsets restrict columns with only(); keep the sort keys
+            # loaded so building the cursor links does not hit the database.
+            queryset = queryset.only(*loaded, *(field.lstrip('-') for field in ordering))
+        if position is not None:
+            queryset = queryset.filter(self._position_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data, detail=None):
+        """
+        Returns the repo's usual `{"detail", "data"}` envelope extended with
+        the `next`/`previous` links and the effective sort and page size.
+        """
+        return Response(
+            self.get_paginated_data(data, detail),
+            status=status.HTTP_200_OK
+        )
+
+    def get_paginated_data(self, data, detail=None):
+        payload = {}
+        if detail is not None:
+            payload['detail'] = detail
+        payload.update({
+            'sort': self.sort,
+            'page_size': self.page_size,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'data': data,
+        })
+        return payload
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'detail': {'type': 'string'},
+                'sort': {'type': 'string', 'enum': list(self.orderings)},
+                'page_size': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'data': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_sort(self, request):
+        sort = request.query_params.get(self.sort_query_param) or self.default_sort
+        if sort not in self.orderings:
+            raise ParseError(self.invalid_sort_message.format(
+                sort=sort, choices=', '.join(self.orderings)
+            ))
+        return sort
+
+    def get_ordering(self, sort):
+        ordering = tuple(self.orderings[sort])
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            # Break ties on the primary key, in the direction of the last key.
+            ordering += ('-id',) if ordering[-1].startswith('-') else ('id',)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._build_link(self.page[0], reverse=True)
+
+    # --------------------------
+    # Cursor encoding
+    # --------------------------
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            payload['p'] = [
+                self._field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+    def _build_link(self, instance, reverse):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, self._field(field).attname)
+            position.append(self._field(field).value_to_string(instance) if value is not None else None)
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+        if self.sort == self.default_sort:
+            url = remove_query_param(url, self.sort_query_param)
+        return url
+
+    # --------------------------
+    # Keyset filtering
+    # --------------------------
+    def _field(self, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _order_by(self, field):
+        """
+        The order_by() term for `field`. NULLs of nullable fields sort last,
+        which a reversed (previous page) walk sees as first.
+        """
+        if not self._field(field).null:
+            return field
+        expression = F(field.lstrip('-'))
+        nulls = {'nulls_first': True} if self.reverse else {'nulls_last': True}
+        if field.startswith('-'):
+            return expression.desc(**nulls)
+        return expression.asc(**nulls)
+
+    def _position_filter(self, ordering, position):
+        """
+        Builds `(a > x) OR (a = x AND b > y) OR ...` for the given ordering,
+        which matches exactly the rows that come after `position`. With NULLs
+        sorted last, the rows after a non-NULL `x` include those where `a` is
+        NULL, and none come after a NULL `x` except by the later keys (the
+        other way round when walking backwards).
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            if value is None:
+                after = Q(**{f'{name}__isnull': False}) if self.reverse else None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__{lookup}': value})
+                if self._field(field).null and not self.reverse:
+                    after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        return condition
+
+class PlacePagination(KeysetPagination):
+    """
+    Cursor pagination for place listings.
+    Supports `?sort=newest` (default), `?sort=most_viewed`, `?sort=name`
+    and `?sort=price` / `?sort=-price` on the median menu price (places
+    without a priced menu come last in both price orders).
+    """
+    page_size = 20
+    max_page_size = 100
+    orderings = {
+        'newest': ('-created_at',),
+        'most_viewed': ('-views',),
+        'name': ('name',),
+        'price': ('menu_price_median',),
+        '-price': ('-menu_price_median',),
+    }
+    default_sort = 'newest'
+
+class PlaceImagePagination(KeysetPagination):
+    """
+    Cursor pagination for the images of a single Place, newest first.
+    """
+    page_size = 20
+    max_page_size = 100
+    orderings = {
+        'newest': ('-id',),
+        'oldest': ('id',),
+    }
+    default_sort = 'newest'
+
+class PlaceMenuPagination(KeysetPagination):
+    """
+    Cursor pagination for the menu of a single Place.
+    Supports `?sort=name` (default), `?sort=price` and `?sort=-price`.
+    """
+    page_size = 30
+    max_page_size = 100
+    orderings = {
+        'name': ('name',),
+        'price': ('price',),
+        '-price': ('-price',),
+    }
+    default_sort = 'name'
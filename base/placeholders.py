@@ -0,0 +1,84 @@
+import math
+from PIL import Image, ImageOps
+
+# BlurHash (https://blurha.sh): a few DCT components of the image, base83
+# encoded into a ~30 character string that clients decode into a blurred
+# preview while the real image loads.
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+COMPONENTS = (4, 3)  # (x, y): 4x3 gives a 28 character hash
+SAMPLE_SIZE = 32  # pixels per side the image is reduced to before encoding
+
+def _base83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - index - 1)) % 83] for index in range(length))
+
+def _srgb_to_linear(value):
+    value /= 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+def blurhash(image, components=COMPONENTS):
+    """Encodes an RGB PIL image (ideally already tiny) as a BlurHash string."""
+    x_components, y_components = components
+    width, height = image.size
+    linear = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in image.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = normalisation * cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pixel = linear[row + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            scale = 1 / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += _base83(0, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        quantised = [max(0, min(18, int(_sign_pow(value / maximum, 0.5) * 9 + 9.5))) for value in factor]
+        result += _base83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+def dominant_color(image):
+    """The most common colour of a few-colour quantization, as #rrggbb."""
+    quantized = image.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    return '#{:02x}{:02x}{:02x}'.format(*palette[index * 3:index * 3 + 3])
+
+def compute_placeholder(file):
+    """
+    Returns (blurhash, dominant colour) for an image file. JPEGs are decoded
+    at reduced scale (draft mode), so large photos stay cheap.
+    """
+    with Image.open(file) as image:
+        image.draft('RGB', (SAMPLE_SIZE * 4, SAMPLE_SIZE * 4))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+        return blurhash(image), dominant_color(image)
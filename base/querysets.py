@@ -0,0 +1,148 @@
+from django.db.models import Prefetch
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+def optimize_queryset(queryset, serializer, required_fields=()):
+    """
+    Applies the `select_related()`, `prefetch_related()` and `only()` calls
+    needed to render `serializer` over `queryset` with a constant number of
+    queries and without loading columns that are never rendered.
+
+    `serializer` may be a serializer class or an instance (instances are used
+    as-is, so any fields removed from them are not loaded). Only fields that
+    will actually be rendered are considered: write-only fields are skipped.
+
+    Single-valued relations (forward FK/one-to-one and reverse one-to-one) are
+    joined with `select_related()`; multi-valued ones (reverse FK and M2M) are
+    loaded with a `Prefetch` whose queryset is itself optimized for the nested
+    serializer. A serializer's `Meta.prefetch_ordering`, mapping one of its
+    relation names to an ordering tuple, controls the order of prefetched rows.
+
+    Columns are restricted with `only()` whenever every rendered field maps to
+    a model field; `required_fields` are always loaded on top of those.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    plan = _QueryPlan()
+    only = plan.collect(queryset.model, serializer, prefix='')
+    if only is not None:
+        plan.only = only + list(required_fields)
+    return plan.apply(queryset)
+
+class _QueryPlan:
+    """
+    Collects select_related paths, Prefetch objects and loaded columns for one queryset.
+    """
+    def __init__(self):
+        self.select_related = []
+        self.prefetches = {}
+        self.only = None
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetches:
+            queryset = queryset.prefetch_related(*self.prefetches.values())
+        if self.only:
+            queryset = queryset.only(*dict.fromkeys(self.only))
+        return queryset
+
+    def collect(self, model, serializer, prefix):
+        """
+        Plans every rendered field of `serializer` against `model`.
+        Returns the `only()` paths for this level, or None when some field
+        cannot be traced to a model column and every column must be loaded.
+        """
+        serializer = _unwrap(serializer)
+        orderings = getattr(getattr(serializer, 'Meta', None), 'prefetch_ordering', {})
+
+        only = [f'{prefix}{model._meta.pk.name}']
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            columns = self._collect_field(model, field, prefix, orderings)
+            if columns is None:
+                only = None
+            elif only is not None:
+                only.extend(columns)
+        return only
+
+    def _collect_field(self, model, field, prefix, orderings):
+        """
+        Plans a single field. Returns the columns it needs, or None if unknown.
+        """
+        if field.source == '*':
+            return None
+
+        current_model = model
+        path = prefix
+        columns = []
+        attrs = field.source_attrs
+        for index, attr in enumerate(attrs):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Properties, methods and annotations: nothing to plan, nothing safe to defer.
+                return None
+
+            is_last = index == len(attrs) - 1
+            lookup = f'{path}{attr}'
+
+            if not model_field.is_relation:
+                return columns + [lookup] if is_last else None
+
+            if model_field.many_to_many or model_field.one_to_many:
+                if not is_last:
+                    # Dotted sources through a multi-valued relation cannot be planned.
+                    return None
+                self._prefetch(lookup, attr, model_field, field, orderings)
+                return columns
+
+            if is_last and isinstance(field, serializers.PrimaryKeyRelatedField) and model_field.concrete:
+                # A forward FK rendered as a primary key only needs the local column.
+                return columns + [lookup]
+
+            if lookup not in self.select_related:
+                self.select_related.append(lookup)
+            path = f'{lookup}__'
+            current_model = model_field.related_model
+            if model_field.concrete:
+                columns.append(lookup)
+            else:
+                # Reverse one-to-one: load the related row's key and its FK back to us.
+                columns.append(f'{path}{current_model._meta.pk.name}')
+                columns.append(f'{path}{model_field.field.name}')
+
+        if not _is_nested(field):
+            # e.g. a StringRelatedField, whose rendering may touch any column.
+            return None
+        nested = self.collect(current_model, field, path)
+        if nested is None:
+            return None
+        return columns + nested
+
+    def _prefetch(self, lookup, attr, model_field, field, orderings):
+        related_queryset = model_field.related_model._default_manager.all()
+        ordering = orderings.get(attr)
+        if ordering:
+            related_queryset = related_queryset.order_by(*ordering)
+        nested = _nested_serializer(field)
+        if nested is not None:
+            # Reverse FKs need the FK column on the child to attach it to its parent.
+            required = (model_field.field.name,) if model_field.one_to_many else ()
+            related_queryset = optimize_queryset(related_queryset, nested, required_fields=required)
+        self.prefetches.setdefault(lookup, Prefetch(lookup, queryset=related_queryset))
+
+def _unwrap(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        return serializer.child
+    return serializer
+
+def _is_nested(field):
+    return isinstance(_unwrap(field), serializers.BaseSerializer)
+
+def _nested_serializer(field):
+    field = _unwrap(field)
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
@@ -0,0 +1,148 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+from base import versioning
+
+RANKING_KINDS = ('trending', 'popular')
+RANKING_SIZE = 50  # places kept per materialized list
+
+# Half-lives of a view's weight, in seconds. Stored scores are only
+# comparable under the half-lives they were built with.
+HALF_LIVES = {
+    'trending': 60 * 60 * 24,  # one day
+    'popular': 60 * 60 * 24 * 30,  # thirty days
+}
+
+# Forward decay: a view at time t is stored with weight 2 ** ((t - EPOCH) / half_life)
+# instead of decaying every stored score as time passes. Ordering by the
+# stored value equals ordering by the decayed score at any later moment, so
+# a place's score only changes when it gets new views. The weights grow
+# exponentially, hence scores are kept as natural logarithms.
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+def log_weight(kind, when, count=1):
+    """Log of the forward-decayed weight of `count` views at `when`."""
+    return math.log(count) + math.log(2) * (when - EPOCH).total_seconds() / HALF_LIVES[kind]
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) without overflow."""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+def current_score(kind, log_score, now=None):
+    """Decayed number of views a stored log score is worth at `now`."""
+    now = now or timezone.now()
+    return math.exp(log_score - log_weight(kind, now))
+
+# --------------------------
+# Scores
+# --------------------------
+def consume_view_events():
+    """
+    Folds pending PlaceViewEvent rows into PlaceScore and deletes them.
+    Returns the ids of the places whose scores changed.
+    """
+    from base.models import PlaceViewEvent, PlaceScore
+
+    with transaction.atomic():
+        last_id = PlaceViewEvent.objects.aggregate(last_id=Max('id'))['last_id']
+        if last_id is None:
+            return set()
+        events = PlaceViewEvent.objects.filter(id__lte=last_id)
+        # Events of the same place within one second decay identically.
+        rows = (
+            events.values('place_id', 'created_at')
+            .annotate(total=Sum('count'))
+            .values_list('place_id', 'created_at', 'total')
+            .order_by()
+        )
+        increments = {}
+        for place_id, created_at, total in rows.iterator(chunk_size=2000):
+            scores = increments.setdefault(place_id, {kind: None for kind in RANKING_KINDS})
+            for kind in RANKING_KINDS:
+                scores[kind] = log_add(scores[kind], log_weight(kind, created_at, total))
+
+        now = timezone.now()
+        existing = PlaceScore.objects.in_bulk(list(increments))
+        created, updated = [], []
+        for place_id, scores in increments.items():
+            score = existing.get(place_id)
+            if score is None:
+                created.append(PlaceScore(place_id=place_id, **scores))
+            else:
+                for kind in RANKING_KINDS:
+                    setattr(score, kind, log_add(getattr(score, kind), scores[kind]))
+                score.updated_at = now
+                updated.append(score)
+        PlaceScore.objects.bulk_create(created, batch_size=500)
+        PlaceScore.objects.bulk_update(updated, list(RANKING_KINDS) + ['updated_at'], batch_size=500)
+        events.delete()
+    return set(increments)
+
+# --------------------------
+# Materialized rankings
+# --------------------------
+def affected_scopes(place_ids):
+    """The (scope, scope_value) lists that can change when these places' scores change."""
+    from base.models import Place
+
+    scopes = {('global', '')}
+    rows = Place.objects.filter(pk__in=list(place_ids)).values_list('district', 'category_id').distinct()
+    for district, category_id in rows:
+        if district:
+            scopes.add(('district', district))
+        if category_id is not None:
+            scopes.add(('category', str(category_id)))
+    return scopes
+
+def all_scopes():
+    from base.models import Place, PlaceScore
+
+    scored = Place.objects.filter(pk__in=PlaceScore.objects.values('place_id'))
+    return affected_scopes(scored.values_list('pk', flat=True))
+
+def rebuild_rankings(scopes, size=RANKING_SIZE):
+    """Recomputes the trending and popular lists of every (scope, scope_value) in `scopes`."""
+    from base.models import PlaceScore, PlaceRanking
+
+    for scope, scope_value in scopes:
+        scores = PlaceScore.objects.all()
+        if scope == 'district':
+            scores = scores.filter(place__district=scope_value)
+        elif scope == 'category':
+            scores = scores.filter(place__category_id=int(scope_value))
+        with transaction.atomic():
+            PlaceRanking.objects.filter(scope=scope, scope_value=scope_value).delete()
+            rankings = []
+            for kind in RANKING_KINDS:
+                top = scores.order_by(f'-{kind}', 'place_id').values_list('place_id', kind)[:size]
+                rankings.extend(
+                    PlaceRanking(kind=kind, scope=scope, scope_value=scope_value, rank=rank, place_id=place_id, score=score)
+                    for rank, (place_id, score) in enumerate(top, start=1)
+                )
+            PlaceRanking.objects.bulk_create(rankings, batch_size=500)
+
+def update_rankings(full=False):
+    """
+    Consumes new view events and rebuilds the lists they affect (every list
+    when `full`, e.g. to pick up places that moved district or category).
+    Returns (places rescored, lists rebuilt).
+    """
+    from base.models import PlaceRanking
+
+    place_ids = consume_view_events()
+    if full:
+        scopes = all_scopes()
+        stale = set(PlaceRanking.objects.values_list('scope', 'scope_value').distinct()) - scopes
+        for scope, scope_value in stale:
+            PlaceRanking.objects.filter(scope=scope, scope_value=scope_value).delete()
+    else:
+        scopes = affected_scopes(place_ids) if place_ids else set()
+    rebuild_rankings(scopes)
+    if scopes:
+        versioning.bump(versioning.RANKINGS)
+    return len(place_ids), len(scopes)
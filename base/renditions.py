@@ -0,0 +1,108 @@
+import io
+import os
+import logging
+from PIL import Image, ImageOps
+from django.apps import apps
+from django.core.files.base import ContentFile
+from base import versioning
+from base.placeholders import compute_placeholder
+
+logger = logging.getLogger(__name__)
+
+# Renditions are generated out of band by the `generate_image_renditions`
+# command (run with --watch as a worker): saving an image only marks its row
+# 'pending', so web and command processes never write renditions themselves.
+
+# Sizes generated per model, as (width, height) cropped to fill.
+RENDITIONS = {
+    'base.placeimage': {
+        'thumbnail': (180, 100),
+        'card': (540, 300),
+        'full': (1080, 600),
+    },
+    'base.category': {
+        'thumbnail': (160, 160),
+        'card': (400, 400),
+        'full': (800, 800),
+    },
+}
+VERSION_KEYS = {
+    'base.placeimage': versioning.PLACE_IMAGES,
+    'base.category': versioning.CATEGORIES,
+}
+# (key in `renditions`, Pillow format, save options)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+def rendition_path(original, name, extension):
+    """
+    e.g. places/photo.jpg -> renditions/places/photo/card.webp, the name a
+    rendition is saved under (content-addressed storage only keeps its
+    `renditions/` directory and extension).
+    """
+    stem, _ = os.path.splitext(original)
+    return f'renditions/{stem}/{name}.{extension}'
+
+def render_image(file, sizes):
+    """
+    Yields (name, width, height, extension, bytes) for every size and format
+    of the image in `file`, honouring its EXIF orientation.
+    """
+    with Image.open(file) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'L'):
+            source = source.convert('RGB')
+        for name, (width, height) in sizes.items():
+            resized = ImageOps.fit(source, (width, height), Image.LANCZOS)
+            for extension, pillow_format, options in FORMATS:
+                buffer = io.BytesIO()
+                resized.save(buffer, pillow_format, **options)
+                yield name, width, height, extension, buffer.getvalue()
+
+def generate_renditions(model_label, pk):
+    """
+    Generates and stores every rendition of one row's image and its
+    placeholder, then records them on the row. The row is only updated if
+    its image did not change in the meantime. Returns the new status, or
+    None if the row is gone.
+    """
+    model = apps.get_model(model_label)
+    images = list(model._default_manager.filter(pk=pk).values_list('image', flat=True))
+    if not images:
+        return None
+    original = images[0] or ''
+    current = model._default_manager.filter(pk=pk, image=original)
+    if not original:
+        current.update(renditions={}, renditions_status='ready')
+        return 'ready'
+
+    # With content-addressed storage, another row using the same file already
+    # has the renditions of these exact bytes.
+    generated = (
+        model._default_manager.filter(image=original, renditions_status='ready').exclude(pk=pk)
+        .exclude(blurhash='').values('renditions', 'blurhash', 'dominant_color').first()
+    )
+    if not generated:
+        renditions = {}
+        smallest = None
+        storage = model._meta.get_field('image').storage
+        try:
+            with storage.open(original, 'rb') as file:
+                for name, width, height, extension, content in render_image(file, RENDITIONS[model_label]):
+                    stored = storage.save(rendition_path(original, name, extension), ContentFile(content))
+                    renditions.setdefault(name, {'width': width, 'height': height})[extension] = stored
+                    if smallest is None and extension == 'jpeg':
+                        smallest = content
+            # The placeholder matches the crop of the renditions it stands in for.
+            blurhash, dominant_color = compute_placeholder(io.BytesIO(smallest))
+        except Exception:
+            logger.exception("Generating renditions of %s %s failed.", model_label, pk)
+            current.update(renditions_status='failed')
+            return 'failed'
+        generated = {'renditions': renditions, 'blurhash': blurhash, 'dominant_color': dominant_color}
+    if current.update(renditions_status='ready', **generated):
+        # Renditions are part of the serialized data: invalidate cached responses.
+        versioning.bump(VERSION_KEYS[model_label])
+    return 'ready'
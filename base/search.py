@@ -0,0 +1,278 @@
+import re
+import threading
+from django.db import connection, transaction
+from django.db.models import Q, Prefetch
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_QUERY_TOKENS = 8
+
+def tokenize(query):
+    """Splits a user query into at most MAX_QUERY_TOKENS word tokens."""
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TOKENS]
+
+def build_document(place):
+    """
+    Returns the searchable text of a place, split into weighted columns.
+    Works on historical models too, so migrations can build the index.
+    """
+    return {
+        'name': place.name or '',
+        'description': place.description or '',
+        'address': ' '.join(filter(None, [place.address, place.village, place.cell, place.sector, place.district, place.province])),
+        'category': place.category.name if place.category_id else '',
+        'tags': ' '.join(tag.name for tag in place.tags.all()),
+        'menu': ' '.join(
+            ' '.join(filter(None, [item.name, item.description])) for item in place.menu_items.all()
+        ),
+    }
+
+# --------------------------
+# Backends
+# --------------------------
+class SQLiteSearchBackend:
+    """SQLite FTS5 virtual table keyed by the place id (its rowid), ranked with bm25."""
+    table = 'base_place_fts'
+    # bm25 column weights: name, description, address, category, tags, menu
+    weights = (10.0, 2.0, 1.0, 5.0, 4.0, 1.0)
+
+    def create_schema(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            "name, description, address, category, tags, menu, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def upsert(self, cursor, documents):
+        self.delete(cursor, list(documents))
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, name, description, address, category, tags, menu) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [
+                (pk, doc['name'], doc['description'], doc['address'], doc['category'], doc['tags'], doc['menu'])
+                for pk, doc in documents.items()
+            ],
+        )
+
+    def delete(self, cursor, place_ids):
+        if place_ids:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN ({', '.join(['%s'] * len(place_ids))})",
+                list(place_ids),
+            )
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {self.table}")
+
+    def search(self, cursor, tokens, limit, offset):
+        match = ' '.join('"%s"*' % token for token in tokens)
+        cursor.execute(
+            f"SELECT rowid, bm25({self.table}, {', '.join(map(str, self.weights))}) AS score "
+            f"FROM {self.table} WHERE {self.table} MATCH %s ORDER BY score, rowid LIMIT %s OFFSET %s",
+            [match, limit, offset],
+        )
+        # bm25() is lower-is-better; expose higher-is-better scores.
+        return [(pk, -score) for pk, score in cursor.fetchall()]
+
+    def count(self, cursor, tokens):
+        match = ' '.join('"%s"*' % token for token in tokens)
+        cursor.execute(f"SELECT count(*) FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        return cursor.fetchone()[0]
+
+class PostgreSQLSearchBackend:
+    """A tsvector per place with a GIN index, ranked with ts_rank_cd."""
+    table = 'base_place_search'
+    config = 'simple'
+
+    def create_schema(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "place_id bigint PRIMARY KEY REFERENCES base_place (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_document_idx ON {self.table} USING GIN (document)"
+        )
+
+    def drop_schema(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def upsert(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {self.table} (place_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'C') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'D')) "
+            "ON CONFLICT (place_id) DO UPDATE SET document = EXCLUDED.document",
+            [
+                (
+                    pk,
+                    doc['name'],
+                    f"{doc['category']} {doc['tags']}",
+                    f"{doc['description']} {doc['menu']}",
+                    doc['address'],
+                )
+                for pk, doc in documents.items()
+            ],
+        )
+
+    def delete(self, cursor, place_ids):
+        if place_ids:
+            cursor.execute(f"DELETE FROM {self.table} WHERE place_id = ANY(%s)", [list(place_ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {self.table}")
+
+    def _tsquery(self, tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def search(self, cursor, tokens, limit, offset):
+        cursor.execute(
+            f"SELECT place_id, ts_rank_cd(document, query) AS score "
+            f"FROM {self.table}, to_tsquery('{self.config}', %s) query "
+            "WHERE document @@ query ORDER BY score DESC, place_id LIMIT %s OFFSET %s",
+            [self._tsquery(tokens), limit, offset],
+        )
+        return cursor.fetchall()
+
+    def count(self, cursor, tokens):
+        cursor.execute(
+            f"SELECT count(*) FROM {self.table} WHERE document @@ to_tsquery('{self.config}', %s)",
+            [self._tsquery(tokens)],
+        )
+        return cursor.fetchone()[0]
+
+class DatabaseSearchBackend:
+    """
+    Fallback for databases without a supported full-text engine: every token
+    must appear (case-insensitively) in one of the searchable fields.
+    Unindexed, so only suitable for small catalogues.
+    """
+    def create_schema(self, cursor):
+        pass
+
+    def drop_schema(self, cursor):
+        pass
+
+    def upsert(self, cursor, documents):
+        pass
+
+    def delete(self, cursor, place_ids):
+        pass
+
+    def clear(self, cursor):
+        pass
+
+    def _queryset(self, tokens):
+        from base.models import Place
+
+        queryset = Place.objects.all()
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(name__icontains=token) | Q(description__icontains=token) | Q(address__icontains=token)
+                | Q(category__name__icontains=token) | Q(tags__name__icontains=token)
+                | Q(menu_items__name__icontains=token)
+            )
+        return queryset.distinct()
+
+    def search(self, cursor, tokens, limit, offset):
+        pks = self._queryset(tokens).order_by('-views', 'id').values_list('pk', flat=True)[offset:offset + limit]
+        return [(pk, None) for pk in pks]
+
+    def count(self, cursor, tokens):
+        return self._queryset(tokens).count()
+
+def get_backend(conn=None):
+    vendor = (conn or connection).vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    if vendor == 'postgresql':
+        return PostgreSQLSearchBackend()
+    return DatabaseSearchBackend()
+
+# --------------------------
+# Indexing
+# --------------------------
+def index_places(place_ids, batch_size=500):
+    """
+    (Re)indexes the given places; ids that no longer exist are removed.
+    """
+    from base.models import Place, PlaceMenu
+
+    place_ids = list(set(place_ids))
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        for start in range(0, len(place_ids), batch_size):
+            batch = place_ids[start:start + batch_size]
+            places = (
+                Place.objects.filter(pk__in=batch)
+                .select_related('category')
+                .prefetch_related('tags', Prefetch('menu_items', queryset=PlaceMenu.objects.only('place_id', 'name', 'description')))
+            )
+            documents = {place.pk: build_document(place) for place in places}
+            backend.delete(cursor, [pk for pk in batch if pk not in documents])
+            if documents:
+                backend.upsert(cursor, documents)
+
+def remove_places(place_ids):
+    with connection.cursor() as cursor:
+        get_backend().delete(cursor, list(place_ids))
+
+def rebuild_index(batch_size=500, stdout=None):
+    """Clears the index and reindexes every place in batches of ids."""
+    from base.models import Place
+
+    with connection.cursor() as cursor:
+        get_backend().clear(cursor)
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(Place.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        index_places(batch, batch_size=batch_size)
+        total += len(batch)
+        last_id = batch[-1]
+        if stdout is not None:
+            stdout.write(f"Indexed {total} places...")
+
+_pending = threading.local()
+
+def schedule_reindex(place_ids):
+    """
+    Queues places for reindexing once the current transaction commits (or
+    right away in autocommit mode). Ids queued by several writes in the same
+    transaction are indexed together, once.
+    """
+    place_ids = [pk for pk in place_ids if pk is not None]
+    if not place_ids:
+        return
+    if getattr(_pending, 'place_ids', None) is None:
+        _pending.place_ids = set()
+    _pending.place_ids.update(place_ids)
+    transaction.on_commit(_flush_pending)
+
+def _flush_pending():
+    place_ids = getattr(_pending, 'place_ids', None)
+    _pending.place_ids = None
+    if place_ids:
+        index_places(place_ids)
+
+# --------------------------
+# Querying
+# --------------------------
+def search_places(query, limit=20, offset=0):
+    """
+    Returns (total, [(place_id, score), ...]) for the best matches of `query`.
+    Every token must match as a word prefix, so partially typed words still
+    find results.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return 0, []
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        return backend.count(cursor, tokens), backend.search(cursor, tokens, limit, offset)
@@ -1,5 +1,92 @@
+import os
 from base.models import *
+from django.conf import settings
+from django.core.validators import get_available_image_extensions
 from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+def parse_field_list(value):
+    """
+    Parses a comma separated `?fields=`/`?expand=` value into a nested dict,
+    e.g. "name,images.image" -> {"name": {}, "images": {"image": {}}}.
+    Returns None when the parameter is absent.
+    """
+    if value is None:
+        return None
+    spec = {}
+    for item in value.split(','):
+        node = spec
+        for part in item.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return spec
+
+def field_selection(request):
+    """
+    Reads the sparse fieldset parameters of a request into serializer kwargs.
+    """
+    return {
+        'fields': parse_field_list(request.query_params.get('fields')),
+        'expand': parse_field_list(request.query_params.get('expand')),
+    }
+
+class DynamicFieldsMixin:
+    """
+    Lets callers trim a ModelSerializer to the fields they need.
+
+    - `fields`: only the listed fields are rendered. Dotted names select
+      fields of nested serializers, e.g. `images.image`.
+    - `expand`: the listed `Meta.expandable_fields` are rendered as well.
+
+    Without either argument every field is rendered. Once either is given,
+    expandable (nested) fields are only rendered when listed in one of them.
+    Unknown names are ignored.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None and expand is None:
+            return
+
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        if fields is None:
+            fields = {name: {} for name in self.fields if name not in expandable}
+        else:
+            fields = dict(fields)
+        for name, nested in (expand or {}).items():
+            if name in expandable:
+                fields.setdefault(name, nested)
+        _select_fields(self, fields)
+
+def _select_fields(serializer, spec):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    for name in list(serializer.fields):
+        if name not in spec:
+            serializer.fields.pop(name)
+        elif spec[name] and isinstance(serializer.fields[name], serializers.BaseSerializer):
+            _select_fields(serializer.fields[name], spec[name])
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from `context['related_objects'][Model]` ({pk: instance},
+    loaded once for a whole batch by base.bulk) instead of one query per
+    value; behaves like PrimaryKeyRelatedField without that context.
+    """
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        objects = self.context.get('related_objects', {}).get(model)
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail('does_not_exist', pk_value=data)
+        return objects[pk]
 
 class RwandaLocationsSerializer(serializers.Serializer):
     """
@@ -17,23 +104,91 @@ class RwandaLocationsSerializer(serializers.Serializer):
     message = serializers.CharField()
     data = serializers.JSONField()
 
-class CategorySerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Category
-        fields = ['id', 'name', 'slug', 'description']
-
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
 
+class RenditionSetField(serializers.Field):
+    """
+    Renders the stored renditions of an image as a srcset-style map:
+    {"card": {"width": 540, "height": 300, "webp": <url>, "jpeg": <url>}, ...}.
+    Empty until the `generate_image_renditions` worker has processed the image.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = self.parent.Meta.model._meta.get_field('image').storage
+        return {
+            name: {key: storage.url(item) if key not in ('width', 'height') else item for key, item in rendition.items()}
+            for name, rendition in (value or {}).items()
+        }
+
+class CategorySerializer(serializers.ModelSerializer):
+    srcset = RenditionSetField(source='renditions')
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'description', 'image', 'srcset', 'blurhash', 'dominant_color']
+        read_only_fields = ['blurhash', 'dominant_color']
+
 class PlaceImageSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+    srcset = RenditionSetField(source='renditions')
+
     class Meta:
         model = PlaceImage
-        fields = ['id', 'place', 'image', 'caption', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'place', 'image', 'srcset', 'blurhash', 'dominant_color', 'caption', 'created_at']
+        read_only_fields = ['id', 'blurhash', 'dominant_color', 'created_at']
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Starts a chunked upload: `target` says what the finished image becomes
+    (a new image of `place`, or the image of `category`), `size` announces
+    the total number of bytes the chunks will add up to.
+    """
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id',
+            'target',
+            'place',
+            'category',
+            'caption',
+            'filename',
+            'size',
+            'offset',
+            'status',
+            'error',
+            'place_image',
+            'created_at',
+            'expires_at',
+        ]
+        read_only_fields = ['id', 'offset', 'status', 'error', 'place_image', 'created_at', 'expires_at']
+
+    def validate_filename(self, value):
+        extension = os.path.splitext(value)[1].lower().lstrip('.')
+        if extension not in get_available_image_extensions():
+            raise serializers.ValidationError(f"Unsupported image extension '{extension}'.")
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate(self, attrs):
+        owner = 'place' if attrs['target'] == 'place_image' else 'category'
+        if not attrs.get(owner):
+            raise serializers.ValidationError({owner: [f"This field is required for a {attrs['target']} upload."]})
+        attrs['place' if owner == 'category' else 'category'] = None
+        return attrs
 
 class PlaceSocialMediaSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = PlaceSocialMedia
         fields = [
@@ -55,17 +210,24 @@ class PlaceMenuSerializer(serializers.ModelSerializer):
         model = PlaceMenu
         fields = ['id', 'name', 'description', 'price']
 
-class PlaceSerializer(serializers.ModelSerializer):
+class BulkPlaceMenuSerializer(PlaceMenuSerializer):
+    """Menu item with its place, for batches spanning several places."""
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+    class Meta(PlaceMenuSerializer.Meta):
+        fields = ['id', 'place', 'name', 'description', 'price']
+
+class PlaceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category_detail = CategorySerializer(source='category', read_only=True)
     tags_detail = TagSerializer(source='tags', many=True, read_only=True)
     images = PlaceImageSerializer(read_only=True, many=True)
     social_medias = PlaceSocialMediaSerializer(source='social_media', read_only=True)
     menu_items = PlaceMenuSerializer(many=True, read_only=True)  # ✅ FIXED: Removed `source` argument
 
-    category = serializers.PrimaryKeyRelatedField(
+    category = PrefetchedPrimaryKeyRelatedField(
         queryset=Category.objects.all(), write_only=True, required=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PrefetchedPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True, write_only=True, required=False
     )
 
@@ -89,10 +251,22 @@ class PlaceSerializer(serializers.ModelSerializer):
             'latitude',
             'longitude',
             'views',
+            'menu_item_count',
+            'menu_price_min',
+            'menu_price_max',
+            'menu_price_avg',
+            'menu_price_median',
             'created_at',
             'updated_at',
             'images',
             'social_medias',
             'menu_items',  # ✅ FIXED: Now correctly retrieving place menu
         ]
-        read_only_fields = ['slug', 'views', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['slug', 'views', 'created_at', 'updated_at']
+        # Nested fields only rendered on request once `fields`/`expand` is used.
+        expandable_fields = ['category_detail', 'tags_detail', 'images', 'social_medias', 'menu_items']
+        # Ordering applied to nested lists when they are prefetched (see base.querysets).
+        prefetch_ordering = {
+            'images': ('id',),
+            'menu_items': ('name', 'id'),
+        }
\ No newline at end of file
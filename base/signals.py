@@ -0,0 +1,183 @@
+from base.models import *
+from base import clusters, menu_search, menus, search, versioning
+from django.dispatch import receiver
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
+
+# --------------------------
+# Map clusters
+# --------------------------
+_UNKNOWN = object()
+
+@receiver(post_init, sender=Place)
+def remember_place_location(sender, instance, **kwargs):
+    """Keep the location the row was loaded with, to detect moves on save."""
+    instance._clustered_location = _location(instance)
+
+@receiver(pre_save, sender=Place)
+@receiver(pre_delete, sender=Place)
+def load_previous_place_location(sender, instance, raw=False, **kwargs):
+    """Rows loaded with only()/defer() do not know their location yet: read it before it changes."""
+    if raw or instance._state.adding or getattr(instance, '_clustered_location', None) is not _UNKNOWN:
+        return
+    row = Place.objects.filter(pk=instance.pk).values_list('geohash', 'latitude', 'longitude').first()
+    instance._clustered_location = row if row and all(value is not None for value in row) else None
+
+@receiver(post_save, sender=Place)
+def update_place_clusters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_clustered_location', None)
+    current = _location(instance)
+    if previous == current:
+        return
+    clusters.move_places([(instance.pk, previous, current)])
+    instance._clustered_location = current
+
+@receiver(post_delete, sender=Place)
+def remove_place_from_clusters(sender, instance, **kwargs):
+    location = getattr(instance, '_clustered_location', None)
+    if location is not None and location is not _UNKNOWN:
+        clusters.remove_place(instance.pk, *location)
+
+def _location(place):
+    """
+    Returns (geohash, latitude, longitude) for a located place, None for a
+    place without coordinates, or _UNKNOWN when those fields are deferred.
+    """
+    fields = place.__dict__
+    if not {'geohash', 'latitude', 'longitude'} <= fields.keys():
+        return _UNKNOWN
+    geohash, latitude, longitude = fields['geohash'], fields['latitude'], fields['longitude']
+    if not geohash or latitude is None or longitude is None:
+        return None
+    return geohash, latitude, longitude
+
+# --------------------------
+# Full-text search index
+# --------------------------
+@receiver(post_save, sender=Place)
+def reindex_saved_place(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.schedule_reindex([instance.pk])
+
+@receiver(post_delete, sender=Place)
+def unindex_deleted_place(sender, instance, **kwargs):
+    search.remove_places([instance.pk])
+
+@receiver(m2m_changed, sender=Place.tags.through)
+def reindex_place_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        search.schedule_reindex([instance.pk])
+    elif action == 'pre_clear':
+        # The tag's places are only known before the clear.
+        search.schedule_reindex(instance.places.values_list('pk', flat=True))
+    elif pk_set:
+        search.schedule_reindex(pk_set)
+
+@receiver(post_save, sender=Category)
+def reindex_category_places(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search.schedule_reindex(Place.objects.filter(category=instance).values_list('pk', flat=True))
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_places(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search.schedule_reindex(instance.places.values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def reindex_places_of_deleted_label(sender, instance, **kwargs):
+    """Categories and tags are unlinked without per-place signals: capture their places first."""
+    if sender is Category:
+        place_ids = Place.objects.filter(category=instance).values_list('pk', flat=True)
+    else:
+        place_ids = instance.places.values_list('pk', flat=True)
+    search.schedule_reindex(list(place_ids))
+
+@receiver(post_save, sender=PlaceMenu)
+@receiver(post_delete, sender=PlaceMenu)
+def reindex_menu_place(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.schedule_reindex([instance.place_id])
+
+# --------------------------
+# Menu price summaries
+# --------------------------
+@receiver(post_init, sender=PlaceMenu)
+def remember_menu_place(sender, instance, **kwargs):
+    """Keep the place the item was loaded with: a move changes two summaries."""
+    instance._summarized_place_id = instance.__dict__.get('place_id')
+
+@receiver(post_save, sender=PlaceMenu)
+@receiver(post_delete, sender=PlaceMenu)
+def refresh_menu_price_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    place_ids = {instance.place_id, getattr(instance, '_summarized_place_id', None)}
+    instance._summarized_place_id = instance.place_id
+    menus.schedule_price_summaries(place_ids)
+
+# --------------------------
+# Menu search index
+# --------------------------
+@receiver(post_save, sender=PlaceMenu)
+def index_saved_menu_item(sender, instance, raw=False, **kwargs):
+    # Deleted items take their postings with them (on_delete=CASCADE).
+    if not raw:
+        menu_search.index_menu_items([instance.pk])
+
+# --------------------------
+# Image renditions
+# --------------------------
+@receiver(post_init, sender=PlaceImage)
+@receiver(post_init, sender=Category)
+def remember_image_name(sender, instance, **kwargs):
+    if 'image' not in instance.__dict__:
+        instance._rendered_image = _UNKNOWN
+        return
+    value = instance.__dict__['image']
+    instance._rendered_image = getattr(value, 'name', value) or ''
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_save, sender=Category)
+def render_uploaded_image(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Marks the renditions of a row saved with a different image as pending,
+    for the `generate_image_renditions` worker to pick up.
+    """
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    name = instance.image.name or ''
+    previous = getattr(instance, '_rendered_image', _UNKNOWN)
+    if not created and previous is not _UNKNOWN and (previous or '') == name:
+        return
+    instance._rendered_image = name
+    sender.objects.filter(pk=instance.pk).update(renditions={}, renditions_status='pending', blurhash='', dominant_color='')
+    instance.renditions, instance.renditions_status = {}, 'pending'
+    instance.blurhash = instance.dominant_color = ''
+
+# --------------------------
+# Data versions
+# --------------------------
+_VERSION_KEYS = {
+    Place: versioning.PLACES,
+    Category: versioning.CATEGORIES,
+    Tag: versioning.TAGS,
+    PlaceImage: versioning.PLACE_IMAGES,
+    PlaceSocialMedia: versioning.PLACE_SOCIAL_MEDIA,
+    PlaceMenu: versioning.PLACE_MENUS,
+}
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_data_version(sender, raw=False, **kwargs):
+    key = _VERSION_KEYS.get(sender)
+    if key is not None and not raw:
+        versioning.bump(key)
+
+@receiver(m2m_changed, sender=Place.tags.through)
+def bump_place_tags_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        versioning.bump(versioning.PLACES)
@@ -0,0 +1,71 @@
+import re
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+MAX_SUFFIX_LENGTH = 6  # room kept for "-<number>" within the field's max_length
+MAX_ATTEMPTS = 5  # saves retried when a concurrent insert takes the chosen slug
+
+def slug_base(model, name, field='slug'):
+    """The slugified name, cut so a numeric suffix still fits the field."""
+    max_length = model._meta.get_field(field).max_length
+    base = slugify(name)[:max_length - MAX_SUFFIX_LENGTH].strip('-')
+    return base or model._meta.model_name
+
+def allocate_slugs(model, names, field='slug'):
+    """
+    Returns a free slug for each of `names` (`name`, then `name-2`,
+    `name-3`, ...), distinct from each other and from the stored slugs.
+    The stored slugs sharing each prefix are read in one query per 100
+    distinct prefixes, so a whole batch costs about one query.
+    """
+    bases = [slug_base(model, name, field) for name in names]
+    distinct = sorted(set(bases))
+    next_number = {}
+    for start in range(0, len(distinct), 100):
+        chunk = distinct[start:start + 100]
+        condition = Q()
+        for base in chunk:
+            condition |= Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'})
+        patterns = {base: re.compile(rf'^{re.escape(base)}(?:-(\d+))?$') for base in chunk}
+        for slug in model._default_manager.filter(condition).values_list(field, flat=True).iterator():
+            for base, pattern in patterns.items():
+                match = pattern.match(slug)
+                if match:
+                    number = int(match.group(1)) if match.group(1) else 1
+                    next_number[base] = max(next_number.get(base, 1), number + 1)
+
+    slugs = []
+    assigned = set()
+    for base in bases:
+        number = next_number.get(base, 1)
+        slug = base if number == 1 else f'{base}-{number}'
+        # "name-2" may already be taken by another name of this batch.
+        while slug in assigned:
+            number += 1
+            slug = f'{base}-{number}'
+        next_number[base] = number + 1
+        assigned.add(slug)
+        slugs.append(slug)
+    return slugs
+
+def allocate_slug(model, name, field='slug'):
+    return allocate_slugs(model, [name], field)[0]
+
+def save_with_unique_slug(instance, name, save, field='slug'):
+    """
+    Calls `save()` after giving `instance` a free slug derived from `name`.
+    If a concurrent insert took the same slug first (IntegrityError on the
+    slug), a new one is allocated and the save retried.
+    """
+    model = type(instance)
+    for attempt in range(MAX_ATTEMPTS):
+        setattr(instance, field, allocate_slug(model, name, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            conflict = model._default_manager.filter(**{field: getattr(instance, field)}).exists()
+            if not conflict or attempt == MAX_ATTEMPTS - 1:
+                setattr(instance, field, '')
+                raise
@@ -0,0 +1,66 @@
+import os
+import re
+import uuid
+import hashlib
+from django.core.files.storage import FileSystemStorage
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.jpe': '.jpg', '.tif': '.tiff'}  # same bytes, same name
+
+def content_hash(content):
+    """SHA-256 of a File, read in chunks (from disk when it is a temp file)."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'temporary_file_path'):
+        with open(content.temporary_file_path(), 'rb') as file:
+            for block in iter(lambda: file.read(content.DEFAULT_CHUNK_SIZE), b''):
+                digest.update(block)
+    else:
+        for block in content.chunks():
+            digest.update(block)
+        content.seek(0)
+    return digest.hexdigest()
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its bytes, sharded by the first
+    two byte pairs of the hash: `places/whatever.jpg` is saved as
+    `places/3f/a2/3fa2…e9.jpg`. Only the top-level directory and extension of
+    the requested name are kept.
+
+    Saving bytes that are already stored writes nothing and returns the
+    existing name, so identical uploads share one file. A stored name never
+    changes content, which lets it be served with immutable cache headers.
+    Files may be shared between rows: never delete one because one row
+    stopped using it.
+    """
+    def hashed_name(self, name, digest):
+        prefix = name.replace('\\', '/').split('/', 1)[0] if '/' in name else ''
+        extension = os.path.splitext(name)[1].lower()
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        return '/'.join(part for part in (prefix, digest[:2], digest[2:4], f'{digest}{extension}') if part)
+
+    def get_available_name(self, name, max_length=None):
+        # A taken hash name already holds these bytes: it is the name to use.
+        if is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content_hash(content))
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name, then link it into place: the
+        # link fails if a concurrent save of the same bytes got there first,
+        # which counts as stored, and the hash name never shows a partial file.
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        try:
+            os.link(self.path(partial), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            self.delete(partial)
+        return name
+
+def is_content_addressed(name):
+    """Whether a stored name already follows the hashed layout."""
+    return bool(name) and HASH_PATTERN.match(os.path.splitext(os.path.basename(name))[0]) is not None
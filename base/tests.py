@@ -1,3 +1,752 @@
-from django.test import TestCase
+import io
+import os
+import json
+import fcntl
+import shutil
+import tempfile
+from unittest import mock
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.cache.backends.filebased import FileBasedCache
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from base.models import *
+from base import search, slugs
+from base.storage import ContentAddressedStorage, content_hash, is_content_addressed
+from base.clusters import rebuild_clusters
+from base.counters import FLUSH_LOCK_KEY, ViewCounter
+from base.management.commands import import_places
+from base.renditions import RENDITIONS
+from base.placeholders import BASE83, COMPONENTS, blurhash, compute_placeholder
 
-# Create your tests here.
+# --------------------------
+# Keyset pagination
+# --------------------------
+class KeysetPaginationTests(APITestCase):
+    url = '/api/places/'
+
+    def setUp(self):
+        cache.clear()
+        self.places = [Place.objects.create(name=name) for name in ['Echo', 'Alpha', 'Delta', 'Golf', 'Bravo', 'Foxtrot', 'Charlie']]
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([place['name'] for place in response.json()['data']])
+            url = response.json()['next']
+        return pages
+
+    def test_next_links_visit_every_place_once_in_order(self):
+        pages = self.walk(f'{self.url}?sort=name&page_size=3')
+        self.assertEqual(pages, [['Alpha', 'Bravo', 'Charlie'], ['Delta', 'Echo', 'Foxtrot'], ['Golf']])
+
+    def test_previous_link_returns_the_page_before(self):
+        first = self.client.get(f'{self.url}?sort=name&page_size=3').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual([place['name'] for place in previous['data']], ['Alpha', 'Bravo', 'Charlie'])
+        self.assertIsNone(previous['previous'])
+
+    def test_rows_inserted_between_requests_do_not_shift_pages(self):
+        first = self.client.get(f'{self.url}?page_size=3').json()
+        Place.objects.create(name='Hotel')
+        cache.clear()
+        rest = self.walk(first['next'])
+        ids = [place['id'] for place in first['data']]
+        names = [name for page in rest for name in page]
+        self.assertEqual(len(ids) + len(names), len(self.places))
+        self.assertNotIn('Hotel', names)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(f'{self.url}?page_size=1000')
+        self.assertEqual(response.json()['page_size'], 100)
+
+    def test_unknown_sort_is_rejected(self):
+        response = self.client.get(f'{self.url}?sort=random')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('random', response.json()['detail'])
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ['not-a-cursor', 'eyJwIjpbMV19']:  # the second is {"p":[1]}: one key short
+            response = self.client.get(f'{self.url}?sort=name&cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+    def test_price_sorts_keep_places_without_a_menu_last(self):
+        priced = {'Alpha': 12, 'Bravo': 5, 'Charlie': 8}
+        for place in self.places:
+            if place.name in priced:
+                Place.objects.filter(pk=place.pk).update(menu_price_median=priced[place.name])
+        unpriced = [place.name for place in self.places if place.name not in priced]  # in id order
+        pages = self.walk(f'{self.url}?sort=price&page_size=2')
+        self.assertEqual(sum(pages, []), ['Bravo', 'Charlie', 'Alpha'] + unpriced)
+        # Ties are broken on id in the direction of the sort.
+        pages = self.walk(f'{self.url}?sort=-price&page_size=2')
+        self.assertEqual(sum(pages, []), ['Alpha', 'Charlie', 'Bravo'] + unpriced[::-1])
+
+class PlaceListQueryTests(APITestCase):
+    """The place list costs the same number of queries whatever its page size."""
+    url = '/api/places/'
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Cafes', description='Coffee')
+        tags = [Tag.objects.create(name=name) for name in ['Wifi', 'Outdoor']]
+        for index in range(12):
+            place = Place.objects.create(name=f'Place {index}', category=category)
+            place.tags.set(tags)
+            PlaceImage.objects.create(place=place, image=f'places/{index}.jpg', caption='Front')
+            PlaceSocialMedia.objects.create(place=place, instagram=f'place{index}')
+            for price in [1500, 3000]:
+                PlaceMenu.objects.create(place=place, name=f'Item {price}', price=price)
+
+    def get(self, **params):
+        cache.clear()
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['data']
+
+    def test_nested_fields_are_prefetched(self):
+        for page_size in [2, 10]:
+            with self.assertNumQueries(11):
+                data = self.get(page_size=page_size)
+            self.assertEqual(len(data), page_size)
+            self.assertEqual(len(data[0]['tags_detail']), 2)
+            self.assertEqual(len(data[0]['images']), 1)
+            self.assertEqual(len(data[0]['menu_items']), 2)
+            self.assertEqual(data[0]['category_detail']['name'], 'Cafes')
+
+    def test_sparse_fieldsets_skip_unused_relations(self):
+        for page_size in [2, 10]:
+            with self.assertNumQueries(8):
+                data = self.get(page_size=page_size, fields='id,name,category_detail')
+            self.assertEqual(len(data), page_size)
+            self.assertEqual(set(data[0]), {'id', 'name', 'category_detail'})
+
+# --------------------------
+# Slugs
+# --------------------------
+class SlugAllocationTests(TestCase):
+    def test_next_free_suffix_follows_the_highest_taken(self):
+        for slug in ['cafe', 'cafe-2', 'cafe-10', 'cafeteria']:
+            Place.objects.create(name=slug, slug=slug)
+        self.assertEqual(Place.objects.create(name='Cafe').slug, 'cafe-11')
+        self.assertEqual(Place.objects.create(name='Cafeteria').slug, 'cafeteria-2')
+
+    def test_batch_gets_distinct_slugs(self):
+        Place.objects.create(name='Inzora')
+        self.assertEqual(
+            slugs.allocate_slugs(Place, ['Inzora', 'inzora', 'Inzora!', 'Question']),
+            ['inzora-2', 'inzora-3', 'inzora-4', 'question'],
+        )
+
+    def test_long_names_leave_room_for_the_suffix(self):
+        name = 'A very long place name ' * 5
+        first, second = Place.objects.create(name=name), Place.objects.create(name=name)
+        self.assertEqual(second.slug, f'{first.slug}-2')
+        self.assertLessEqual(len(second.slug), Place._meta.get_field('slug').max_length)
+
+    def test_save_retries_when_a_concurrent_insert_took_the_slug(self):
+        Place.objects.create(name='Inzora')
+        allocate = slugs.allocate_slug
+        # The first allocation misses the row inserted "concurrently" above.
+        with mock.patch.object(slugs, 'allocate_slug', side_effect=['inzora', allocate(Place, 'Inzora')]):
+            place = Place.objects.create(name='Inzora')
+        self.assertEqual(place.slug, 'inzora-2')
+
+    def test_tags_and_categories_with_colliding_names_get_suffixes(self):
+        for model, fields in [(Tag, {}), (Category, {'description': ''})]:
+            allocated = [model.objects.create(name=name, **fields).slug for name in ['Café', 'Cafe', 'CAFE!']]
+            self.assertEqual(allocated, ['cafe', 'cafe-2', 'cafe-3'], model.__name__)
+
+    def test_gives_up_after_max_attempts(self):
+        Place.objects.create(name='Inzora')
+        with mock.patch.object(slugs, 'allocate_slug', return_value='inzora'):
+            with self.assertRaises(IntegrityError):
+                Place.objects.create(name='Inzora')
+
+# --------------------------
+# View counts
+# --------------------------
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        # Web workers and the flush command each hold their own client of the shared cache.
+        self.counter = ViewCounter(FileBasedCache(location, {}))
+        self.flusher = ViewCounter(FileBasedCache(location, {}))
+        self.places = [Place.objects.create(name=name) for name in ['Inzora', 'Question']]
+
+    def test_flush_moves_buffered_counts_to_the_database(self):
+        for _ in range(3):
+            self.counter.increment(self.places[0].pk)
+        self.counter.increment(self.places[1].pk)
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).views, 0)
+        self.assertEqual(self.flusher.flush(), 2)
+        self.assertEqual(dict(Place.objects.values_list('name', 'views')), {'Inzora': 3, 'Question': 1})
+        self.assertEqual(PlaceViewEvent.objects.filter(place=self.places[0]).get().count, 3)
+        self.assertEqual(self.flusher.flush(), 0)
+
+    def test_views_counted_after_a_flush_stay_pending(self):
+        self.counter.increment(self.places[0].pk)
+        self.flusher.flush()
+        self.counter.increment(self.places[0].pk, 2)
+        self.assertEqual(self.flusher.pending([self.places[0].pk]), {self.places[0].pk: 2})
+        self.flusher.flush()
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).views, 3)
+
+    def test_failed_write_keeps_the_counts(self):
+        self.counter.increment(self.places[0].pk, 4)
+        with mock.patch('base.counters.write_view_counts', side_effect=RuntimeError), self.assertLogs('base.counters', 'ERROR'):
+            with self.assertRaises(RuntimeError):
+                self.flusher.flush()
+        self.assertEqual(self.flusher.flush(), 1)
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).views, 4)
+
+    def test_only_one_flush_runs_at_a_time(self):
+        self.counter.increment(self.places[0].pk)
+        self.counter.cache.add(FLUSH_LOCK_KEY, 1)
+        self.assertEqual(self.flusher.flush(), 0)
+        self.counter.cache.delete(FLUSH_LOCK_KEY)
+        self.assertEqual(self.flusher.flush(), 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_writes_views_directly(self):
+        counter = ViewCounter()
+        self.assertFalse(counter.buffered)
+        counter.increment(self.places[0].pk, 2)
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).views, 2)
+
+# --------------------------
+# Bulk endpoints
+# --------------------------
+class BulkPlacesTests(APITestCase):
+    url = '/api/admin/places/bulk/'
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='admin')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Cafes', description='Coffee')
+
+    def clusters(self):
+        return sorted(PlaceCluster.objects.values_list('precision', 'geohash', 'count'))
+
+    def test_invalid_item_rejects_the_whole_batch(self):
+        response = self.client.post(self.url, [
+            {'name': 'Inzora', 'category': self.category.pk},
+            {'category': self.category.pk},
+            {'name': 'Question', 'category': 999},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.json()['errors']], ['valid', 'invalid', 'invalid'])
+        self.assertFalse(Place.objects.exists())
+
+    def test_create_allocates_slugs_and_counts_clusters(self):
+        response = self.client.post(self.url, [
+            {'name': 'Inzora', 'latitude': -1.9536, 'longitude': 30.0927},
+            {'name': 'Inzora', 'latitude': -1.9441, 'longitude': 30.0619},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(sorted(Place.objects.values_list('slug', flat=True)), ['inzora', 'inzora-2'])
+        self.assertEqual(PlaceCluster.objects.get(precision=1).count, 2)
+
+    def test_update_moves_places_between_clusters(self):
+        places = [Place.objects.create(name=f'Place {index}', latitude=-1.95, longitude=30.06 + index / 100) for index in range(4)]
+        response = self.client.patch(self.url, [
+            {'id': places[0].pk, 'latitude': 51.5, 'longitude': -0.12},
+            {'id': places[1].pk, 'latitude': None, 'longitude': None},
+            {'id': places[2].pk, 'name': 'Renamed'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updated = self.clusters()
+        rebuild_clusters(Place, PlaceCluster)
+        self.assertEqual(updated, self.clusters())
+
+    def test_unknown_id_rejects_the_whole_update(self):
+        place = Place.objects.create(name='Inzora')
+        response = self.client.patch(self.url, [{'id': place.pk, 'name': 'Renamed'}, {'id': 999, 'name': 'Missing'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Place.objects.get(pk=place.pk).name, 'Inzora')
+
+    def test_delete_reports_each_id(self):
+        place = Place.objects.create(name='Inzora')
+        response = self.client.delete(self.url, [place.pk, 999], format='json')
+        self.assertEqual(response.json()['data'], [{'id': place.pk, 'status': 'deleted'}, {'id': 999, 'status': 'not_found'}])
+        self.assertFalse(Place.objects.exists())
+
+class BulkPlaceMenuTests(APITestCase):
+    url = '/api/admin/menu/bulk/'
+
+    def setUp(self):
+        self.client.force_authenticate(get_user_model().objects.create(username='admin'))
+        self.places = [Place.objects.create(name=name) for name in ['Inzora', 'Question']]
+
+    def test_invalid_item_reports_per_item_errors_and_writes_nothing(self):
+        response = self.client.post(self.url, [
+            {'place': self.places[0].pk, 'name': 'Brochette', 'price': '3000'},
+            {'place': self.places[1].pk, 'name': 'Cappuccino', 'price': 'cheap'},
+            {'place': 999, 'name': 'Samosa', 'price': '500'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()['errors']
+        self.assertEqual([result['status'] for result in errors], ['valid', 'invalid', 'invalid'])
+        self.assertIn('price', errors[1]['errors'])
+        self.assertIn('place', errors[2]['errors'])
+        self.assertFalse(PlaceMenu.objects.exists())
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).menu_item_count, 0)
+
+    def test_items_across_places_update_their_summaries(self):
+        response = self.client.post(self.url, [
+            {'place': self.places[0].pk, 'name': 'Brochette', 'price': '3000'},
+            {'place': self.places[0].pk, 'name': 'Chips', 'price': '1000'},
+            {'place': self.places[1].pk, 'name': 'Cappuccino', 'price': '2500'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        summaries = dict(Place.objects.values_list('name', 'menu_item_count'))
+        self.assertEqual(summaries, {'Inzora': 2, 'Question': 1})
+        self.assertEqual(Place.objects.get(pk=self.places[0].pk).menu_price_max, 3000)
+
+# --------------------------
+# Chunked uploads
+# --------------------------
+def png_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+class MediaTestMixin:
+    """Points MEDIA_ROOT and UPLOAD_TEMP_DIR at a temporary directory for each test."""
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=root, UPLOAD_TEMP_DIR=os.path.join(root, 'uploads'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = root
+
+class ChunkedUploadTests(MediaTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(get_user_model().objects.create(username='admin'))
+        self.place = Place.objects.create(name='Inzora')
+        self.content = png_bytes()
+
+    def start(self):
+        response = self.client.post('/api/admin/uploads/add/', {
+            'target': 'place_image', 'place': self.place.pk, 'filename': 'front.png', 'size': len(self.content),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['data']['id']
+
+    def send(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT', f'/api/admin/uploads/{upload_id}/chunk/', data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunks_assemble_the_image(self):
+        upload_id = self.start()
+        half = len(self.content) // 2
+        response = self.send(upload_id, 0, self.content[:half])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Upload-Offset'], str(half))
+        response = self.send(upload_id, half, self.content[half:])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = PlaceImage.objects.get(pk=response.json()['data']['result']['id'])
+        with image.image.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(image.renditions_status, 'pending')
+
+    def test_resume_from_the_reported_offset(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:100])
+        response = self.client.get(f'/api/admin/uploads/{upload_id}/')
+        self.assertEqual(response.json()['data']['offset'], 100)
+        # A retried chunk that was already received is refused with the offset to resume from.
+        response = self.send(upload_id, 0, self.content[:100])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['data']['offset'], 100)
+        response = self.send(upload_id, 100, self.content[100:])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_chunk_past_the_announced_size_is_rejected(self):
+        upload_id = self.start()
+        response = self.send(upload_id, 0, self.content + b'extra')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).offset, 0)
+
+    def test_chunk_is_refused_while_another_is_being_written(self):
+        upload_id = self.start()
+        session = UploadSession.objects.get(pk=upload_id)
+        with open(session.temp_path, 'r+b') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            response = self.send(upload_id, 0, self.content[:100])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('still being written', response.json()['detail'])
+        self.assertEqual(os.path.getsize(session.temp_path), 0)
+
+    def test_invalid_image_fails_the_upload(self):
+        upload_id = self.start()
+        response = self.send(upload_id, 0, b'x' * len(self.content))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'failed')
+        self.assertFalse(PlaceImage.objects.exists())
+
+# --------------------------
+# Content-addressed storage
+# --------------------------
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.root)
+        self.content = png_bytes()
+        self.digest = content_hash(ContentFile(self.content))
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.root)
+            for directory, _, names in os.walk(self.root) for name in names
+        )
+
+    def test_identical_uploads_are_stored_once_under_their_hash(self):
+        first = self.storage.save('places/photo.png', ContentFile(self.content))
+        second = self.storage.save('places/copy.PNG', ContentFile(self.content))
+        expected = f'places/{self.digest[:2]}/{self.digest[2:4]}/{self.digest}.png'
+        self.assertEqual((first, second), (expected, expected))
+        self.assertEqual(self.stored_files(), [expected])
+
+    def test_a_concurrent_identical_save_counts_as_stored(self):
+        name = self.storage.save('places/photo.png', ContentFile(self.content))
+        exists = ContentAddressedStorage.exists
+        raced = []
+
+        def racing_exists(storage, path):
+            # The second save looks for the hash name before the first one wrote it.
+            if is_content_addressed(path) and not raced:
+                raced.append(path)
+                return False
+            return exists(storage, path)
+
+        with mock.patch.object(ContentAddressedStorage, 'exists', racing_exists):
+            self.assertEqual(self.storage.save('places/photo.png', ContentFile(self.content)), name)
+        self.assertEqual(self.stored_files(), [name])
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), self.content)
+
+# --------------------------
+# Image renditions
+# --------------------------
+class InlineExecutor:
+    """Runs the worker's jobs one after the other in the test's own connection."""
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, function, jobs):
+        return map(function, jobs)
+
+@mock.patch('base.management.commands.generate_image_renditions.ThreadPoolExecutor', InlineExecutor)
+class ImageRenditionTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.place = Place.objects.create(name='Inzora')
+
+    def add_image(self, content):
+        image = PlaceImage(place=self.place)
+        image.image.save('front.png', ContentFile(content))
+        return image
+
+    def run_worker(self):
+        stdout = io.StringIO()
+        call_command('generate_image_renditions', workers=1, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_worker_renders_every_size_and_format_of_pending_images(self):
+        image = self.add_image(png_bytes((1200, 800)))
+        self.assertEqual(image.renditions_status, 'pending')
+        self.assertIn('1 ready, 0 failed', self.run_worker())
+
+        image.refresh_from_db()
+        self.assertEqual(image.renditions_status, 'ready')
+        self.assertEqual(set(image.renditions), set(RENDITIONS['base.placeimage']))
+        for name, (width, height) in RENDITIONS['base.placeimage'].items():
+            rendition = image.renditions[name]
+            self.assertEqual((rendition['width'], rendition['height']), (width, height))
+            for extension in ['webp', 'jpeg']:
+                with default_storage.open(rendition[extension]) as file, Image.open(file) as rendered:
+                    self.assertEqual(rendered.size, (width, height))
+        self.assertTrue(image.blurhash)
+        self.assertIn('0 ready, 0 failed', self.run_worker())  # nothing left pending
+
+    def test_images_sharing_a_file_reuse_its_renditions(self):
+        content = png_bytes()
+        first = self.add_image(content)
+        self.run_worker()
+        second = self.add_image(content)
+        with mock.patch('base.renditions.render_image', side_effect=AssertionError('rendered again')):
+            self.assertIn('1 ready, 0 failed', self.run_worker())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.renditions, first.renditions)
+
+    def test_unreadable_images_are_marked_failed(self):
+        image = self.add_image(b'not an image')
+        with self.assertLogs('base.renditions', 'ERROR'):
+            self.assertIn('0 ready, 1 failed', self.run_worker())
+        image.refresh_from_db()
+        self.assertEqual(image.renditions_status, 'failed')
+
+def decode_base83(text):
+    value = 0
+    for character in text:
+        value = value * 83 + BASE83.index(character)
+    return value
+
+class PlaceholderTests(TestCase):
+    def components(self, encoded):
+        flag = decode_base83(encoded[0])
+        return flag % 9 + 1, flag // 9 + 1
+
+    def test_blurhash_encodes_the_configured_components(self):
+        encoded, color = compute_placeholder(io.BytesIO(png_bytes()))
+        x, y = self.components(encoded)
+        self.assertEqual((x, y), COMPONENTS)
+        self.assertEqual(len(encoded), 4 + 2 * x * y)
+        # A single-colour image is all average colour, which is also the dominant one.
+        value = decode_base83(encoded[2:6])
+        self.assertEqual((value >> 16, value >> 8 & 255, value & 255), (200, 80, 40))
+        self.assertEqual(color, '#c85028')
+
+    def test_component_count_follows_the_request(self):
+        image = Image.open(io.BytesIO(png_bytes((32, 24)))).convert('RGB')
+        for components in [(1, 1), (3, 2), (9, 9)]:
+            encoded = blurhash(image, components)
+            self.assertEqual(self.components(encoded), components)
+            self.assertEqual(len(encoded), 4 + 2 * components[0] * components[1])
+
+# --------------------------
+# Media serving
+# --------------------------
+class ServeMediaTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 4
+        os.makedirs(os.path.join(self.media_root, 'places'))
+        with open(os.path.join(self.media_root, 'places', 'front.jpg'), 'wb') as file:
+            file.write(self.content)
+        self.url = '/media/places/front.jpg'
+
+    def test_full_response_carries_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_content_addressed_names_are_immutable(self):
+        digest = 'ab' * 32
+        os.makedirs(os.path.join(self.media_root, 'places', 'ab', 'ab'))
+        with open(os.path.join(self.media_root, 'places', 'ab', 'ab', f'{digest}.jpg'), 'wb') as file:
+            file.write(self.content)
+        response = self.client.get(f'/media/places/ab/ab/{digest}.jpg')
+        self.assertEqual(response['ETag'], f'"{digest}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_private_and_missing_paths_are_not_found(self):
+        os.makedirs(os.path.join(self.media_root, 'uploads'), exist_ok=True)
+        with open(os.path.join(self.media_root, 'uploads', 'partial.jpg'), 'wb') as file:
+            file.write(self.content)
+        for path in ['uploads/partial.jpg', 'places/.hidden.jpg', 'places/missing.jpg', 'places/../uploads/partial.jpg']:
+            self.assertEqual(self.client.get(f'/media/{path}').status_code, 404, path)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx')
+    def test_sendfile_hands_the_file_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'{settings.MEDIA_ACCEL_REDIRECT_PREFIX}places/front.jpg')
+        self.assertEqual(response.content, b'')
+
+# --------------------------
+# Place imports
+# --------------------------
+class ImportPlacesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'places.jsonl')
+        self.long_category = 'Restaurants serving grilled brochettes and fresh fish ' * 3  # longer than Category.name
+        records = [
+            {'name': 'Inzora', 'category': self.long_category, 'tags': ['Wifi']},
+            {'name': 'Question', 'category': 'Cafes', 'tags': ['Wifi', 'Terrace']},
+            {'name': 'Sundowner', 'category': 'Bars', 'tags': ['Terrace']},
+            {'name': 'Repub Lounge', 'category': self.long_category, 'tags': ['Live music']},
+        ]
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(record) + '\n' for record in records)
+
+    def run_import(self):
+        call_command('import_places', self.path, batch_size=2, create_missing=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_resume_after_a_failed_batch(self):
+        create_places = import_places.create_places
+        calls = []
+
+        def fail_second_batch(validated):
+            calls.append(len(validated))
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return create_places(validated)
+
+        with mock.patch.object(import_places, 'create_places', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.position, checkpoint.imported), (2, 2))
+        self.assertFalse(Category.objects.filter(name='Bars').exists())  # rolled back with its batch
+
+        self.run_import()
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.position, checkpoint.imported), (4, 4))
+        places = {place.name: place for place in Place.objects.select_related('category').prefetch_related('tags')}
+        self.assertEqual(sorted(places), ['Inzora', 'Question', 'Repub Lounge', 'Sundowner'])
+        self.assertEqual(places['Sundowner'].category.name, 'Bars')
+        self.assertEqual([tag.name for tag in places['Repub Lounge'].tags.all()], ['Live music'])
+        # The long category was cut to its field length once and matched on resume.
+        self.assertEqual(Category.objects.filter(name__startswith='Restaurants').count(), 1)
+        self.assertEqual(places['Inzora'].category_id, places['Repub Lounge'].category_id)
+
+    def test_rolled_back_labels_are_not_reused_by_later_batches(self):
+        command = import_places.Command(stdout=io.StringIO(), stderr=io.StringIO())
+        command.create_missing = True
+        command.categories, command.tags = {}, {}
+        checkpoint = ImportCheckpoint.objects.create(source=self.path)
+        batch = [(1, {'name': 'Sundowner', 'category': 'Bars', 'tags': ['Terrace']})]
+        with mock.patch.object(import_places, 'create_places', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                command._import_batch(checkpoint, batch)
+        self.assertEqual(command.categories, {})
+
+        command._import_batch(checkpoint, [(2, {'name': 'Meze Fresh', 'category': 'Bars', 'tags': ['Terrace']})])
+        place = Place.objects.get()
+        self.assertEqual(place.category, Category.objects.get(name='Bars'))
+        self.assertEqual(list(place.tags.values_list('name', flat=True)), ['Terrace'])
+
+# --------------------------
+# Map clusters
+# --------------------------
+class PlaceClusterTests(TestCase):
+    def totals(self, precision=None):
+        clusters = PlaceCluster.objects.all() if precision is None else PlaceCluster.objects.filter(precision=precision)
+        return {cluster.geohash: cluster.count for cluster in clusters}
+
+    def snapshot(self):
+        return {
+            (cluster.precision, cluster.geohash): (cluster.count, round(cluster.latitude, 9), round(cluster.longitude, 9))
+            for cluster in PlaceCluster.objects.all()
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_clusters(Place, PlaceCluster)
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_created_moved_and_deleted_places_update_the_totals(self):
+        kigali = Place.objects.create(name='Inzora', latitude=-1.95, longitude=30.06)
+        Place.objects.create(name='Question', latitude=-1.951, longitude=30.061)
+        Place.objects.create(name='Unlocated')
+        self.assertEqual(self.totals(4), {'kxtk': 2})
+        self.assertEqual(sum(self.totals(8).values()), 2)
+        self.assertMatchesRebuild()
+
+        kigali.latitude, kigali.longitude = -2.6, 29.74  # Huye
+        kigali.save()
+        self.assertEqual(self.totals(1), {'k': 2})
+        self.assertEqual(self.totals(4), {'kxtk': 1, 'kxt1': 1})
+        self.assertMatchesRebuild()
+
+        kigali.delete()
+        self.assertEqual(self.totals(4), {'kxtk': 1})
+        self.assertEqual(len(PlaceCluster.objects.filter(precision=8)), 1)
+        self.assertMatchesRebuild()
+
+        Place.objects.all().delete()
+        self.assertEqual(self.totals(), {})
+
+# --------------------------
+# Full-text search
+# --------------------------
+class PlaceSearchTests(TestCase):
+    def create_place(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Place.objects.create(**fields)
+
+    def found(self, query):
+        return [pk for pk, _ in search.search_places(query)[1]]
+
+    def test_places_are_searchable_once_their_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            place = Place.objects.create(name='Inzora Rooftop Cafe')
+            self.assertEqual(self.found('inzora'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.found('inzora'), [place.pk])
+
+    def test_name_matches_rank_above_description_and_menu_matches(self):
+        in_menu = self.create_place(name='Question Coffee')
+        with self.captureOnCommitCallbacks(execute=True):
+            PlaceMenu.objects.create(place=in_menu, name='Brochette', price=3000)
+        in_description = self.create_place(name='Meze Fresh', description='Grilled brochette every evening')
+        in_name = self.create_place(name='Brochette House')
+        self.assertEqual(self.found('brochette'), [in_name.pk, in_description.pk, in_menu.pk])
+
+    def test_partially_typed_words_match(self):
+        place = self.create_place(name='Sundowner Lounge')
+        self.assertEqual(self.found('sundo loun'), [place.pk])
+        self.assertEqual(self.found('sundo lounx'), [])
+
+    def test_deleted_places_leave_the_index(self):
+        place = self.create_place(name='Inzora Rooftop Cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            place.delete()
+        self.assertEqual(search.search_places('inzora'), (0, []))
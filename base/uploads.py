@@ -0,0 +1,168 @@
+import os
+import fcntl
+import logging
+from datetime import timedelta
+from PIL import Image
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024  # bytes read from the request and written to disk at a time
+
+class UploadError(Exception):
+    """Raised when a chunk or a finished upload cannot be accepted."""
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the upload currently ends."""
+    def __init__(self, offset, message=None):
+        super().__init__(message or f"Expected a chunk starting at offset {offset}.")
+        self.offset = offset
+
+class UploadInProgress(UploadOffsetMismatch):
+    """Raised when another request is still writing a chunk of the same upload."""
+    def __init__(self, offset):
+        super().__init__(offset, f"Another chunk of this upload is still being written; retry from offset {offset}.")
+
+class SessionFile(File):
+    """
+    The assembled file of an upload session. It exposes
+    temporary_file_path(), so FileSystemStorage moves it into MEDIA_ROOT
+    instead of copying it (other storages stream it in chunks).
+    """
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+def start_upload(**fields):
+    """Creates an upload session and its empty temp file."""
+    from base.models import UploadSession
+
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    session = UploadSession.objects.create(
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL), **fields
+    )
+    open(session.temp_path, 'wb').close()
+    return session
+
+def append_chunk(session, offset, stream, length):
+    """
+    Writes `length` bytes read from `stream` to the session's temp file at
+    `offset`, BLOCK_SIZE bytes at a time, so memory use does not depend on
+    the chunk size. Bytes written before the client disconnects still count:
+    the client asks for the offset and resumes from there.
+
+    The writer first takes an exclusive lock on the temp file and re-reads
+    the offset under it: a concurrent request for the same upload (e.g. a
+    retry while the first attempt is still in flight) gets UploadInProgress
+    instead of overwriting or truncating the bytes being written.
+
+    Returns the session, finalized if this chunk completed it.
+    """
+    from base.models import UploadSession
+
+    if offset != session.offset:
+        raise UploadOffsetMismatch(session.offset)
+    if offset + length > session.size:
+        raise UploadError(f"The chunk ends past the announced size of {session.size} bytes.")
+
+    try:
+        file = open(session.temp_path, 'r+b')
+    except FileNotFoundError:
+        raise UploadError("The upload's temporary file is missing; start a new upload.")
+    with file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadInProgress(session.offset)
+        # Only the lock holder moves the offset: what is recorded now stays valid until we release it.
+        session.refresh_from_db(fields=['offset', 'status'])
+        if session.status != 'open' or offset != session.offset:
+            raise UploadOffsetMismatch(session.offset)
+
+        written = 0
+        try:
+            file.seek(offset)
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                file.write(block)
+                written += len(block)
+        except OSError:
+            # Includes UnreadablePostError when the client goes away mid-chunk.
+            logger.warning("Upload %s interrupted at offset %s.", session.pk, offset + written)
+        # Drop any partial block: the file ends where the recorded offset will.
+        file.truncate(offset + written)
+        file.flush()
+
+        moved = UploadSession.objects.filter(pk=session.pk, status='open', offset=offset).update(
+            offset=offset + written, updated_at=timezone.now()
+        )
+        if not moved:
+            session.refresh_from_db()
+            raise UploadOffsetMismatch(session.offset)
+        session.offset = offset + written
+    if written < length:
+        raise UploadError(f"The chunk ended after {written} of {length} bytes.")
+    if session.offset == session.size:
+        finalize_upload(session)
+    return session
+
+def finalize_upload(session):
+    """
+    Turns a complete upload into a PlaceImage (or a Category's image) without
+    reading the file into memory: Pillow checks it from disk and the storage
+    moves it into place. Marks the session failed if the file is no image.
+    """
+    from base.models import PlaceImage, UploadSession
+
+    try:
+        with Image.open(session.temp_path) as image:
+            image.verify()
+    except Exception:
+        _fail(session, "The uploaded file is not a valid image.")
+        raise UploadError(session.error)
+
+    try:
+        with transaction.atomic(), SessionFile(session.temp_path, session.filename) as file:
+            if session.target == 'place_image':
+                place_image = PlaceImage(place=session.place, caption=session.caption)
+                place_image.image.save(session.filename, file, save=False)
+                place_image.save()
+                session.place_image = place_image
+            else:
+                category = session.category
+                category.image.save(session.filename, file, save=False)
+                category.save(update_fields=['image'])
+            session.status = 'complete'
+            UploadSession.objects.filter(pk=session.pk).update(
+                status='complete', place_image=session.place_image, updated_at=timezone.now()
+            )
+    except Exception:
+        # A stored file is left in place: under content-addressed storage it
+        # may be shared, and a retried upload reuses it.
+        _fail(session, "The upload could not be saved.")
+        raise
+    finally:
+        discard_temp_file(session)
+    return session
+
+def _fail(session, error):
+    from base.models import UploadSession
+
+    session.status = 'failed'
+    session.error = error
+    UploadSession.objects.filter(pk=session.pk).update(status='failed', error=error, updated_at=timezone.now())
+    discard_temp_file(session)
+
+def discard_temp_file(session):
+    try:
+        os.remove(session.temp_path)
+    except FileNotFoundError:
+        pass
@@ -8,16 +8,23 @@ app_name = 'base'
 urlpatterns = [
     path('places/', getPlaces, name='getPlaces'),
     path('place/add/', addPlace, name='addPlace'),
+    path('places/bulk/', bulkPlaces, name='bulkPlaces'),
     path('place/<int:pk>/', placeDetails, name='placeDetails'),
     path('place/<int:pk>/edit/', editPlace, name='editPlace'),
     path('place/<int:pk>/delete/', deletePlace, name='deletePlace'),
 
     path('place/<int:place_id>/images/', getPlaceImages, name='getPlaceImages'),
     path('place/<int:place_id>/images/add/', addPlaceImage, name='addPlaceImage'),
+    path('images/bulk/', bulkPlaceImages, name='bulkPlaceImages'),
     path('images/<int:pk>/', placeImageDetails, name='placeImageDetails'),
     path('images/<int:pk>/edit/', editPlaceImage, name='editPlaceImage'),
     path('images/<int:pk>/delete/', deletePlaceImage, name='deletePlace_Image'),
 
+    path('uploads/add/', startUpload, name='startUpload'),
+    path('uploads/<uuid:pk>/', uploadDetails, name='uploadDetails'),
+    path('uploads/<uuid:pk>/chunk/', uploadChunk, name='uploadChunk'),
+    path('uploads/<uuid:pk>/delete/', deleteUpload, name='deleteUpload'),
+
     path('places/<int:place_id>/social/', getPlaceSocialMedias, name='getPlaceSocialMedias'),
     path('places/<int:place_id>/social/add/', addPlaceSocialMedia, name='addPlaceSocialMedia'),
     path('social/<int:pk>/', placeSocialMediaDetails, name='placeSocialMediaDetails'),
@@ -32,14 +39,16 @@ urlpatterns = [
     
     path('tags/', getTags, name='getTags'),
     path('tag/add/', addTag, name='addTag'),
+    path('tags/bulk/', bulkTags, name='bulkTags'),
     path('tag/<int:pk>/', tagDetails, name='tagDetails'),
     path('tag/<int:pk>/edit/', editTag, name='editTag'),
     path('tag/<int:pk>/delete/', deleteTag, name='deleteTag'),
 
     path('place/<int:place_id>/menu/', getPlaceMenu, name='getPlaceMenu'),
     path('place/<int:place_id>/menu/add/', addPlaceMenuItem, name='addPlaceMenuItem'),
+    path('menu/bulk/', bulkPlaceMenu, name='bulkPlaceMenu'),
     path('menu/<int:pk>/', menuItemDetails, name='menuItemDetails'),
     path('menu/<int:pk>/edit/', editPlaceMenuItem, name='editPlaceMenuItem'),
     path('menu/<int:pk>/delete/', deletePlaceMenuItem, name='deletePlaceMenuItem'),
 
-]  + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]  + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
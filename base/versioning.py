@@ -0,0 +1,46 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+PLACES = 'places'
+CATEGORIES = 'categories'
+TAGS = 'tags'
+PLACE_IMAGES = 'place_images'
+PLACE_SOCIAL_MEDIA = 'place_social_media'
+PLACE_MENUS = 'place_menus'
+RANKINGS = 'rankings'
+
+# Everything a serialized Place depends on.
+PLACE_DATA = (PLACES, CATEGORIES, TAGS, PLACE_IMAGES, PLACE_SOCIAL_MEDIA, PLACE_MENUS)
+
+def bump(*keys):
+    """Increments the version of each data set in `keys`."""
+    from base.models import DataVersion
+
+    now = timezone.now()
+    for key in keys:
+        updated = DataVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    DataVersion.objects.create(key=key, version=1, updated_at=now)
+            except IntegrityError:
+                DataVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+
+def get_versions(*keys):
+    """
+    Returns {key: (version, updated_at)} for `keys` in one query. Data sets
+    that never changed are reported as version 0 with no timestamp.
+    """
+    from base.models import DataVersion
+
+    found = {
+        key: (version, updated_at)
+        for key, version, updated_at in DataVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+    }
+    return {key: found.get(key, (0, None)) for key in keys}
+
+def version_token(*keys):
+    """A compact string that changes whenever any of the data sets changes."""
+    versions = get_versions(*keys)
+    return '.'.join(str(versions[key][0]) for key in keys)
@@ -1,6 +1,17 @@
 import requests
 from base.models import *
 from base.serializers import *
+from base.querysets import optimize_queryset
+from base.menus import parse_menu_filters, apply_menu_filters
+from base.pagination import PlacePagination, PlaceImagePagination, PlaceMenuPagination
+from base.bulk import (
+    MAX_BULK_ITEMS, BulkValidationError, load_related, load_instances, validate_items, delete_objects,
+    create_places, update_places, create_place_images, create_tags, update_tags, create_menu_items, update_menu_items,
+)
+from base.uploads import UploadError, UploadOffsetMismatch, start_upload, append_chunk, discard_temp_file
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -257,17 +268,21 @@ def deleteTag(request, pk):
 @permission_classes([IsAuthenticated])
 def getPlaces(request):
     """
-    Retrieves all Place records with detailed information for category, tags,
-    place images, and social media records.
+    Retrieves one page of Place records with detailed information for category,
+    tags, place images, and social media records.
+    Supports cursor pagination through `?cursor=`, `?page_size=` and
+    `?sort=newest|most_viewed|name`, and sparse fieldsets through `?fields=`
+    (e.g. `name,category_detail.name,images.image`) and `?expand=`.
     """
-    places = Place.objects.all().order_by('-id')
-    serializer = PlaceSerializer(places, many=True)
-    return Response(
-        {
-            "detail": f"Successfully retrieved {len(serializer.data)} places with detailed info.",
-            "data": serializer.data
-        },
-        status=status.HTTP_200_OK
+    options = field_selection(request)
+    paginator = PlacePagination()
+    places = paginator.paginate_queryset(
+        optimize_queryset(Place.objects.all(), PlaceSerializer(**options)), request
+    )
+    serializer = PlaceSerializer(places, many=True, **options)
+    return paginator.get_paginated_response(
+        serializer.data,
+        detail=f"Successfully retrieved {len(places)} places with detailed info."
     )
 
 @api_view(['POST'])
@@ -300,9 +315,11 @@ def placeDetails(request, pk):
     """
     Retrieves detailed information for a specific Place along with its nested 
     category, tags, images, and social media records.
+    Supports sparse fieldsets through `?fields=` and `?expand=`.
     """
+    options = field_selection(request)
     try:
-        place = Place.objects.get(pk=pk)
+        place = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).get(pk=pk)
     except Place.DoesNotExist:
         return Response(
             {
@@ -310,7 +327,7 @@ def placeDetails(request, pk):
             },
             status=status.HTTP_404_NOT_FOUND
         )
-    serializer = PlaceSerializer(place)
+    serializer = PlaceSerializer(place, **options)
     return Response(
         {
             "detail": "Successfully retrieved comprehensive details for the selected Place.",
@@ -326,7 +343,7 @@ def editPlace(request, pk):
     Updates an existing Place record with the provided data.
     """
     try:
-        place = Place.objects.get(pk=pk)
+        place = optimize_queryset(Place.objects.all(), PlaceSerializer).get(pk=pk)
     except Place.DoesNotExist:
         return Response(
             {
@@ -382,16 +399,15 @@ def deletePlace(request, pk):
 @permission_classes([IsAuthenticated])
 def getPlaceImages(request, place_id):
     """
-    Retrieves all images for a given Place.
+    Retrieves one page of images for a given Place, newest first.
+    Supports cursor pagination through `?cursor=`, `?page_size=` and `?sort=newest|oldest`.
     """
-    images = PlaceImage.objects.filter(place__id=place_id).order_by('-id')
+    paginator = PlaceImagePagination()
+    images = paginator.paginate_queryset(PlaceImage.objects.filter(place__id=place_id), request)
     serializer = PlaceImageSerializer(images, many=True)
-    return Response(
-        {
-            "detail": f"Successfully retrieved {len(serializer.data)} images for Place id {place_id}.",
-            "data": serializer.data
-        },
-        status=status.HTTP_200_OK
+    return paginator.get_paginated_response(
+        serializer.data,
+        detail=f"Successfully retrieved {len(images)} images for Place id {place_id}."
     )
 
 @api_view(['POST'])
@@ -400,7 +416,8 @@ def addPlaceImage(request, place_id):
     """
     Adds a new image to a specified Place.
     """
-    data = request.data.copy()
+    # A shallow dict: QueryDict.copy() would deep-copy the uploaded file.
+    data = dict(request.data.items())
     data['place'] = place_id
     serializer = PlaceImageSerializer(data=data)
     if serializer.is_valid():
@@ -500,6 +517,142 @@ def deletePlaceImage(request, pk):
         status=status.HTTP_204_NO_CONTENT
     )
 
+# --------------------------
+# Chunked Image Upload Endpoints
+# --------------------------
+def _getUploadSession(request, pk):
+    """Returns (session, None) for an upload of the current user, or (None, error response)."""
+    try:
+        session = UploadSession.objects.get(pk=pk, created_by=request.user)
+    except UploadSession.DoesNotExist:
+        return None, Response(
+            {
+                "detail": f"Upload session {pk} not found."
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return session, None
+
+def _uploadResponse(session, detail, status_code):
+    data = UploadSessionSerializer(session).data
+    if session.status == 'complete':
+        if session.target == 'place_image':
+            data['result'] = PlaceImageSerializer(session.place_image).data
+        else:
+            data['result'] = CategorySerializer(session.category).data
+    response = Response({"detail": detail, "data": data}, status=status_code)
+    response['Upload-Offset'] = session.offset
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def startUpload(request):
+    """
+    Starts a chunked, resumable image upload for a place (`target`
+    "place_image" with `place` and optional `caption`) or a category
+    (`target` "category_image" with `category`), announcing the file's
+    `filename` and total `size` in bytes. The chunks are then sent to
+    uploadChunk.
+    """
+    serializer = UploadSessionSerializer(data=request.data)
+    if serializer.is_valid():
+        session = start_upload(created_by=request.user, **serializer.validated_data)
+        return _uploadResponse(session, "Upload started.", status.HTTP_201_CREATED)
+    return Response(
+        {
+            "detail": "Failed to start upload. Please check the input data.",
+            "errors": serializer.errors
+        },
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([IsAuthenticated])
+def uploadDetails(request, pk):
+    """
+    Returns the state of an upload. `offset` (also sent as the Upload-Offset
+    header) is where an interrupted upload resumes.
+    """
+    session, error = _getUploadSession(request, pk)
+    if error is not None:
+        return error
+    return _uploadResponse(session, "Upload retrieved successfully.", status.HTTP_200_OK)
+
+@api_view(['PUT', 'PATCH'])
+@permission_classes([IsAuthenticated])
+def uploadChunk(request, pk):
+    """
+    Appends the raw request body (Content-Type application/octet-stream) to an
+    upload at the offset given by the Upload-Offset header, which must equal
+    the upload's current offset. The body is streamed to disk, never held in
+    memory. The chunk completing the upload creates the image and returns it
+    as `result`. A 409 carries the offset to resume from, including when
+    another chunk of the same upload is still being written.
+    """
+    session, error = _getUploadSession(request, pk)
+    if error is not None:
+        return error
+    if session.status != 'open' or session.expires_at <= timezone.now():
+        return Response(
+            {
+                "detail": f"Upload session {pk} is {session.status if session.status != 'open' else 'expired'}; start a new upload."
+            },
+            status=status.HTTP_410_GONE
+        )
+    try:
+        offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (KeyError, ValueError):
+        return Response(
+            {
+                "detail": "The Upload-Offset and Content-Length headers are required."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not 0 < length <= settings.UPLOAD_CHUNK_MAX_SIZE:
+        return Response(
+            {
+                "detail": f"Chunks must be between 1 and {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        append_chunk(session, offset, request.stream, length)
+    except UploadOffsetMismatch as exc:
+        response = Response(
+            {
+                "detail": str(exc),
+                "data": {"offset": exc.offset}
+            },
+            status=status.HTTP_409_CONFLICT
+        )
+        response['Upload-Offset'] = exc.offset
+        return response
+    except UploadError as exc:
+        return _uploadResponse(session, str(exc), status.HTTP_400_BAD_REQUEST)
+    if session.status == 'complete':
+        return _uploadResponse(session, "Upload completed successfully.", status.HTTP_201_CREATED)
+    return _uploadResponse(session, "Chunk received.", status.HTTP_200_OK)
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def deleteUpload(request, pk):
+    """
+    Cancels an upload and removes its partial file.
+    """
+    session, error = _getUploadSession(request, pk)
+    if error is not None:
+        return error
+    discard_temp_file(session)
+    session.delete()
+    return Response(
+        {
+            "detail": f"Upload session {pk} has been deleted successfully."
+        },
+        status=status.HTTP_204_NO_CONTENT
+    )
+
 # --------------------------
 # PlaceSocialMedia CRUD Endpoints
 # --------------------------
@@ -629,23 +782,23 @@ def deletePlaceSocialMedia(request, pk):
 @permission_classes([IsAuthenticated])
 def getPlaceMenu(request, place_id):
     """
-    Retrieve all menu items for a specific Place.
+    Retrieve one page of menu items for a specific Place.
+    Supports cursor pagination through `?cursor=`, `?page_size=` and `?sort=name|price|-price`,
+    and filtering with `?min_price=`, `?max_price=` and `?search=`.
     """
-    try:
-        menu_items = PlaceMenu.objects.filter(place__id=place_id)
-        serializer = PlaceMenuSerializer(menu_items, many=True)
-        return Response(
-            {
-                "detail": f"Successfully retrieved {len(serializer.data)} menu items.",
-                "data": serializer.data
-            },
-            status=status.HTTP_200_OK
-        )
-    except Place.DoesNotExist:
+    if not Place.objects.filter(pk=place_id).exists():
         return Response(
             {"detail": "Place not found."},
             status=status.HTTP_404_NOT_FOUND
         )
+    menu_items = apply_menu_filters(PlaceMenu.objects.filter(place__id=place_id), parse_menu_filters(request.query_params))
+    paginator = PlaceMenuPagination()
+    menu_items = paginator.paginate_queryset(menu_items, request)
+    serializer = PlaceMenuSerializer(menu_items, many=True)
+    return paginator.get_paginated_response(
+        serializer.data,
+        detail=f"Successfully retrieved {len(menu_items)} menu items."
+    )
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -653,11 +806,15 @@ def addPlaceMenuItem(request, place_id):
     """
     Add a new food menu item to a specific Place.
     """
-    data = request.data.copy()
-    data['place'] = place_id
-    serializer = PlaceMenuSerializer(data=data)
+    if not Place.objects.filter(pk=place_id).exists():
+        return Response(
+            {"detail": "Place not found."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    # PlaceMenuSerializer has no `place` field: the place comes from the URL.
+    serializer = PlaceMenuSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        serializer.save(place_id=place_id)
         return Response(
             {
                 "detail": "Menu item added successfully.",
@@ -744,4 +901,129 @@ def deletePlaceMenuItem(request, pk):
         return Response(
             {"detail": "Menu item not found."},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+# --------------------------
+# Bulk Endpoints
+# --------------------------
+def _bulkItems(items, label):
+    """Returns (items, None) for a valid batch, or (None, error response)."""
+    if not isinstance(items, list) or not items:
+        return None, Response(
+            {"detail": f"Expected a non-empty JSON array of {label}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > MAX_BULK_ITEMS:
+        return None, Response(
+            {"detail": f"At most {MAX_BULK_ITEMS} {label} can be sent per request."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return items, None
+
+def _bulkWrite(request, label, model, serializer_class, relations, create, update, items=None):
+    """
+    Shared body of the bulk endpoints: POST creates the items, PATCH updates
+    them (each names its row with `id`), DELETE removes the ids in the body.
+    `items` overrides the request body (e.g. for multipart uploads).
+    The whole batch is validated first and written in one transaction.
+    """
+    items, error = _bulkItems(request.data if items is None else items, label)
+    if error is not None:
+        return error
+
+    if request.method == 'DELETE':
+        results = delete_objects(model, items)
+        deleted = sum(result['status'] == 'deleted' for result in results)
+        return Response(
+            {
+                "detail": f"{deleted} {label} deleted successfully.",
+                "data": results
+            },
+            status=status.HTTP_200_OK
+        )
+
+    instances = load_instances(model, items) if request.method == 'PATCH' else None
+    context = {'related_objects': load_related(items, relations)}
+    try:
+        validated = validate_items(serializer_class, items, context=context, instances=instances)
+        objects = (update if instances is not None else create)(validated)
+    except BulkValidationError as exc:
+        return Response(
+            {
+                "detail": f"Failed to save {label}. No changes were made; please review the errors.",
+                "errors": exc.results
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except IntegrityError:
+        return Response(
+            {"detail": f"Failed to save {label}: the batch conflicts with existing records. No changes were made."},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    action = 'updated' if instances is not None else 'created'
+    return Response(
+        {
+            "detail": f"{len(objects)} {label} {action} successfully.",
+            "data": [
+                {"index": index, "id": obj.pk, "status": action}
+                for index, obj in enumerate(objects)
+            ]
+        },
+        status=status.HTTP_200_OK if instances is not None else status.HTTP_201_CREATED
+    )
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulkPlaces(request):
+    """
+    Creates (POST), updates (PATCH) or deletes (DELETE) many Places at once.
+    POST and PATCH take an array of places (PATCH items carry their `id`);
+    DELETE takes an array of ids. Returns one result per item.
+    """
+    return _bulkWrite(
+        request, 'places', Place, PlaceSerializer,
+        {'category': Category, 'tags': Tag}, create_places, update_places,
+    )
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulkPlaceImages(request):
+    """
+    Uploads many images to a Place (POST, multipart with a `place` field,
+    repeated `image` files and optional matching `caption` fields), or
+    deletes images by id (DELETE, JSON array of ids).
+    """
+    if request.method == 'DELETE':
+        return _bulkWrite(request, 'place images', PlaceImage, PlaceImageSerializer, {}, None, None)
+
+    images = request.FILES.getlist('image')
+    captions = request.data.getlist('caption') if hasattr(request.data, 'getlist') else []
+    items = [
+        {'place': request.data.get('place'), 'image': image, 'caption': captions[index] if index < len(captions) else ''}
+        for index, image in enumerate(images)
+    ]
+    return _bulkWrite(
+        request, 'place images', PlaceImage, PlaceImageSerializer,
+        {'place': Place}, create_place_images, None, items=items,
+    )
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulkTags(request):
+    """
+    Creates (POST), renames (PATCH) or deletes (DELETE) many Tags at once.
+    """
+    return _bulkWrite(request, 'tags', Tag, TagSerializer, {}, create_tags, update_tags)
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulkPlaceMenu(request):
+    """
+    Creates (POST), updates (PATCH) or deletes (DELETE) many menu items at
+    once, across any number of places (each item carries its `place` id).
+    """
+    return _bulkWrite(
+        request, 'menu items', PlaceMenu, BulkPlaceMenuSerializer,
+        {'place': Place}, create_menu_items, update_menu_items,
+    )
@@ -0,0 +1,144 @@
+import time
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from base import versioning
+
+def request_fingerprint(request, *args, **kwargs):
+    """
+    Identifies what a GET request asks for: the path, the query string with
+    its parameters sorted (so `?a=1&b=2` and `?b=2&a=1` match) and the
+    negotiated format (JSON vs the browsable API).
+    """
+    query = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    raw = '\n'.join([
+        request.path,
+        '&'.join(f'{key}={value}' for key, value in query),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _get_versions(request, keys):
+    # Stacked decorators share one DataVersion lookup per request.
+    memo = request.__dict__.setdefault('_data_versions', {})
+    if keys not in memo:
+        memo[keys] = versioning.get_versions(*keys)
+    return memo[keys]
+
+def conditional_view(*keys, on_not_modified=None):
+    """
+    Adds ETag and Last-Modified validators to a GET view whose response only
+    depends on the request and on the data sets in `keys` (base.versioning).
+
+    Both are derived from the DataVersion stamps (one query), so a request
+    whose If-None-Match / If-Modified-Since still matches gets a 304 without
+    running the view or its serializers. `on_not_modified(request, *args,
+    **kwargs)` is called for such requests, for side effects the view itself
+    would have had. Apply it above @api_view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            versions = _get_versions(request, keys)
+            token = '.'.join(str(versions[key][0]) for key in keys)
+            etag = quote_etag(f'{request_fingerprint(request, *args, **kwargs)}-{token}')
+            stamps = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+            last_modified = int(max(stamps).timestamp()) if stamps else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                if on_not_modified is not None and response.status_code == 304:
+                    on_not_modified(request, *args, **kwargs)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response.setdefault('ETag', etag)
+                    if last_modified is not None:
+                        response.setdefault('Last-Modified', http_date(last_modified))
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
+
+def cached_view(*keys, timeout=None, on_hit=None):
+    """
+    Caches the rendered 200 responses of an anonymous GET view in Django's
+    cache framework, keyed by request_fingerprint() and the versions of the
+    data sets in `keys`. The post_save/post_delete/m2m_changed handlers in
+    base.signals bump those versions, so any change to the underlying rows
+    makes every affected entry unreachable at once.
+
+    When an entry is missing, a single worker (holding a short cache.add()
+    lock) rebuilds it; the others serve the most recent response for the
+    same request if there is one, or wait briefly for the rebuild.
+    Requests carrying credentials bypass the cache.
+    `on_hit(request, *args, **kwargs)` is called when the view is skipped.
+    Apply it above @api_view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or 'HTTP_AUTHORIZATION' in request.META:
+                return view(request, *args, **kwargs)
+
+            fingerprint = request_fingerprint(request, *args, **kwargs)
+            versions = _get_versions(request, keys)
+            token = '.'.join(str(versions[key][0]) for key in keys)
+            key = f'web:response:{view.__name__}:{fingerprint}:{token}'
+            latest_key = f'web:response-latest:{view.__name__}:{fingerprint}'
+            lock_key = f'web:response-lock:{view.__name__}:{fingerprint}'
+
+            entry = cache.get(key)
+            if entry is not None:
+                return _replay(entry, 'HIT', on_hit, request, *args, **kwargs)
+
+            locked = cache.add(lock_key, True, settings.WEB_RESPONSE_CACHE_LOCK_TIMEOUT)
+            if not locked:
+                # Another worker is rebuilding this entry.
+                entry = cache.get(latest_key)
+                if entry is not None:
+                    return _replay(entry, 'STALE', on_hit, request, *args, **kwargs)
+                entry = _wait_for(key)
+                if entry is not None:
+                    return _replay(entry, 'HIT', on_hit, request, *args, **kwargs)
+
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    if hasattr(response, 'render'):
+                        response.render()
+                    entry = {
+                        'content': response.content,
+                        'content_type': response['Content-Type'],
+                    }
+                    cache.set(key, entry, settings.WEB_RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+                    cache.set(latest_key, entry, settings.WEB_RESPONSE_CACHE_STALE_TIMEOUT)
+                    response['X-Cache'] = 'MISS'
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+def _wait_for(key, attempts=20, delay=0.05):
+    for _ in range(attempts):
+        time.sleep(delay)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+def _replay(entry, state, on_hit, request, *args, **kwargs):
+    if on_hit is not None:
+        on_hit(request, *args, **kwargs)
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Cache'] = state
+    return response
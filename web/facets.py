@@ -0,0 +1,123 @@
+import re
+import json
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from base import versioning
+from base.menus import parse_price
+
+LOCATION_FACETS = ('province', 'district', 'sector')
+FACET_SIZE = 50  # most frequent values returned per dimension
+# Budget filters, compared with the denormalized median menu price (base.menus).
+PRICE_FILTERS = {
+    'min_price': 'menu_price_median__gte',
+    'max_price': 'menu_price_median__lte',
+}
+
+def parse_place_filters(query_params):
+    """
+    Reads the place list filters from the query string:
+    `category` (slug or id), `tags` (comma separated slugs or ids, all must
+    match), exact `province`, `district` and `sector` names, and
+    `min_price`/`max_price` on the median menu price.
+    """
+    filters = {}
+    category = query_params.get('category', '').strip()
+    if category:
+        filters['category'] = category
+    tags = sorted({tag.strip() for tag in query_params.get('tags', '').split(',') if tag.strip()})
+    if tags:
+        filters['tags'] = tags
+    for field in LOCATION_FACETS:
+        value = query_params.get(field, '').strip()
+        if value:
+            filters[field] = value
+    for name in PRICE_FILTERS:
+        price = parse_price(query_params, name)
+        if price is not None:
+            filters[name] = str(price)
+    return filters
+
+def apply_place_filters(queryset, filters, exclude=None):
+    """Applies `filters` to a Place queryset, skipping the `exclude` dimension."""
+    for name, value in filters.items():
+        if name == exclude:
+            continue
+        if name == 'category':
+            queryset = queryset.filter(_slug_or_id('category', value))
+        elif name == 'tags':
+            for tag in value:
+                queryset = queryset.filter(_slug_or_id('tags', tag))
+        elif name in PRICE_FILTERS:
+            queryset = queryset.filter(**{PRICE_FILTERS[name]: value})
+        else:
+            queryset = queryset.filter(**{name: value})
+    return queryset
+
+def _slug_or_id(relation, value):
+    condition = Q(**{f'{relation}__slug': value})
+    if re.fullmatch(r'\d+', value, re.ASCII):  # not isdigit(): int() rejects digits like '²'
+        condition |= Q(**{f'{relation}__id': int(value)})
+    return condition
+
+def get_place_facets(queryset, filters):
+    """
+    Returns the facet counts for the place list under `filters`, cached per
+    filter combination and data version, so any change to places, categories
+    or tags makes every cached combination stale at once.
+
+    Category and location counts ignore their own filter (so clients can
+    offer alternatives to the current choice); tag counts apply every filter,
+    matching the all-tags-must-match semantics.
+    """
+    key = _cache_key(filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_place_facets(queryset, filters)
+        cache.set(key, facets, settings.PLACE_FACETS_CACHE_TIMEOUT)
+    return facets
+
+def compute_place_facets(queryset, filters):
+    facets = {}
+
+    categories = (
+        apply_place_filters(queryset, filters, exclude='category')
+        .filter(category__isnull=False)
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'category__name')[:FACET_SIZE]
+    )
+    facets['category'] = [
+        {"id": row['category_id'], "name": row['category__name'], "slug": row['category__slug'], "count": row['count']}
+        for row in categories
+    ]
+
+    tags = (
+        apply_place_filters(queryset, filters)
+        .filter(tags__isnull=False)
+        .values('tags__id', 'tags__name', 'tags__slug')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'tags__name')[:FACET_SIZE]
+    )
+    facets['tags'] = [
+        {"id": row['tags__id'], "name": row['tags__name'], "slug": row['tags__slug'], "count": row['count']}
+        for row in tags
+    ]
+
+    for field in LOCATION_FACETS:
+        rows = (
+            apply_place_filters(queryset, filters, exclude=field)
+            .exclude(**{f'{field}__isnull': True})
+            .exclude(**{field: ''})
+            .values(field)
+            .annotate(count=Count('id'))
+            .order_by('-count', field)[:FACET_SIZE]
+        )
+        facets[field] = [{"name": row[field], "count": row['count']} for row in rows]
+    return facets
+
+def _cache_key(filters):
+    token = versioning.version_token(versioning.PLACES, versioning.CATEGORIES, versioning.TAGS)
+    raw = json.dumps(filters, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return f"web:place-facets:{token}:{hashlib.sha1(raw).hexdigest()}"
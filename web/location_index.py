@@ -0,0 +1,137 @@
+import bisect
+import threading
+import unicodedata
+from web.locations import get_locations, get_locations_version
+
+LEVELS = ('province', 'district', 'sector', 'cell', 'village')
+
+def normalize(value):
+    """Case- and accent-insensitive form of a location name used for lookups."""
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.casefold().split())
+
+class LocationNode:
+    __slots__ = ('name', 'level', 'path', 'children', '_by_key')
+
+    def __init__(self, name, level, path):
+        self.name = name
+        self.level = level
+        self.path = path
+        self.children = []
+        self._by_key = {}
+
+    def add_child(self, name):
+        key = normalize(name)
+        child = self._by_key.get(key)
+        if child is None:
+            child = LocationNode(name, self.level + 1, self.path + (name,))
+            self._by_key[key] = child
+            self.children.append(child)
+        return child
+
+    def get_child(self, name):
+        return self._by_key.get(normalize(name))
+
+    def to_dict(self):
+        data = {LEVELS[index]: name for index, name in enumerate(self.path)}
+        data['name'] = self.name
+        data['level'] = LEVELS[self.level]
+        data['children_count'] = len(self.children)
+        return data
+
+class LocationIndex:
+    """
+    In-memory tree of provinces > districts > sectors > cells > villages,
+    with a sorted name list for prefix (typeahead) search across all levels.
+    """
+    def __init__(self, data, version=None):
+        self.version = version
+        self.root = LocationNode(None, -1, ())
+        _ingest(self.root, data)
+        entries = []
+        stack = list(self.root.children)
+        while stack:
+            node = stack.pop()
+            node.children.sort(key=lambda child: normalize(child.name))
+            entries.append((normalize(node.name), node.level, node.path, node))
+            stack.extend(node.children)
+        self.root.children.sort(key=lambda child: normalize(child.name))
+        entries.sort(key=lambda entry: entry[:3])
+        self._names = [entry[0] for entry in entries]
+        self._nodes = [entry[3] for entry in entries]
+
+    def find(self, path):
+        """
+        Returns the node at `path` (a sequence of names from the province
+        down), the root for an empty path, or None if it does not exist.
+        """
+        node = self.root
+        for name in path:
+            node = node.get_child(name)
+            if node is None:
+                return None
+        return node
+
+    def search(self, query, level=None, limit=10):
+        """
+        Returns up to `limit` nodes whose name starts with `query`, optionally
+        restricted to one level, ordered by name, level and path.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        level_index = LEVELS.index(level) if level else None
+        results = []
+        position = bisect.bisect_left(self._names, prefix)
+        while position < len(self._names) and self._names[position].startswith(prefix):
+            node = self._nodes[position]
+            if level_index is None or node.level == level_index:
+                results.append(node)
+                if len(results) >= limit:
+                    break
+            position += 1
+        return results
+
+def _ingest(parent, data):
+    """
+    Adds `data` under `parent`, accepting the shapes the upstream payload uses:
+    lists of names, `{name: children}` mappings and `{"name": ..., <list>: children}` records.
+    """
+    if parent.level + 1 >= len(LEVELS) or data is None:
+        return
+    if isinstance(data, (str, int)):
+        parent.add_child(str(data))
+    elif isinstance(data, list):
+        for item in data:
+            _ingest(parent, item)
+    elif isinstance(data, dict):
+        name = data.get('name')
+        if isinstance(name, str):
+            child = parent.add_child(name)
+            for value in data.values():
+                if isinstance(value, (list, dict)):
+                    _ingest(child, value)
+        else:
+            for key, value in data.items():
+                _ingest(parent.add_child(str(key)), value)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_location_index():
+    """
+    Returns the index for the current cached locations snapshot, rebuilding
+    it when the snapshot version changed since the last build. Only the
+    version key is read per call; the payload is loaded when rebuilding.
+    """
+    global _index
+    version = get_locations_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            entry = get_locations()
+            _index = LocationIndex(entry['payload'].get('data'), version=entry['version'])
+        return _index
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from base.serializers import RwandaLocationsSerializer
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'web:rwanda-locations'
+REFRESH_LOCK_KEY = 'web:rwanda-locations:refresh'
+VERSION_KEY = 'web:rwanda-locations:version'  # {'version', 'fetched_at'} of the cached entry
+
+class LocationsUnavailable(Exception):
+    """Raised when no cached, snapshot or upstream locations data is available."""
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the process-wide pooled session used to talk to the locations API.
+    Connections are kept alive between refreshes and idempotent GETs are
+    retried with backoff on connection errors and 5xx responses.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=2,
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET']),
+                )
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+                session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+                _session = session
+    return _session
+
+def fetch_locations():
+    """
+    Fetches and validates the locations payload from the upstream API.
+    Raises LocationsUnavailable on network, HTTP or validation errors, or
+    when RWANDA_LOCATIONS_API_KEY is not configured.
+    """
+    if not settings.RWANDA_LOCATIONS_API_KEY:
+        raise LocationsUnavailable("RWANDA_LOCATIONS_API_KEY is not set; cannot fetch locations from upstream.")
+    try:
+        response = get_session().get(
+            settings.RWANDA_LOCATIONS_API_URL,
+            headers={"x-rapidapi-key": settings.RWANDA_LOCATIONS_API_KEY},
+            timeout=settings.RWANDA_LOCATIONS_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        raise LocationsUnavailable(f"Could not reach the locations API: {e}")
+    if response.status_code != 200:
+        raise LocationsUnavailable(
+            f"External API returned status code {response.status_code}."
+        )
+    try:
+        api_data = response.json()
+    except ValueError:
+        raise LocationsUnavailable("External API returned a non-JSON response.")
+
+    serializer = RwandaLocationsSerializer(data=api_data)
+    if not serializer.is_valid():
+        raise LocationsUnavailable(f"Data validation error from external API response: {serializer.errors}")
+    return dict(serializer.data)
+
+def get_locations():
+    """
+    Returns the current locations entry: a dict with `payload`, `fetched_at`
+    (epoch seconds) and `version` (a hash of the payload).
+
+    Lookup order is the cache, then the snapshot file on disk (the repo
+    ships a seed snapshot there). Requests never wait on upstream: entries
+    older than RWANDA_LOCATIONS_TTL are still served while a single
+    background thread refreshes them, and with no data at all a refresh is
+    scheduled and LocationsUnavailable raised.
+    """
+    entry = cache.get(CACHE_KEY)
+    if entry is None:
+        entry = load_snapshot()
+        if entry is not None:
+            _cache_entry(entry)
+
+    if entry is None:
+        schedule_refresh()
+        raise LocationsUnavailable("Locations data is not available yet; try again later.")
+
+    if time.time() - entry['fetched_at'] > settings.RWANDA_LOCATIONS_TTL:
+        schedule_refresh()
+    return entry
+
+def get_locations_version():
+    """
+    Returns the version of the current locations entry. Only a small key
+    holding the version and fetch time is read, so callers that keep derived
+    data (web.location_index) can check it without loading the payload.
+    """
+    stamp = cache.get(VERSION_KEY)
+    if stamp is None:
+        entry = get_locations()
+        stamp = _version_stamp(entry)
+        cache.set(VERSION_KEY, stamp, None)
+    elif time.time() - stamp['fetched_at'] > settings.RWANDA_LOCATIONS_TTL:
+        schedule_refresh()
+    return stamp['version']
+
+def refresh_locations():
+    """
+    Fetches fresh data from upstream and stores it in the cache and on disk.
+    """
+    payload = fetch_locations()
+    entry = {
+        'payload': payload,
+        'fetched_at': time.time(),
+        'version': _payload_version(payload),
+    }
+    _cache_entry(entry)
+    save_snapshot(entry)
+    return entry
+
+def _cache_entry(entry):
+    # The payload first: a reader seeing the new version must find its payload.
+    cache.set(CACHE_KEY, entry, None)
+    cache.set(VERSION_KEY, _version_stamp(entry), None)
+
+def _version_stamp(entry):
+    return {'version': entry['version'], 'fetched_at': entry['fetched_at']}
+
+def schedule_refresh():
+    """
+    Starts a background refresh unless one is already running in any worker
+    sharing the cache. A failed refresh is negative-cached under the same
+    lock key, so upstream is retried at most once per
+    RWANDA_LOCATIONS_RETRY_INTERVAL after a failure.
+    """
+    if not cache.add(REFRESH_LOCK_KEY, True, settings.RWANDA_LOCATIONS_RETRY_INTERVAL):
+        return False
+    threading.Thread(target=_refresh_in_background, name='rwanda-locations-refresh', daemon=True).start()
+    return True
+
+def _refresh_in_background():
+    try:
+        refresh_locations()
+    except Exception:
+        logger.warning("Background refresh of Rwanda locations failed; serving stale data.", exc_info=True)
+        # Restart the retry window from the failure, not from when the fetch began.
+        cache.set(REFRESH_LOCK_KEY, 'failed', settings.RWANDA_LOCATIONS_RETRY_INTERVAL)
+        return
+    cache.delete(REFRESH_LOCK_KEY)
+
+# --------------------------
+# Snapshot file
+# --------------------------
+def load_snapshot():
+    path = settings.RWANDA_LOCATIONS_SNAPSHOT
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            snapshot = json.load(fh)
+        payload = snapshot['payload']
+        return {
+            'payload': payload,
+            'fetched_at': float(snapshot['fetched_at']),
+            'version': snapshot.get('version') or _payload_version(payload),
+        }
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning("Ignoring unreadable Rwanda locations snapshot at %s.", path, exc_info=True)
+        return None
+
+def save_snapshot(entry):
+    """
+    Writes the entry next to its final path and renames it into place, so
+    readers never see a partially written snapshot.
+    """
+    path = settings.RWANDA_LOCATIONS_SNAPSHOT
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(entry, fh)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Could not write Rwanda locations snapshot to %s.", path, exc_info=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _payload_version(payload):
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
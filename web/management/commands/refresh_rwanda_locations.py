@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from web.locations import refresh_locations, LocationsUnavailable
+
+class Command(BaseCommand):
+    help = 'Fetch Rwanda locations from the external API and refresh the cache and on-disk snapshot'
+
+    def handle(self, *args, **kwargs):
+        try:
+            entry = refresh_locations()
+        except LocationsUnavailable as e:
+            raise CommandError(f"Could not refresh Rwanda locations: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Rwanda locations refreshed (version {entry['version'][:12]})."))
@@ -1,3 +1,376 @@
-from django.test import TestCase
+import os
+import json
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from base.models import *
+from web.facets import get_place_facets
+from base.rankings import update_rankings
+from web import locations
+from web import location_index
 
-# Create your tests here.
+# --------------------------
+# Facets
+# --------------------------
+class PlaceFacetsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.cafes = Category.objects.create(name='Cafes', description='Coffee')
+        self.bars = Category.objects.create(name='Bars', description='Drinks')
+        self.wifi = Tag.objects.create(name='Wifi')
+        for name, category, district in [('Inzora', self.cafes, 'Gasabo'), ('Question', self.cafes, 'Kicukiro'), ('Sundowner', self.bars, 'Gasabo')]:
+            Place.objects.create(name=name, category=category, district=district)
+
+    def counts(self, facets, field):
+        return {row['name']: row['count'] for row in facets[field]}
+
+    def test_category_and_location_counts_ignore_their_own_filter(self):
+        facets = get_place_facets(Place.objects.all(), {'category': 'cafes', 'district': 'Gasabo'})
+        self.assertEqual(self.counts(facets, 'category'), {'Cafes': 1, 'Bars': 1})
+        self.assertEqual(self.counts(facets, 'district'), {'Gasabo': 1, 'Kicukiro': 1})
+
+    def test_non_ascii_digits_are_treated_as_slugs(self):
+        for value in ['²', '١']:
+            response = self.client.get('/api/places/', {'category': value})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, value)
+            self.assertEqual(response.json()['data'], [])
+
+    def test_counts_are_served_from_the_cache(self):
+        get_place_facets(Place.objects.all(), {})
+        with self.assertNumQueries(1):  # the data versions only
+            get_place_facets(Place.objects.all(), {})
+
+    def test_writes_invalidate_cached_counts(self):
+        self.assertEqual(self.counts(get_place_facets(Place.objects.all(), {}), 'category'), {'Cafes': 2, 'Bars': 1})
+        place = Place.objects.create(name='Meze Fresh', category=self.bars)
+        self.assertEqual(self.counts(get_place_facets(Place.objects.all(), {}), 'category'), {'Cafes': 2, 'Bars': 2})
+        place.tags.add(self.wifi)
+        self.assertEqual(self.counts(get_place_facets(Place.objects.all(), {}), 'tags'), {'Wifi': 1})
+        self.bars.name = 'Pubs'
+        self.bars.save()
+        self.assertEqual(self.counts(get_place_facets(Place.objects.all(), {}), 'category'), {'Cafes': 2, 'Pubs': 2})
+
+# --------------------------
+# Response caching
+# --------------------------
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Cafes', description='Coffee')
+        self.place = Place.objects.create(name='Inzora', category=self.category)
+
+    def names(self, response):
+        return [place['name'] for place in response.json()['data']]
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        self.assertEqual(self.client.get('/api/places/')['X-Cache'], 'MISS')
+        response = self.client.get('/api/places/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.names(response), ['Inzora'])
+
+    def test_writes_invalidate_cached_responses(self):
+        self.client.get('/api/places/')
+        Place.objects.create(name='Question', category=self.category)
+        response = self.client.get('/api/places/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.names(response), ['Question', 'Inzora'])
+
+        url = f'/api/place/{self.place.pk}/'
+        self.client.get(url)
+        self.category.name = 'Coffee Shops'
+        self.category.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['place']['category_detail']['name'], 'Coffee Shops')
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/api/categories/')
+        etag = response['ETag']
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Category.objects.create(name='Bars', description='Drinks')
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get('/api/places/')
+        response = self.client.get('/api/places/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertNotIn('X-Cache', response)
+
+# --------------------------
+# Rwanda locations
+# --------------------------
+class InlineThread:
+    """Runs a background refresh inline, so its outcome can be asserted on."""
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+@override_settings(RWANDA_LOCATIONS_API_KEY='')  # refreshes fail without touching the network
+@mock.patch.object(locations.threading, 'Thread', InlineThread)
+class LocationsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_snapshot_serves_the_tree(self):
+        with self.assertLogs('web.locations', 'WARNING'):  # the seed is stale: its refresh is attempted
+            response = self.client.get('/api/rwanda-locations/children/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['data']), 5)
+        response = self.client.get('/api/rwanda-locations/search/', {'q': 'gasab', 'level': 'district'})
+        self.assertEqual([node['name'] for node in response.json()['data']], ['Gasabo'])
+
+    def test_requests_never_fetch_upstream(self):
+        with override_settings(RWANDA_LOCATIONS_SNAPSHOT=os.path.join(tempfile.gettempdir(), 'missing-locations.json')), \
+                mock.patch.object(locations, 'get_session') as get_session, self.assertLogs('web.locations', 'WARNING'):
+            response = self.client.get('/api/rwanda-locations/')
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            get_session.assert_not_called()
+        # The failed refresh is remembered: no new attempt until the retry interval passes.
+        self.assertEqual(cache.get(locations.REFRESH_LOCK_KEY), 'failed')
+        self.assertFalse(locations.schedule_refresh())
+
+    def test_missing_api_key_fails_clearly(self):
+        with self.assertRaisesMessage(locations.LocationsUnavailable, 'RWANDA_LOCATIONS_API_KEY is not set'):
+            locations.fetch_locations()
+
+    def test_index_is_rebuilt_only_when_the_version_changes(self):
+        with self.assertLogs('web.locations', 'WARNING'):
+            index = location_index.get_location_index()
+        with mock.patch.object(location_index, 'get_locations', side_effect=AssertionError('payload loaded')):
+            self.assertIs(location_index.get_location_index(), index)
+        locations._cache_entry(dict(locations.get_locations(), version='next'))
+        self.assertEqual(location_index.get_location_index().version, 'next')
+
+# --------------------------
+# Rankings
+# --------------------------
+class RankingsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def ranked(self, kind):
+        response = self.client.get(f'/api/places/{kind}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(place['name'], place['score']) for place in response.json()['data']]
+
+    def test_recent_views_outrank_older_ones_as_they_decay(self):
+        now = timezone.now()
+        old = Place.objects.create(name='Old favourite')
+        recent = Place.objects.create(name='New opening')
+        PlaceViewEvent.objects.create(place=old, count=100, created_at=now - timedelta(days=5))
+        PlaceViewEvent.objects.create(place=recent, count=10, created_at=now)
+        self.assertEqual(update_rankings(), (2, 1))
+
+        # A day's half-life leaves 100 views from five days ago worth about 3.
+        (first, first_score), (second, second_score) = self.ranked('trending')
+        self.assertEqual((first, second), ('New opening', 'Old favourite'))
+        self.assertAlmostEqual(first_score, 10, delta=0.1)
+        self.assertAlmostEqual(second_score, 100 / 2 ** 5, delta=0.1)
+        # Thirty days' half-life barely decays them.
+        (first, first_score), (second, _) = self.ranked('popular')
+        self.assertEqual((first, second), ('Old favourite', 'New opening'))
+        self.assertAlmostEqual(first_score, 100 / 2 ** (5 / 30), delta=0.5)
+
+    def test_non_ascii_digit_category_is_looked_up_as_a_slug(self):
+        for value in ['²', '١']:
+            response = self.client.get('/api/places/trending/', {'category': value})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, value)
+
+# --------------------------
+# Menu search
+# --------------------------
+class MenuSearchTests(APITestCase):
+    url = '/api/places/menu-search/'
+
+    def setUp(self):
+        cache.clear()
+        self.inzora = Place.objects.create(name='Inzora', latitude=-1.95, longitude=30.06)
+        self.question = Place.objects.create(name='Question', latitude=-1.93, longitude=30.06)
+        self.meze = Place.objects.create(name='Meze Fresh', latitude=-1.965, longitude=30.06)
+        self.items = {
+            'inzora': PlaceMenu.objects.create(place=self.inzora, name='Beef Brochette', price=3500),
+            'question': PlaceMenu.objects.create(place=self.question, name='Goat brochettes', price=2000),
+            'meze': PlaceMenu.objects.create(place=self.meze, name='Chicken Brochette', description='With chips', price=2800),
+        }
+        PlaceMenu.objects.create(place=self.meze, name='Chips', price=1000)
+
+    def search(self, **params):
+        cache.clear()
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(place['name'], place['item']['name']) for place in response.json()['data']], response.json()['data']
+
+    def test_places_are_ranked_by_their_cheapest_match_under_max_price(self):
+        found, _ = self.search(q='broch')
+        self.assertEqual(found, [('Question', 'Goat brochettes'), ('Meze Fresh', 'Chicken Brochette'), ('Inzora', 'Beef Brochette')])
+        found, _ = self.search(q='broch', max_price=3000)
+        self.assertEqual([name for name, _ in found], ['Question', 'Meze Fresh'])
+        found, _ = self.search(q='chips')  # names and descriptions
+        self.assertEqual(found, [('Meze Fresh', 'Chips')])
+
+    def test_edited_and_deleted_items_update_the_postings(self):
+        item = self.items['question']
+        item.name, item.price = 'Goat skewers', 2200
+        item.save()
+        found, _ = self.search(q='broch')
+        self.assertEqual([name for name, _ in found], ['Meze Fresh', 'Inzora'])
+        found, data = self.search(q='skewers', max_price=2500)
+        self.assertEqual(found, [('Question', 'Goat skewers')])
+        self.assertEqual(data[0]['item']['price'], '2200.00')
+
+        self.items['inzora'].price = 1500
+        self.items['inzora'].save()
+        found, _ = self.search(q='broch')
+        self.assertEqual([name for name, _ in found], ['Inzora', 'Meze Fresh'])
+
+        self.items['meze'].delete()
+        found, _ = self.search(q='broch')
+        self.assertEqual([name for name, _ in found], ['Inzora'])
+
+    def test_distance_sort_ranks_nearest_first_within_the_radius(self):
+        found, data = self.search(q='broch', sort='distance', lat=-1.955, lng=30.06, radius=2)
+        self.assertEqual([name for name, _ in found], ['Inzora', 'Meze Fresh'])
+        self.assertAlmostEqual(data[0]['distance_km'], 0.556, places=2)
+        found, _ = self.search(q='broch', sort='distance', lat=-1.955, lng=30.06, radius=5)
+        self.assertEqual([name for name, _ in found], ['Inzora', 'Meze Fresh', 'Question'])
+        response = self.client.get(self.url, {'q': 'broch', 'sort': 'distance'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_ascii_digit_category_is_looked_up_as_a_slug(self):
+        response = self.client.get(self.url, {'q': 'brochette', 'category': '²'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+# --------------------------
+# Place map
+# --------------------------
+@mock.patch('web.views.MARKER_THRESHOLD', 2)
+class PlaceMapTests(APITestCase):
+    url = '/api/places/map/'
+    bbox = '30.05,-1.96,30.07,-1.94'
+
+    def setUp(self):
+        cache.clear()
+        # Places at the edge of the viewport share their cluster cell with
+        # many outside it, which pull the cluster centroid out of the viewport.
+        for index in range(3):
+            Place.objects.create(name=f'Inside {index}', latitude=-1.9401, longitude=30.0699 - index / 10000)
+        for index in range(10):
+            Place.objects.create(name=f'Outside {index}', latitude=-1.90, longitude=30.10 + index / 10000)
+
+    def test_viewports_with_more_places_than_the_threshold_get_clusters(self):
+        response = self.client.get(self.url, {'bbox': self.bbox, 'zoom': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['type'], 'clusters')
+
+    def test_viewports_within_the_threshold_get_every_marker(self):
+        Place.objects.filter(name='Inside 0').delete()
+        response = self.client.get(self.url, {'bbox': self.bbox, 'zoom': 5})
+        data = response.json()['data']
+        self.assertEqual(data['type'], 'markers')
+        self.assertEqual(sorted(marker['name'] for marker in data['markers']), ['Inside 1', 'Inside 2'])
+
+# --------------------------
+# Nearby places
+# --------------------------
+class NearbyPlacesTests(APITestCase):
+    url = '/api/places/nearby/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_places_are_ordered_by_distance(self):
+        Place.objects.create(name='Three km', latitude=-1.92, longitude=30.06)
+        Place.objects.create(name='One km', latitude=-1.94, longitude=30.06)
+        Place.objects.create(name='Eleven km', latitude=-1.85, longitude=30.06)
+        Place.objects.create(name='Unlocated')
+        response = self.client.get(self.url, {'lat': -1.95, 'lng': 30.06, 'radius': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()['data']
+        self.assertEqual([place['name'] for place in data], ['One km', 'Three km'])
+        self.assertAlmostEqual(data[0]['distance_km'], 1.112, places=2)
+        self.assertAlmostEqual(data[1]['distance_km'], 3.336, places=2)
+
+    def test_places_across_a_geohash_cell_border_are_found(self):
+        # The equator splits geohash cells at every precision.
+        Place.objects.create(name='South', latitude=-0.0001, longitude=30.06)
+        response = self.client.get(self.url, {'lat': 0.0001, 'lng': 30.06, 'radius': 1})
+        data = response.json()['data']
+        self.assertEqual([place['name'] for place in data], ['South'])
+        self.assertAlmostEqual(data[0]['distance_km'], 0.022, places=3)
+
+# --------------------------
+# Place export
+# --------------------------
+@mock.patch('web.views.EXPORT_CHUNK_SIZE', 2)
+class PlaceExportTests(APITestCase):
+    url = '/api/places/export/'
+
+    def setUp(self):
+        cache.clear()
+        self.cafes = Category.objects.create(name='Cafes', description='Coffee')
+        self.places = [
+            Place.objects.create(name=name, category=self.cafes if index % 2 else None)
+            for index, name in enumerate(['Inzora', 'Café Néo', 'Question', 'Meze Fresh', 'Sundowner'])
+        ]
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        return chunks, [json.loads(line) for line in ''.join(chunks).splitlines()]
+
+    def test_places_are_streamed_one_per_line_in_chunks(self):
+        chunks, places = self.export()
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual([place['id'] for place in places], [place.pk for place in self.places])
+        self.assertIn('Café Néo', chunks[0])
+        self.assertEqual(places[1]['category_detail']['name'], 'Cafes')
+
+    def test_filters_and_fields_apply(self):
+        _, places = self.export(category='cafes', fields='id,name')
+        self.assertEqual(places, [{'id': place.pk, 'name': place.name} for place in self.places[1::2]])
+
+# --------------------------
+# Place menu
+# --------------------------
+class PlaceMenuTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.place = Place.objects.create(name='Inzora')
+        self.url = f'/api/place/{self.place.pk}/menu/'
+        for name, price in [('Chips', 1000), ('Brochette', 3000), ('Cappuccino', 2500), ('Banana Bread', 1500), ('Chicken Brochette', 4000)]:
+            PlaceMenu.objects.create(place=self.place, name=name, price=price)
+        PlaceMenu.objects.create(place=Place.objects.create(name='Question'), name='Espresso', price=1200)
+
+    def walk(self, params):
+        names, url = [], self.url
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(item['name'] for item in response.json()['data'])
+            url, params = response.json()['next'], None
+        return names
+
+    def test_pages_follow_the_requested_sort(self):
+        self.assertEqual(self.walk({'page_size': 2}), ['Banana Bread', 'Brochette', 'Cappuccino', 'Chicken Brochette', 'Chips'])
+        self.assertEqual(self.walk({'page_size': 2, 'sort': '-price'}), ['Chicken Brochette', 'Brochette', 'Cappuccino', 'Banana Bread', 'Chips'])
+
+    def test_price_range_and_search_filters(self):
+        self.assertEqual(self.walk({'sort': 'price', 'min_price': 1500, 'max_price': 3000}), ['Banana Bread', 'Cappuccino', 'Brochette'])
+        self.assertEqual(self.walk({'search': 'broch'}), ['Brochette', 'Chicken Brochette'])
+
+    def test_invalid_requests_are_rejected(self):
+        response = self.client.get(self.url, {'min_price': 3000, 'max_price': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/place/999/menu/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
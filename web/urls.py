@@ -7,11 +7,21 @@ app_name = 'web'
 
 urlpatterns = [
     path('rwanda-locations/', getRwandaLocations, name='getRwandaLocations'),
+    path('rwanda-locations/children/', getLocationChildren, name='getLocationChildren'),
+    path('rwanda-locations/search/', searchLocations, name='searchLocations'),
 
     path('categories/', getCategories, name='getCategories'),
     
     path('tags/', getTags, name='getTags'),
 
     path('places/', getPlaces, name='getPlaces'),
+    path('places/export/', exportPlaces, name='exportPlaces'),
+    path('places/nearby/', getNearbyPlaces, name='getNearbyPlaces'),
+    path('places/map/', getPlaceMap, name='getPlaceMap'),
+    path('places/search/', searchPlaces, name='searchPlaces'),
+    path('places/menu-search/', searchMenuItems, name='searchMenuItems'),
+    path('places/trending/', getTrendingPlaces, name='getTrendingPlaces'),
+    path('places/popular/', getPopularPlaces, name='getPopularPlaces'),
     path('place/<int:pk>/', placeDetails, name='placeDetails'),
-]  + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('place/<int:pk>/menu/', getPlaceMenu, name='getPlaceMenu'),
+]  + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
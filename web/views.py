@@ -1,6 +1,24 @@
-import requests
+import re
 from base.models import *
 from base.serializers import *
+from base.querysets import optimize_queryset
+from base.pagination import PlacePagination, PlaceMenuPagination
+from base.menus import MENU_PREVIEW_SIZE, parse_price, parse_menu_filters, apply_menu_filters
+from base.menu_search import search_menu_items
+from base.geo import find_nearby, within_box
+from base.search import search_places
+from base.clusters import clusters_in_viewport, zoom_to_precision, MARKER_THRESHOLD
+from web.locations import get_locations, LocationsUnavailable
+from web.location_index import get_location_index, LEVELS
+from base import versioning
+from base.counters import view_counter
+from base.rankings import current_score, RANKING_SIZE
+from web.caching import conditional_view, cached_view
+from web.facets import parse_place_filters, apply_place_filters, get_place_facets
+from django.urls import reverse
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
@@ -13,54 +31,118 @@ from rest_framework.decorators import api_view, permission_classes
 @permission_classes([])  # Unprotected route
 def getRwandaLocations(request):
     """
-    Fetches Rwanda locations from the external RapidAPI endpoint and returns a detailed response.
+    Returns Rwanda locations from the local cache (see web.locations).
+    Data older than RWANDA_LOCATIONS_TTL is served while it is refreshed from
+    the external RapidAPI endpoint in the background, and the on-disk snapshot
+    keeps this endpoint working while the external API is unreachable.
     """
-    url = "https://rwanda.p.rapidapi.com/"
-    headers = {
-        "x-rapidapi-key": "3107e210c4msh320bc0e06280efbp10cd72jsn0a5782a2d4b3"
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            # Return a detailed error if the external API call fails
-            return Response(
-                {
-                    "detail": f"Error fetching Rwanda locations. External API returned status code {response.status_code}."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Parse and validate the external API response
-        api_data = response.json()
-        serializer = RwandaLocationsSerializer(data=api_data)
-        if serializer.is_valid():
-            return Response(
-                {
-                    "detail": "Successfully retrieved Rwanda locations.",
-                    "data": serializer.data
-                },
-                status=status.HTTP_200_OK
-            )
-        else:
-            # Provide detailed serializer error feedback
-            return Response(
-                {
-                    "detail": "Data validation error from external API response.",
-                    "errors": serializer.errors
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    except Exception as e:
-        # Catch and return any unexpected errors
+        entry = get_locations()
+    except LocationsUnavailable as e:
         return Response(
             {
-                "detail": "An unexpected error occurred while fetching Rwanda locations.",
+                "detail": "Rwanda locations are currently unavailable. Please try again later.",
                 "error": str(e)
             },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
         )
+    return Response(
+        {
+            "detail": "Successfully retrieved Rwanda locations.",
+            "data": entry['payload']
+        },
+        status=status.HTTP_200_OK
+    )
 
+@api_view(['GET'])
+@permission_classes([])  # Unprotected route
+def getLocationChildren(request):
+    """
+    Returns one level of the Rwanda locations tree at a time.
+    Without parameters the provinces are returned; `?province=` returns its
+    districts, `?province=&district=` its sectors, and so on down to villages.
+    """
+    path = []
+    for level in LEVELS[:-1]:
+        value = request.query_params.get(level)
+        if not value:
+            break
+        path.append(value)
+
+    try:
+        index = get_location_index()
+    except LocationsUnavailable as e:
+        return Response(
+            {
+                "detail": "Rwanda locations are currently unavailable. Please try again later.",
+                "error": str(e)
+            },
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    node = index.find(path)
+    if node is None:
+        return Response(
+            {
+                "detail": f"Location {' / '.join(path)} not found. Please verify the provided names."
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+    children = [child.to_dict() for child in node.children]
+    return Response(
+        {
+            "detail": f"Successfully retrieved {len(children)} {LEVELS[node.level + 1]} records.",
+            "data": children
+        },
+        status=status.HTTP_200_OK
+    )
+
+@api_view(['GET'])
+@permission_classes([])  # Unprotected route
+def searchLocations(request):
+    """
+    Prefix (typeahead) search across provinces, districts, sectors, cells and villages.
+    Accepts `?q=` (required), `?level=` to restrict to one level and `?limit=` (max 50).
+    """
+    query = request.query_params.get('q', '').strip()
+    level = request.query_params.get('level') or None
+    if not query:
+        return Response(
+            {"detail": "The `q` query parameter is required."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if level is not None and level not in LEVELS:
+        return Response(
+            {"detail": f"Invalid level. Choose one of: {', '.join(LEVELS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    try:
+        index = get_location_index()
+    except LocationsUnavailable as e:
+        return Response(
+            {
+                "detail": "Rwanda locations are currently unavailable. Please try again later.",
+                "error": str(e)
+            },
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    matches = [node.to_dict() for node in index.search(query, level=level, limit=limit)]
+    return Response(
+        {
+            "detail": f"Found {len(matches)} locations matching '{query}'.",
+            "data": matches
+        },
+        status=status.HTTP_200_OK
+    )
+
+@conditional_view(versioning.CATEGORIES)
+@cached_view(versioning.CATEGORIES)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def getCategories(request):
@@ -78,6 +160,8 @@ def getCategories(request):
         status=status.HTTP_200_OK
     )
 
+@conditional_view(versioning.TAGS)
+@cached_view(versioning.TAGS)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def getTags(request):
@@ -93,23 +177,78 @@ def getTags(request):
     }
     return Response(response_data, status=status.HTTP_200_OK)
 
+@conditional_view(*versioning.PLACE_DATA)
+@cached_view(*versioning.PLACE_DATA)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def getPlaces(request):
     """
-    Retrieves all Place records with detailed information for category, tags,
-    place images, and social media records.
+    Retrieves one page of Place records with detailed information for category,
+    tags, place images, and social media records.
+    Supports cursor pagination through `?cursor=`, `?page_size=` and
+    `?sort=newest|most_viewed|name|price|-price`, and sparse fieldsets through
+    `?fields=` (e.g. `name,category_detail.name,images.image`) and `?expand=`.
+    Filters: `?category=`, `?tags=` (comma separated, all must match),
+    `?province=`, `?district=`, `?sector=`, and `?min_price=`/`?max_price=`
+    on the median menu price. The response carries `facets` with the number
+    of matching places per category, tag and location.
     """
-    places = Place.objects.all().order_by('-id')
-    serializer = PlaceSerializer(places, many=True)
-    return Response(
-        {
-            "detail": f"Successfully retrieved {len(serializer.data)} places with detailed info.",
-            "data": serializer.data
-        },
-        status=status.HTTP_200_OK
+    options = field_selection(request)
+    filters = parse_place_filters(request.query_params)
+    queryset = apply_place_filters(Place.objects.all(), filters)
+    paginator = PlacePagination()
+    places = paginator.paginate_queryset(
+        optimize_queryset(queryset, PlaceSerializer(**options)), request
+    )
+    serializer = PlaceSerializer(places, many=True, **options)
+    data = paginator.get_paginated_data(
+        serializer.data,
+        detail=f"Successfully retrieved {len(places)} places with detailed info."
     )
+    data['facets'] = get_place_facets(Place.objects.all(), filters)
+    return Response(data, status=status.HTTP_200_OK)
+
+EXPORT_CHUNK_SIZE = 500  # places fetched (and prefetched) per database round trip
 
+@conditional_view(*versioning.PLACE_DATA)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def exportPlaces(request):
+    """
+    Streams the whole place catalogue as newline-delimited JSON (one place
+    per line, ordered by id) for partners syncing it.
+    Places are read in chunks of EXPORT_CHUNK_SIZE, with related rows
+    prefetched per chunk, and each chunk is serialized and sent before the
+    next is fetched, so memory use does not grow with the catalogue.
+    Accepts the same filters and sparse fieldset parameters as getPlaces.
+    """
+    options = field_selection(request)
+    filters = parse_place_filters(request.query_params)
+    queryset = optimize_queryset(
+        apply_place_filters(Place.objects.all(), filters), PlaceSerializer(**options)
+    ).order_by('id')
+
+    def lines():
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        chunk = []
+        for place in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            chunk.append(place)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                yield ''.join(encoder.encode(item) + '\n' for item in PlaceSerializer(chunk, many=True, **options).data)
+                chunk = []
+        if chunk:
+            yield ''.join(encoder.encode(item) + '\n' for item in PlaceSerializer(chunk, many=True, **options).data)
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="places.ndjson"'
+    return response
+
+def _countPlaceView(request, pk):
+    # A revalidated (304) or cached detail request is still a view of the place.
+    view_counter.increment(pk)
+
+@conditional_view(*versioning.PLACE_DATA, on_not_modified=_countPlaceView)
+@cached_view(*versioning.PLACE_DATA, on_hit=_countPlaceView)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def placeDetails(request, pk):
@@ -119,10 +258,17 @@ def placeDetails(request, pk):
     - Tags
     - Images
     - Social Media
-    - Menu Items (Food & Drinks)
+    - A preview of the menu (its count, the first items by name and the
+      URL of the paginated menu)
+    Supports sparse fieldsets through `?fields=` and `?expand=`.
+    Each successful request counts as one view of the place.
     """
+    options = field_selection(request)
+    if options['fields'] is None and options['expand'] is None:
+        # The full menu has its own paginated endpoint; only a preview is embedded below.
+        options['expand'] = {name: {} for name in PlaceSerializer.Meta.expandable_fields if name != 'menu_items'}
     try:
-        place = Place.objects.get(pk=pk)
+        place = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).get(pk=pk)
     except Place.DoesNotExist:
         return Response(
             {
@@ -131,20 +277,397 @@ def placeDetails(request, pk):
             status=status.HTTP_404_NOT_FOUND
         )
 
+    # Buffered in the shared cache and written in batches by `flush_place_views`,
+    # so reads never wait on a write
+    view_counter.increment(place.pk)
+
     # Serialize place details
-    place_serializer = PlaceSerializer(place)
+    place_serializer = PlaceSerializer(place, **options)
 
-    # Retrieve place's menu
-    menu_items = PlaceMenu.objects.filter(place=place).order_by('name')
-    menu_serializer = PlaceMenuSerializer(menu_items, many=True)
+    # A short preview of the menu; the rest is paged through getPlaceMenu.
+    menu_items = PlaceMenu.objects.filter(place=place).order_by('name', 'id')
+    menu_preview = PlaceMenuSerializer(menu_items[:MENU_PREVIEW_SIZE], many=True)
 
     return Response(
         {
             "detail": "Successfully retrieved comprehensive details for the selected Place.",
             "data": {
                 "place": place_serializer.data,
-                "menu": menu_serializer.data  # ✅ Now retrieving place menu items
+                "menu": {
+                    "count": menu_items.count(),
+                    "preview": menu_preview.data,
+                    "url": request.build_absolute_uri(reverse('web:getPlaceMenu', args=[place.pk])),
+                }
             }
         },
         status=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+@conditional_view(versioning.PLACES, versioning.PLACE_MENUS)
+@cached_view(versioning.PLACES, versioning.PLACE_MENUS)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def getPlaceMenu(request, pk):
+    """
+    Retrieves one page of a Place's menu.
+    Supports `?sort=name|price|-price` (default name), `?min_price=` and
+    `?max_price=` (inclusive), `?search=` on the item name, and cursor
+    pagination through `?cursor=` and `?page_size=`.
+    """
+    if not Place.objects.filter(pk=pk).exists():
+        return Response(
+            {
+                "detail": f"Place with id {pk} not found. Please verify the provided identifier."
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+    filters = parse_menu_filters(request.query_params)
+    paginator = PlaceMenuPagination()
+    menu_items = paginator.paginate_queryset(apply_menu_filters(PlaceMenu.objects.filter(place_id=pk), filters), request)
+    serializer = PlaceMenuSerializer(menu_items, many=True)
+    return paginator.get_paginated_response(
+        serializer.data,
+        detail=f"Successfully retrieved {len(menu_items)} menu items."
+    )
+
+@cached_view(*versioning.PLACE_DATA)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def getNearbyPlaces(request):
+    """
+    Retrieves the places closest to a point, nearest first.
+    Accepts `?lat=` and `?lng=` (required), `?radius=` in kilometres
+    (default 5, max 100) and `?limit=` (default 20, max 100), plus the sparse
+    fieldset parameters `?fields=` and `?expand=`.
+    Each place carries its `distance_km` from the requested point.
+    """
+    try:
+        latitude = float(request.query_params['lat'])
+        longitude = float(request.query_params['lng'])
+        radius = float(request.query_params.get('radius', 5))
+        limit = int(request.query_params.get('limit', 20))
+    except (KeyError, ValueError):
+        return Response(
+            {
+                "detail": "Please provide numeric `lat` and `lng` query parameters (and optionally `radius` and `limit`)."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return Response(
+            {"detail": "Coordinates out of range. Latitude must be within -90..90 and longitude within -180..180."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (0 < radius <= 100):
+        return Response(
+            {"detail": "The `radius` must be greater than 0 and at most 100 kilometres."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    limit = min(max(limit, 1), 100)
+
+    nearest = find_nearby(Place.objects.all(), latitude, longitude, radius, limit)
+    options = field_selection(request)
+    places = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).in_bulk([pk for pk, _ in nearest])
+    nearest = [(pk, distance) for pk, distance in nearest if pk in places]  # deleted since the lookup
+    serializer = PlaceSerializer([places[pk] for pk, _ in nearest], many=True, **options)
+    data = [
+        {**place, "distance_km": round(distance, 3)}
+        for place, (_, distance) in zip(serializer.data, nearest)
+    ]
+    return Response(
+        {
+            "detail": f"Successfully retrieved {len(data)} places within {radius:g} km.",
+            "data": data
+        },
+        status=status.HTTP_200_OK
+    )
+
+@cached_view(*versioning.PLACE_DATA)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def getPlaceMap(request):
+    """
+    Returns what a map needs to draw the places inside a viewport.
+    Accepts `?bbox=min_lng,min_lat,max_lng,max_lat` and `?zoom=` (0-22).
+    Viewports holding at most MARKER_THRESHOLD places get individual markers;
+    denser ones get pre-aggregated clusters (count, centroid and a few
+    representative place ids) read from base.PlaceCluster.
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in request.query_params['bbox'].split(','))
+        zoom = int(request.query_params.get('zoom', 12))
+    except (KeyError, ValueError):
+        return Response(
+            {
+                "detail": "Please provide `bbox` as min_lng,min_lat,max_lng,max_lat and an integer `zoom`."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        return Response(
+            {"detail": "Invalid `bbox`. Expected min_lng,min_lat,max_lng,max_lat within valid coordinate ranges."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Decide on the places actually inside the box: cluster totals only count
+    # clusters whose centroid is inside it, and would miss the ones near its edges.
+    markers = list(
+        within_box(Place.objects.all(), min_lat, min_lng, max_lat, max_lng)
+        .values('id', 'name', 'slug', 'category_id', 'latitude', 'longitude')[:MARKER_THRESHOLD + 1]
+    )
+    if len(markers) <= MARKER_THRESHOLD:
+        return Response(
+            {
+                "detail": f"Successfully retrieved {len(markers)} place markers.",
+                "data": {"type": "markers", "markers": markers}
+            },
+            status=status.HTTP_200_OK
+        )
+
+    precision = zoom_to_precision(zoom)
+    clusters = clusters_in_viewport(min_lat, min_lng, max_lat, max_lng, precision)
+    total = sum(cluster.count for cluster in clusters)
+    data = [
+        {
+            "geohash": cluster.geohash,
+            "count": cluster.count,
+            "latitude": cluster.latitude,
+            "longitude": cluster.longitude,
+            "place_ids": cluster.place_ids,
+        }
+        for cluster in clusters
+    ]
+    return Response(
+        {
+            "detail": f"Successfully retrieved {len(data)} clusters covering {total} places.",
+            "data": {"type": "clusters", "precision": precision, "clusters": data}
+        },
+        status=status.HTTP_200_OK
+    )
+
+@cached_view(*versioning.PLACE_DATA)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def searchPlaces(request):
+    """
+    Ranked full-text search over place names, descriptions, addresses,
+    category and tag names and menu items (see base.search).
+    Accepts `?q=` (required), `?limit=` (default 20, max 50), `?offset=`
+    (max 1000) and the sparse fieldset parameters `?fields=` and `?expand=`.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {"detail": "The `q` query parameter is required."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        offset = min(max(int(request.query_params.get('offset', 0)), 0), 1000)
+    except ValueError:
+        return Response(
+            {"detail": "`limit` and `offset` must be integers."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    total, hits = search_places(query, limit=limit, offset=offset)
+    options = field_selection(request)
+    places = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).in_bulk([pk for pk, _ in hits])
+    hits = [(places[pk], score) for pk, score in hits if pk in places]
+    serializer = PlaceSerializer([place for place, _ in hits], many=True, **options)
+    data = [
+        {**place, "score": score}
+        for place, (_, score) in zip(serializer.data, hits)
+    ]
+    return Response(
+        {
+            "detail": f"Found {total} places matching '{query}'.",
+            "count": total,
+            "data": data
+        },
+        status=status.HTTP_200_OK
+    )
+
+@cached_view(*versioning.PLACE_DATA)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def searchMenuItems(request):
+    """
+    Finds the places serving a menu item, e.g. "where can I get brochettes
+    under 3000". Matches `?q=` (required) against item names and descriptions
+    through the menu inverted index (see base.menu_search), optionally under
+    `?max_price=` (inclusive), in a `?district=` and in a `?category=` (slug
+    or id). Each place carries its cheapest matching `item`.
+    `?sort=price` (default) ranks places by that item's price; `?sort=distance`
+    ranks them nearest first and needs `?lat=` and `?lng=`, with `?radius=`
+    in kilometres (default 5, max 100). Also accepts `?limit=` (default 20,
+    max 50), `?offset=` (max 1000) and the sparse fieldset parameters.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {"detail": "The `q` query parameter is required."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    sort = request.query_params.get('sort', 'price')
+    if sort not in ('price', 'distance'):
+        return Response(
+            {"detail": "`sort` must be either `price` or `distance`."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        offset = min(max(int(request.query_params.get('offset', 0)), 0), 1000)
+    except ValueError:
+        return Response(
+            {"detail": "`limit` and `offset` must be integers."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    max_price = parse_price(request.query_params, 'max_price')
+
+    near, radius = None, None
+    if sort == 'distance':
+        try:
+            near = (float(request.query_params['lat']), float(request.query_params['lng']))
+            radius = float(request.query_params.get('radius', 5))
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "Sorting by distance needs numeric `lat` and `lng` query parameters (and optionally `radius`)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= near[0] <= 90 and -180 <= near[1] <= 180):
+            return Response(
+                {"detail": "Coordinates out of range. Latitude must be within -90..90 and longitude within -180..180."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (0 < radius <= 100):
+            return Response(
+                {"detail": "The `radius` must be greater than 0 and at most 100 kilometres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    category_id = None
+    category = request.query_params.get('category', '').strip()
+    if category:
+        category_id = (
+            Category.objects.filter(id=int(category)) if re.fullmatch(r'\d+', category, re.ASCII) else Category.objects.filter(slug=category)
+        ).values_list('id', flat=True).first()
+        if category_id is None:
+            return Response(
+                {"detail": f"Category '{category}' not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    total, hits = search_menu_items(
+        query,
+        max_price=max_price,
+        district=request.query_params.get('district', '').strip() or None,
+        category_id=category_id,
+        near=near,
+        radius_km=radius,
+        limit=limit,
+        offset=offset,
+    )
+    options = field_selection(request)
+    if options['fields'] is None and options['expand'] is None:
+        # Only the matching item is embedded, not the whole menu.
+        options['expand'] = {name: {} for name in PlaceSerializer.Meta.expandable_fields if name != 'menu_items'}
+    places = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).in_bulk([place_id for place_id, _, _ in hits])
+    items = PlaceMenu.objects.in_bulk([item_id for _, item_id, _ in hits])
+    hits = [hit for hit in hits if hit[0] in places and hit[1] in items]
+    serializer = PlaceSerializer([places[place_id] for place_id, _, _ in hits], many=True, **options)
+    data = []
+    for place, (_, item_id, distance) in zip(serializer.data, hits):
+        result = {**place, "item": PlaceMenuSerializer(items[item_id]).data}
+        if distance is not None:
+            result["distance_km"] = round(distance, 3)
+        data.append(result)
+    return Response(
+        {
+            "detail": f"Found {total} places serving '{query}'.",
+            "count": total,
+            "data": data
+        },
+        status=status.HTTP_200_OK
+    )
+
+def _rankedPlaces(request, kind):
+    """
+    Shared body of the trending and popular endpoints: reads one materialized
+    list from base.PlaceRanking (global, per `?district=` or per `?category=`)
+    and serializes its places in rank order.
+    """
+    district = request.query_params.get('district', '').strip()
+    category = request.query_params.get('category', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), RANKING_SIZE)
+    except ValueError:
+        return Response(
+            {"detail": "The `limit` query parameter must be an integer."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if district and category:
+        return Response(
+            {"detail": "Filter by either `district` or `category`, not both."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    scope, scope_value = 'global', ''
+    if district:
+        scope, scope_value = 'district', district
+    elif category:
+        category_id = (
+            Category.objects.filter(id=int(category)) if re.fullmatch(r'\d+', category, re.ASCII) else Category.objects.filter(slug=category)
+        ).values_list('id', flat=True).first()
+        if category_id is None:
+            return Response(
+                {"detail": f"Category '{category}' not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        scope, scope_value = 'category', str(category_id)
+
+    ranked = list(
+        PlaceRanking.objects.filter(kind=kind, scope=scope, scope_value=scope_value)
+        .order_by('rank')
+        .values_list('place_id', 'score')[:limit]
+    )
+    options = field_selection(request)
+    places = optimize_queryset(Place.objects.all(), PlaceSerializer(**options)).in_bulk([pk for pk, _ in ranked])
+    ranked = [(pk, score) for pk, score in ranked if pk in places]
+    serializer = PlaceSerializer([places[pk] for pk, _ in ranked], many=True, **options)
+    now = timezone.now()
+    data = [
+        {**place, "score": round(current_score(kind, score, now), 3)}
+        for place, (_, score) in zip(serializer.data, ranked)
+    ]
+    return Response(
+        {
+            "detail": f"Successfully retrieved {len(data)} {kind} places.",
+            "data": data
+        },
+        status=status.HTTP_200_OK
+    )
+
+@cached_view(*versioning.PLACE_DATA, versioning.RANKINGS)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def getTrendingPlaces(request):
+    """
+    Retrieves the places with the most views recently (views lose half their
+    weight every day). Accepts `?district=` or `?category=` (slug or id),
+    `?limit=` (default 20, max RANKING_SIZE) and the sparse fieldset parameters.
+    Each place carries its decayed view `score`. Lists are precomputed by the
+    `update_place_rankings` command.
+    """
+    return _rankedPlaces(request, 'trending')
+
+@cached_view(*versioning.PLACE_DATA, versioning.RANKINGS)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def getPopularPlaces(request):
+    """
+    Retrieves the places with the most views over the last months (views lose
+    half their weight every thirty days). Same parameters and response as
+    getTrendingPlaces.
+    """
+    return _rankedPlaces(request, 'popular')